@@ -0,0 +1,82 @@
+"""Helpers shared by the benchmark scripts."""
+
+from __future__ import annotations
+
+import importlib
+import json
+from pathlib import Path
+import sys
+from types import ModuleType
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_prefix: str | None = None
+
+
+def _resolve_prefix() -> str:
+    """Pick the import path of refoss_ha.
+
+    With Home Assistant installed, the library is imported through the
+    integration package so the HA platforms and the library share the same
+    classes. Without it, refoss_ha is imported as a standalone package.
+    """
+    global _prefix
+    if _prefix is None:
+        sys.path.insert(0, str(ROOT))
+        try:
+            importlib.import_module("custom_components.refoss_lan")
+        except ImportError:
+            sys.path.insert(0, str(ROOT / "custom_components" / "refoss_lan"))
+            _prefix = "refoss_ha"
+        else:
+            _prefix = "custom_components.refoss_lan.refoss_ha"
+    return _prefix
+
+
+def lib(name: str) -> ModuleType:
+    """Import a refoss_ha submodule, e.g. ``lib("controller.toggle")``."""
+    return importlib.import_module(f"{_resolve_prefix()}.{name}")
+
+
+def tool(name: str) -> ModuleType:
+    """Import a script of ``tools/``, e.g. ``tool("simulator")``."""
+    path = str(ROOT / "tools")
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(name)
+
+
+def integration(name: str) -> ModuleType | None:
+    """Import a module of the HA integration, or *None* without Home Assistant."""
+    if _resolve_prefix() == "refoss_ha":
+        return None
+    return importlib.import_module(f"custom_components.refoss_lan.{name}")
+
+
+def compare(
+    results: dict[str, dict], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    """Print a comparison table and return the names that regressed."""
+    regressions: list[str] = []
+    print(f"{'benchmark':36}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:36}{'-':>12}{current['median']:>12.4g}{'new':>10}")
+            continue
+        change = current["median"] / base["median"] - 1.0
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:36}{base['median']:>12.4g}{current['median']:>12.4g}"
+            f"{change:>+9.1%}{flag}"
+        )
+    return regressions
+
+
+def load_results(path: str) -> dict[str, dict]:
+    """Load the ``results`` mapping of a JSON results file."""
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)["results"]
@@ -0,0 +1,95 @@
+"""Canned device responses shared by the benchmarks."""
+
+from __future__ import annotations
+
+EM16_CHANNELS = list(range(1, 19))
+
+TOGGLEX_RESPONSE = {
+    "header": {"method": "GETACK", "namespace": "Appliance.Control.ToggleX"},
+    "payload": {
+        "togglex": [
+            {"channel": 0, "onoff": 1, "lmTime": 1700000000},
+            {"channel": 1, "onoff": 0, "lmTime": 1700000000},
+        ]
+    },
+}
+
+ELECTRICITYX_RESPONSE = {
+    "header": {"method": "GETACK", "namespace": "Appliance.Control.ElectricityX"},
+    "payload": {
+        "electricity": [
+            {
+                "channel": ch,
+                "current": 1200 + ch,
+                "voltage": 230100,
+                "power": 250000 * ch - 1000000,
+                "mConsume": 10000 - 700 * ch,
+                "factor": 0.93,
+                "today": 1500,
+                "week": 9000,
+            }
+            for ch in EM16_CHANNELS
+        ]
+    },
+}
+
+EM_RPC_RESPONSE = {
+    "result": {
+        "status": [
+            {
+                "id": ch,
+                "current": 1200 + ch,
+                "voltage": 230100,
+                "power": 250000 * ch,
+                "power_factor": 930,
+                "month_energy": 12.5 + ch,
+            }
+            for ch in EM16_CHANNELS
+        ]
+    }
+}
+
+SWITCH_RPC_RESPONSES = {
+    ch: {
+        "result": {
+            "id": ch,
+            "output": ch == 1,
+            "apower": 35000,
+            "voltage": 229800,
+            "current": 180,
+            "month_consumption": 4200,
+            "temperature": {"tC": 41.2},
+        }
+    }
+    for ch in (1, 2)
+}
+
+ABILITIES = {
+    "Appliance.System.All": {},
+    "Appliance.System.Ability": {},
+    "Appliance.Control.ToggleX": {},
+    "Appliance.Control.ElectricityX": {},
+}
+
+LEGACY_DEVICE = {
+    "uuid": "2309061234567890123448e1e9000000",
+    "devName": "EM16",
+    "deviceType": "em16",
+    "devSoftWare": "3.1.7",
+    "devHardWare": "3.0.0",
+    "ip": "192.0.2.10",
+    "port": "80",
+    "mac": "48:e1:e9:00:00:00",
+    "subType": "us",
+    "channels": EM16_CHANNELS,
+}
+
+RPC_DEVICE = {
+    "name": "EM16P",
+    "model": "EM16P",
+    "dev_id": "em16p-0000",
+    "mac": "48:e1:e9:00:00:01",
+    "fw_ver": "1.0.0",
+    "hw_ver": "1.0",
+    "ip": "192.0.2.11",
+}
@@ -0,0 +1,139 @@
+"""Event-loop time spent on polls, with and without the dedicated I/O loop.
+
+Starts a fleet of simulated devices on a separate thread, builds real
+controllers for them and polls every device concurrently, round after round,
+first directly on the benchmark's event loop (how the integration polls by
+default) and then through :class:`refoss_ha.io_loop.IoLoop`. For each mode it
+reports the CPU time consumed by the calling thread, which stands in for
+Home Assistant's loop, per 1000 polls, plus the wall time of the run.
+
+Devices bind to consecutive loopback addresses from ``127.0.0.2`` (see the
+simulator notes in ``README.md``).
+
+Run from the repository root::
+
+    python benchmarks/io_thread.py [--devices 20] [--model em16p] [--polls 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+
+from _support import lib, tool
+
+
+def _start_fleet(
+    models: list[str], port: int
+) -> tuple[asyncio.AbstractEventLoop, threading.Thread, list]:
+    """Run simulated devices on their own loop so they do not count as caller time."""
+    simulator = tool("simulator")
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="simulator", daemon=True)
+    thread.start()
+    devices = asyncio.run_coroutine_threadsafe(
+        simulator.async_start_fleet(models, port=port), loop
+    ).result()
+    return loop, thread, devices
+
+
+def _stop_fleet(loop: asyncio.AbstractEventLoop, thread: threading.Thread, devices) -> None:
+    """Stop the simulated devices and their thread."""
+
+    async def stop() -> None:
+        for device in devices:
+            await device.async_stop()
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+async def _build(devices) -> list:
+    """Build a controller for every simulated device."""
+    manager = lib("device_manager")
+    controllers = []
+    for device in devices:
+        if device.legacy:
+            info = lib("device").DeviceInfo.from_dict(device.discovery_info())
+            controllers.append(await manager.async_build_base_device(info))
+        else:
+            info = await lib("device_rpc").DeviceInfoRpc.async_probe(device.address)
+            controllers.append(await manager.async_build_rpc_device(info))
+    return controllers
+
+
+async def _measure(controllers: list, rounds: int, poll) -> dict[str, float]:
+    """Poll every controller ``rounds`` times; return caller CPU and wall time."""
+    # One warm-up round opens connections and fills caches.
+    await asyncio.gather(*(poll(controller) for controller in controllers))
+    cpu = time.thread_time()
+    wall = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(poll(controller) for controller in controllers))
+    cpu = time.thread_time() - cpu
+    wall = time.perf_counter() - wall
+    polls = rounds * len(controllers)
+    return {
+        "polls": polls,
+        "loop_cpu_ms_per_1000_polls": round(cpu * 1000 * 1000 / polls, 3),
+        "wall_s": round(wall, 3),
+    }
+
+
+async def _run(devices, polls: int) -> dict[str, dict[str, float]]:
+    """Measure both modes against the same controllers."""
+    controllers = await _build(devices)
+    rounds = max(1, -(-polls // len(controllers)))
+
+    async def direct(controller) -> None:
+        await controller.async_handle_update()
+
+    results = {"event_loop": await _measure(controllers, rounds, direct)}
+
+    io_loop = lib("io_loop").IoLoop()
+    io_loop.start()
+    try:
+        results["io_thread"] = await _measure(controllers, rounds, io_loop.async_poll)
+        results["io_thread"]["batches"] = io_loop.batches
+    finally:
+        io_loop.stop()
+    return results
+
+
+def main() -> int:
+    """Run the benchmark and print a table (or JSON)."""
+    parser = argparse.ArgumentParser(description="refoss_ha I/O thread benchmark")
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--model", default="em16p")
+    parser.add_argument("--polls", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=18080, help="simulator port")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    loop, thread, devices = _start_fleet([args.model] * args.devices, args.port)
+    try:
+        results = asyncio.run(_run(devices, args.polls))
+    finally:
+        _stop_fleet(loop, thread, devices)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return 0
+    print(f"{'mode':12}{'polls':>8}{'loop CPU ms/1000 polls':>26}{'wall s':>10}")
+    for mode, result in results.items():
+        print(
+            f"{mode:12}{result['polls']:>8}"
+            f"{result['loop_cpu_ms_per_1000_polls']:>26.1f}{result['wall_s']:>10.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""Memory cost of config entries, measured through the real setup path.
+
+Starts simulated devices in a subprocess (so their allocations are not
+counted), boots a test Home Assistant instance with the integration loaded,
+and adds one entry per device through the user config flow, which runs
+``async_setup_entry`` and the platforms exactly as in production. A first
+entry is set up before measuring so imports, platform loading and shared
+caches are not charged to the entries. With tracemalloc it then reports the
+memory retained per entry and per entity, the packages holding it, and the
+biggest allocation sites.
+
+Run from the repository root (needs ``homeassistant`` and
+``pytest-homeassistant-custom-component``)::
+
+    python benchmarks/memory_budget.py [--entries 20] [--model em16p] [--budget-kib 2560]
+
+Exits with status 1 when the memory per entry exceeds ``--budget-kib``.
+Devices bind to consecutive loopback addresses from ``127.0.0.2`` (see the
+simulator notes in ``README.md``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+from pathlib import Path
+import sys
+import tempfile
+import tracemalloc
+
+from _support import ROOT, integration
+
+DOMAIN = "refoss_lan"
+
+
+async def _start_simulators(
+    model: str, count: int, port: int
+) -> tuple[asyncio.subprocess.Process, list[str]]:
+    """Start ``count`` simulated devices; return the process and their addresses."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-u", str(ROOT / "tools" / "simulator.py"),
+        "--model", model, "--count", str(count), "--port", str(port),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    addresses = []
+    while len(addresses) < count:
+        line = await process.stdout.readline()
+        if not line:
+            raise RuntimeError("The device simulator exited during start-up")
+        addresses.append(line.split()[1].decode())
+    return process, addresses
+
+
+async def _add_entry(hass, address: str) -> None:
+    """Add and set up one entry through the user config flow."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": "user"}
+    )
+    if result["type"] == "menu":
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {"next_step_id": "device"}
+        )
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"host": address, "update_interval": 10}
+    )
+    if result["type"] != "create_entry":
+        raise RuntimeError(f"Adding {address} failed: {result.get('errors')}")
+    await hass.async_block_till_done()
+
+
+def _package(filename: str) -> str:
+    """Return a short owner name for an allocation's source file."""
+    path = Path(filename).as_posix()
+    if "/refoss_lan/" in path:
+        return "refoss_lan"
+    if "/site-packages/" in path:
+        return path.split("/site-packages/", 1)[1].split("/", 1)[0]
+    if "/lib/python" in path:
+        return "stdlib"
+    return "other"
+
+
+async def _measure(hass, addresses: list[str], top: int) -> dict:
+    """Set up the entries and return the memory they retain."""
+    from homeassistant.helpers import entity_registry as er
+
+    await _add_entry(hass, addresses[0])
+    gc.collect()
+    tracemalloc.start(25)
+    before = tracemalloc.take_snapshot()
+    for address in addresses[1:]:
+        await _add_entry(hass, address)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    entries = hass.config_entries.async_entries(DOMAIN)[1:]
+    registry = er.async_get(hass)
+    entities = sum(
+        len(er.async_entries_for_config_entry(registry, entry.entry_id))
+        for entry in entries
+    )
+    snapshot_filter = tracemalloc.Filter(False, tracemalloc.__file__)
+    after = after.filter_traces([snapshot_filter])
+    before = before.filter_traces([snapshot_filter])
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    packages: dict[str, int] = {}
+    for stat in after.compare_to(before, "filename"):
+        owner = _package(stat.traceback[0].filename)
+        packages[owner] = packages.get(owner, 0) + stat.size_diff
+    sites = [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "kib": round(stat.size_diff / 1024, 1),
+            "blocks": stat.count_diff,
+        }
+        for stat in after.compare_to(before, "lineno")[:top]
+    ]
+    return {
+        "entries": len(entries),
+        "entities": entities,
+        "total_kib": round(total / 1024, 1),
+        "per_entry_kib": round(total / 1024 / max(1, len(entries)), 1),
+        "per_entity_kib": round(total / 1024 / max(1, entities), 2),
+        "packages_kib": {
+            name: round(size / 1024, 1)
+            for name, size in sorted(packages.items(), key=lambda item: -item[1])
+        },
+        "top_sites": sites,
+    }
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    """Boot Home Assistant, measure, and tear everything down."""
+    from homeassistant import loader
+    from homeassistant.setup import async_setup_component
+    from pytest_homeassistant_custom_component.common import async_test_home_assistant
+
+    process, addresses = await _start_simulators(args.model, args.entries + 1, args.port)
+    try:
+        with tempfile.TemporaryDirectory() as config_dir:
+            async with async_test_home_assistant(config_dir=config_dir) as hass:
+                # The test instance hides custom integrations unless this is reset.
+                hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+                await async_setup_component(hass, DOMAIN, {})
+                try:
+                    return await _measure(hass, addresses, args.top)
+                finally:
+                    for entry in hass.config_entries.async_entries(DOMAIN):
+                        await hass.config_entries.async_unload(entry.entry_id)
+                    await hass.async_stop(force=True)
+    finally:
+        process.terminate()
+        await process.wait()
+
+
+def main() -> int:
+    """Run the harness, print the report and check the budget."""
+    parser = argparse.ArgumentParser(description="refoss_lan memory budget")
+    parser.add_argument("--entries", type=int, default=20)
+    parser.add_argument("--model", default="em16p")
+    parser.add_argument("--port", type=int, default=18090, help="simulator port")
+    parser.add_argument("--budget-kib", type=float, default=2560.0,
+                        help="maximum memory per entry")
+    parser.add_argument("--top", type=int, default=15, help="allocation sites to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if integration("const") is None:
+        print("memory_budget.py needs Home Assistant installed", file=sys.stderr)
+        return 2
+    report = asyncio.run(_run(args))
+    report["budget_kib"] = args.budget_kib
+
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(
+            f"{report['entries']} x {args.model}: {report['total_kib']:.1f} KiB, "
+            f"{report['per_entry_kib']:.1f} KiB/entry, "
+            f"{report['per_entity_kib']:.2f} KiB/entity ({report['entities']} entities)"
+        )
+        print("\nby package:")
+        for name, kib in report["packages_kib"].items():
+            print(f"  {name:32}{kib:>10.1f} KiB")
+        print("\ntop allocation sites:")
+        for site in report["top_sites"]:
+            print(f"  {site['kib']:>8.1f} KiB {site['blocks']:>7} blocks  {site['site']}")
+
+    if report["per_entry_kib"] > args.budget_kib:
+        print(
+            f"per-entry memory {report['per_entry_kib']:.1f} KiB exceeds the "
+            f"budget of {args.budget_kib:.1f} KiB",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
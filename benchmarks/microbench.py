@@ -0,0 +1,269 @@
+"""Microbenchmarks for the refoss_ha hot paths.
+
+Runs without hardware or network: controllers get canned responses injected
+in place of their transport. Results are written as JSON and can be compared
+against a stored baseline.
+
+Run from the repository root::
+
+    python benchmarks/microbench.py --output bench.json
+    python benchmarks/microbench.py --baseline bench.json [--tolerance 0.10]
+
+The comparison exits with status 1 when any benchmark's median is slower than
+the baseline by more than the tolerance. ``native_value`` benchmarks are only
+run when Home Assistant is importable.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable
+import json
+import platform
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+import canned
+from _support import compare, integration, lib, load_results
+
+Benchmark = Callable[[int], None]
+
+
+def _measure(func: Benchmark, repeat: int, min_time: float) -> dict[str, float]:
+    """Time ``func(n)`` and return per-operation statistics in microseconds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        func(number)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        func(number)
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(timings) * 1e6,
+        "median": statistics.median(timings) * 1e6,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _async_runner(loop: asyncio.AbstractEventLoop, factory) -> Benchmark:
+    """Wrap a coroutine factory into an ``n``-iteration benchmark."""
+
+    async def run(n: int) -> None:
+        for _ in range(n):
+            await factory()
+
+    return lambda n: loop.run_until_complete(run(n))
+
+
+def _canned(response: dict):
+    """Return a fake transport coroutine answering with ``response``."""
+
+    async def execute(*args, **kwargs):
+        return response
+
+    return execute
+
+
+def _legacy_device(abilities: dict):
+    """Build a legacy controller from the canned device and abilities."""
+    manager = lib("device_manager")
+    # Types are cached per model/version; start clean so the abilities apply.
+    manager._dynamic_types.clear()
+    info = lib("device").DeviceInfo.from_dict(canned.LEGACY_DEVICE)
+    return manager.build_device_from_abilities(info, abilities)
+
+
+def build_benchmarks(loop: asyncio.AbstractEventLoop) -> dict[str, Benchmark]:
+    """Return the benchmarks keyed by name."""
+    device_mod = lib("device")
+    manager = lib("device_manager")
+    Namespace = lib("enums").Namespace
+    benches: dict[str, Benchmark] = {}
+
+    info = device_mod.DeviceInfo.from_dict(canned.LEGACY_DEVICE)
+    payload = {"togglex": {"channel": 65535}}
+
+    def build_message(n: int) -> None:
+        for _ in range(n):
+            info._build_mqtt_message("GET", Namespace.CONTROL_TOGGLEX, payload, info.uuid)
+
+    benches["build_mqtt_message"] = build_message
+
+    def from_dict(n: int) -> None:
+        for _ in range(n):
+            device_mod.DeviceInfo.from_dict(canned.LEGACY_DEVICE)
+
+    def to_dict(n: int) -> None:
+        for _ in range(n):
+            info.to_dict()
+
+    benches["payload_from_dict"] = from_dict
+    benches["payload_to_dict"] = to_dict
+
+    toggle = _legacy_device({"Appliance.Control.ToggleX": {}})
+    toggle.async_execute_cmd = _canned(canned.TOGGLEX_RESPONSE)
+    benches["togglex_handle_update"] = _async_runner(loop, toggle.async_handle_update)
+
+    electricity = _legacy_device({"Appliance.Control.ElectricityX": {}})
+    electricity.async_execute_cmd = _canned(canned.ELECTRICITYX_RESPONSE)
+    benches["electricityx_handle_update_em16"] = _async_runner(
+        loop, electricity.async_handle_update
+    )
+
+    rpc_info = lib("device_rpc").DeviceInfoRpc(
+        **canned.RPC_DEVICE, channels=canned.EM16_CHANNELS
+    )
+    em = lib("controller.em_rpc").EmRpcMix(rpc_info)
+    rpc_info.async_execute_rpc_cmd = _canned(canned.EM_RPC_RESPONSE)
+    benches["em_rpc_handle_update_em16"] = _async_runner(loop, em.async_handle_update)
+
+    switch_info = lib("device_rpc").DeviceInfoRpc(**canned.RPC_DEVICE, channels=[1, 2])
+
+    async def switch_rpc_cmd(method, params=None, timeout=10, **kwargs):
+        return canned.SWITCH_RPC_RESPONSES[params["id"]]
+
+    switch_info.async_execute_rpc_cmd = switch_rpc_cmd
+    switch = lib("controller.switch_rpc").SwitchRpcMix(switch_info)
+    benches["switch_rpc_handle_update_2ch"] = _async_runner(
+        loop, switch.async_handle_update
+    )
+
+    benches.update(_response_benchmarks())
+
+    abilities = {
+        "Appliance.Control.ToggleX": {},
+        "Appliance.Control.ElectricityX": {},
+    }
+
+    manager._dynamic_types.clear()
+    manager.build_device_from_abilities(info, abilities)
+
+    def build_cached(n: int) -> None:
+        for _ in range(n):
+            manager.build_device_from_abilities(info, abilities)
+
+    def build_uncached(n: int) -> None:
+        for _ in range(n):
+            manager._dynamic_types.clear()
+            manager.build_device_from_abilities(info, abilities)
+
+    benches["build_device_from_abilities_cached"] = build_cached
+    benches["build_device_from_abilities_uncached"] = build_uncached
+
+    sensor = integration("sensor")
+    if sensor is not None:
+        benches.update(_sensor_benchmarks(sensor, electricity, em))
+    return benches
+
+
+def _response_benchmarks() -> dict[str, Benchmark]:
+    """Return benchmarks decoding a response body vs detecting it is unchanged."""
+    util = lib("util")
+    volatile = lib("device")._VOLATILE_FIELDS
+    benches: dict[str, Benchmark] = {}
+    for name, response, pattern in (
+        ("electricityx", canned.ELECTRICITYX_RESPONSE, volatile),
+        ("em_rpc", canned.EM_RPC_RESPONSE, None),
+    ):
+        body = json.dumps(response).encode()
+        digests = util.ResponseDigests(pattern)
+        digests.unchanged("key", body)
+
+        def decode(n: int, body=body) -> None:
+            for _ in range(n):
+                json.loads(body)
+
+        def unchanged(n: int, body=body, digests=digests) -> None:
+            for _ in range(n):
+                digests.unchanged("key", body)
+
+        benches[f"{name}_response_decode_em16"] = decode
+        benches[f"{name}_response_unchanged_em16"] = unchanged
+    return benches
+
+
+def _sensor_benchmarks(sensor, electricity, em) -> dict[str, Benchmark]:
+    """Return benchmarks reading native_value across a full EM16 entity set."""
+    benches: dict[str, Benchmark] = {}
+    for name, device, store, sensor_type in (
+        ("native_value_em16_legacy", electricity, electricity.electricity_state, sensor.SENSOR_EM),
+        ("native_value_em16_rpc", em, em.em_state, sensor.SENSOR_EM_RPC),
+    ):
+        coordinator = SimpleNamespace(device=device)
+        table = sensor.SensorValueTable(store)
+        entities = [
+            sensor.RefossSensor(coordinator, channel, description, table, channel_name=str(channel))
+            for channel in device.channels
+            for description in sensor.SENSORS[sensor_type]
+        ]
+
+        def read_all(n: int, entities=entities, store=store) -> None:
+            for _ in range(n):
+                # Every poll changes the store; every entity then writes its state.
+                store.generation += 1
+                for entity in entities:
+                    entity.native_value  # noqa: B018
+
+        benches[name] = read_all
+    return benches
+
+
+def main() -> int:
+    """Run the suite and write or compare the results."""
+    parser = argparse.ArgumentParser(description="refoss_ha microbenchmarks")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("-k", dest="select", help="only run benchmarks containing this")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    try:
+        benches = build_benchmarks(loop)
+        results: dict[str, dict] = {}
+        for name, func in benches.items():
+            if args.select and args.select not in name:
+                continue
+            results[name] = _measure(func, args.repeat, args.min_time)
+            print(f"{name:44}{results[name]['median']:>10.3f} us/op", file=sys.stderr)
+    finally:
+        loop.close()
+
+    document = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "unit": "us/op",
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=2)
+    elif not args.baseline:
+        json.dump(document, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Compare retained memory of raw per-channel dicts vs ChannelStateStore.
+
+Simulates 100 EM16 devices (18 channels each) receiving a few polls of a
+legacy ElectricityX response and reports, with tracemalloc, the memory
+still held after the last poll and the memory allocated per poll round.
+
+Run from the repository root::
+
+    python benchmarks/state_memory.py [--devices 100] [--polls 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "custom_components" / "refoss_lan"))
+
+from refoss_ha.controller.electricity import ELECTRICITY_FIELDS  # noqa: E402
+from refoss_ha.state import ChannelStateStore  # noqa: E402
+
+CHANNELS = list(range(1, 19))
+
+
+def _response_body(rng: random.Random) -> bytes:
+    """Return an ElectricityX GET response body for all 18 channels."""
+    return json.dumps(
+        {
+            "header": {"messageId": "x" * 32, "method": "GETACK"},
+            "payload": {
+                "electricity": [
+                    {
+                        "channel": ch,
+                        "current": rng.randint(0, 20000),
+                        "voltage": rng.randint(228000, 232000),
+                        "power": rng.randint(-500000, 3000000),
+                        "mConsume": rng.randint(0, 10**6),
+                        "factor": round(rng.random(), 3),
+                        "today": rng.randint(0, 50000),
+                        "week": rng.randint(0, 300000),
+                    }
+                    for ch in CHANNELS
+                ]
+            },
+        }
+    ).encode()
+
+
+def _run(devices: int, polls: int, use_store: bool) -> tuple[int, int]:
+    """Return (bytes retained after the last poll, bytes allocated per round)."""
+    rng = random.Random(1)
+    bodies = [_response_body(rng) for _ in range(polls)]
+
+    tracemalloc.start()
+    if use_store:
+        holders: list = [
+            ChannelStateStore(ELECTRICITY_FIELDS, CHANNELS) for _ in range(devices)
+        ]
+    else:
+        holders = [{} for _ in range(devices)]
+
+    per_round = 0
+    for body in bodies:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for holder in holders:
+            for state in json.loads(body)["payload"]["electricity"]:
+                if use_store:
+                    holder.update(state["channel"], state)
+                else:
+                    holder[state["channel"]] = state
+        per_round = max(per_round, tracemalloc.get_traced_memory()[1] - before)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return retained, per_round
+
+
+def main() -> None:
+    """Run the comparison and print a small table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--polls", type=int, default=5)
+    args = parser.parse_args()
+
+    raw = _run(args.devices, args.polls, use_store=False)
+    store = _run(args.devices, args.polls, use_store=True)
+    print(f"{args.devices} EM16 devices x {len(CHANNELS)} channels")
+    print(f"{'':18}{'retained':>12}{'peak/poll':>12}")
+    print(f"{'raw dicts':18}{raw[0]:>12,}{raw[1]:>12,}")
+    print(f"{'state store':18}{store[0]:>12,}{store[1]:>12,}")
+    print(f"retained ratio: {store[0] / raw[0]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
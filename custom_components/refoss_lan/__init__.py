@@ -2,45 +2,50 @@
 
 from __future__ import annotations
 
-import logging
 from typing import Final
 
 from homeassistant.const import Platform, CONF_HOST
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers import device_registry as dr
-from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.typing import ConfigType
 
-from .refoss_ha.device_manager import async_build_base_device, async_build_rpc_device
-from .refoss_ha.device import DeviceInfo
-from .refoss_ha.device_rpc import DeviceInfoRpc
 from .refoss_ha.exceptions import DeviceTimeoutError, InvalidMessage, RefossError
 
 from .refoss_ha.controller.device import BaseDevice
-from .const import CHANNEL_DISPLAY_NAME, CONF_LOG_LEVEL, DOMAIN, LOG_LEVEL_DEFAULT, LOG_LEVEL_OPTIONS, _LOGGER
-from .coordinator import RefossDataUpdateCoordinator, RefossConfigEntry
+from .const import (
+    CONF_DEVICES,
+    CONF_HUB,
+    CONF_IMPORT_STATISTICS,
+    DOMAIN,
+    ENERGY_STORAGE_VERSION,
+    _LOGGER,
+)
+from .coordinator import RefossConfigEntry, energy_storage_key
+from .device_setup import (
+    apply_log_level,
+    apply_options,
+    async_build_device,
+    async_setup_coordinator,
+)
+from .hub import RefossHub, device_mac
+from .services import async_setup_services
+from .websocket_api import async_setup_websocket_api
 
 PLATFORMS: Final = [
     Platform.SWITCH,
     Platform.SENSOR,
 ]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
-def _get_entry_logger(config_entry: RefossConfigEntry) -> logging.Logger:
-    """Return the per-entry child logger for a config entry."""
-    return logging.getLogger(f"{_LOGGER.name}.{config_entry.entry_id}")
 
-
-def _apply_log_level(config_entry: RefossConfigEntry) -> None:
-    """Apply the configured log level to the per-entry child logger."""
-    entry_logger = _get_entry_logger(config_entry)
-    level_name = config_entry.options.get(CONF_LOG_LEVEL, LOG_LEVEL_DEFAULT)
-    if level_name not in LOG_LEVEL_OPTIONS:
-        _LOGGER.warning(
-            "Invalid log level '%s', falling back to %s", level_name, LOG_LEVEL_DEFAULT
-        )
-        level_name = LOG_LEVEL_DEFAULT
-    entry_logger.setLevel(getattr(logging, level_name))
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the refoss_lan services and websocket API."""
+    async_setup_services(hass)
+    async_setup_websocket_api(hass)
+    return True
 
 
 async def async_setup_entry(
@@ -48,6 +53,8 @@ async def async_setup_entry(
 ) -> bool:
     """Set up refoss_lan from a config entry."""
     data = config_entry.data
+    if data.get(CONF_HUB):
+        return await _async_setup_hub(hass, config_entry)
     if not data.get(CONF_HOST) or not data.get("device"):
         _LOGGER.debug(
             "The config entry %s invalid, please remove it and try again",
@@ -55,14 +62,7 @@ async def async_setup_entry(
         )
         return False
     try:
-        raw_device = data["device"]
-        protocol = raw_device.get("protocol", "lan")
-        if protocol == "rpc":
-            device_info_rpc: DeviceInfoRpc = DeviceInfoRpc.from_dict(raw_device)
-            base_device: BaseDevice = await async_build_rpc_device(device_info=device_info_rpc)
-        else:
-            device: DeviceInfo = DeviceInfo.from_dict(raw_device)
-            base_device = await async_build_base_device(device_info=device)
+        base_device: BaseDevice = await async_build_device(data)
     except DeviceTimeoutError as err:
         raise ConfigEntryNotReady(f"Timed out connecting to {data[CONF_HOST]}") from err
     except InvalidMessage as err:
@@ -78,32 +78,12 @@ async def async_setup_entry(
         )
         raise ConfigEntryNotReady("Unexpected error setting up device") from err
 
-    _apply_log_level(config_entry)
-    coordinator = RefossDataUpdateCoordinator(
-        hass,
-        config_entry,
-        base_device,
-        _get_entry_logger(config_entry),
-    )
+    apply_log_level(config_entry)
+    coordinator = await async_setup_coordinator(hass, config_entry, base_device)
+    config_entry.async_on_unload(lambda: coordinator.set_tracing(False))
     await coordinator.async_config_entry_first_refresh()
     config_entry.runtime_data = coordinator
 
-    # For multi-channel EM devices each channel is represented as a sub-device.
-    # Register the parent (integration-level) device explicitly so that the
-    # sub-devices can reference it via ``via_device``.
-    if base_device.device_type in CHANNEL_DISPLAY_NAME:
-        device_registry = dr.async_get(hass)
-        device_registry.async_get_or_create(
-            config_entry_id=config_entry.entry_id,
-            identifiers={(DOMAIN, base_device.mac)},
-            connections={(CONNECTION_NETWORK_MAC, base_device.mac)},
-            manufacturer="Refoss",
-            name=base_device.device_type,
-            model=base_device.device_type,
-            sw_version=base_device.fmware_version,
-            hw_version=base_device.hdware_version,
-        )
-
     config_entry.async_on_unload(
         config_entry.add_update_listener(_async_update_options)
     )
@@ -112,11 +92,45 @@ async def async_setup_entry(
     return True
 
 
+async def _async_setup_hub(hass: HomeAssistant, config_entry: RefossConfigEntry) -> bool:
+    """Set up a hub entry: its devices, their poll engine and the platforms."""
+    apply_log_level(config_entry)
+    hub = config_entry.runtime_data = RefossHub(hass, config_entry)
+    await hub.async_sync()
+    config_entry.async_create_background_task(
+        hass, hub.engine.run(), f"{DOMAIN} poll engine"
+    )
+    config_entry.async_on_unload(
+        config_entry.add_update_listener(_async_update_options)
+    )
+    await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    return True
+
+
 async def _async_update_options(
     hass: HomeAssistant, config_entry: RefossConfigEntry
 ) -> None:
-    """Handle options update."""
-    _apply_log_level(config_entry)
+    """Handle options update (and device list changes of a hub)."""
+    apply_log_level(config_entry)
+    runtime = config_entry.runtime_data
+    if isinstance(runtime, RefossHub):
+        coordinators = list(runtime.coordinators.values())
+    else:
+        coordinators = [runtime]
+    for coordinator in coordinators:
+        apply_options(hass, config_entry, coordinator)
+    # Sensors and the importer are set up for one mode; switching needs a reload.
+    import_statistics = (
+        config_entry.options.get(CONF_IMPORT_STATISTICS, False)
+        and "recorder" in hass.config.components
+    )
+    if any(
+        import_statistics != (coordinator.statistics is not None)
+        for coordinator in coordinators
+    ):
+        hass.config_entries.async_schedule_reload(config_entry.entry_id)
+    elif isinstance(runtime, RefossHub):
+        await runtime.async_sync()
 
 
 async def async_unload_entry(
@@ -126,4 +140,45 @@ async def async_unload_entry(
     unload_ok = await hass.config_entries.async_unload_platforms(
         config_entry, PLATFORMS
     )
+    if unload_ok and isinstance(config_entry.runtime_data, RefossHub):
+        await config_entry.runtime_data.async_unload()
     return unload_ok
+
+
+async def async_remove_entry(
+    hass: HomeAssistant, config_entry: RefossConfigEntry
+) -> None:
+    """Remove stored energy checkpoints when an entry is deleted."""
+    if config_entry.data.get(CONF_HUB):
+        keys = [
+            energy_storage_key(config_entry.entry_id, mac)
+            for mac in config_entry.data.get(CONF_DEVICES, {})
+        ]
+    else:
+        keys = [energy_storage_key(config_entry.entry_id)]
+    for key in keys:
+        await Store(hass, ENERGY_STORAGE_VERSION, key).async_remove()
+
+
+async def async_remove_config_entry_device(
+    hass: HomeAssistant, config_entry: RefossConfigEntry, device_entry: dr.DeviceEntry
+) -> bool:
+    """Remove a device from a hub when it is deleted from the device page.
+
+    Only a device itself can be deleted, not the channel sub-device of one,
+    and devices of device entries are removed with their entry.
+    """
+    devices = config_entry.data.get(CONF_DEVICES)
+    mac = device_mac(device_entry)
+    if not config_entry.data.get(CONF_HUB) or mac not in devices:
+        return False
+    if (DOMAIN, mac) not in device_entry.identifiers:
+        return False
+    hass.config_entries.async_update_entry(
+        config_entry,
+        data={
+            **config_entry.data,
+            CONF_DEVICES: {k: v for k, v in devices.items() if k != mac},
+        },
+    )
+    return True
@@ -4,9 +4,12 @@ from __future__ import annotations
 
 import voluptuous as vol
 
-from typing import Any
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any
 from homeassistant.config_entries import ConfigEntry, ConfigFlow, ConfigFlowResult, OptionsFlow
+from homeassistant.data_entry_flow import AbortFlow
 from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
 
 from homeassistant.const import (
     CONF_HOST,
@@ -17,14 +20,24 @@ from .refoss_ha.device_rpc import DeviceInfoRpc
 from .refoss_ha.exceptions import SocketError
 from .const import (
     _LOGGER,
+    CONF_DEVICES,
+    CONF_HUB,
+    CONF_IMPORT_ENTRIES,
+    CONF_IMPORT_STATISTICS,
+    CONF_IO_THREAD,
     CONF_LOG_LEVEL,
+    CONF_TRACING,
     DISCOVERY_TIMEOUT,
     DOMAIN,
+    HUB_UNIQUE_ID,
     LOG_LEVEL_DEFAULT,
     LOG_LEVEL_OPTIONS,
     UPDATE_INTERVAL,
 )
 
+if TYPE_CHECKING:
+    from homeassistant.helpers.service_info.zeroconf import ZeroconfServiceInfo
+
 
 class RefossConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for refoss_lan."""
@@ -34,24 +47,176 @@ class RefossConfigFlow(ConfigFlow, domain=DOMAIN):
 
     host: str = ""
     update_interval = 10
+    _discovered: dict[str, Any] | None = None
 
     @staticmethod
     @callback
     def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
         """Create the options flow handler."""
+        if config_entry.data.get(CONF_HUB):
+            return RefossHubOptionsFlowHandler()
         return RefossOptionsFlowHandler()
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
         """Handle the initial step."""
-        return await self._handle_step(user_input, step_id="user")
+        if self._hub_entry() is not None:
+            return await self.async_step_device()
+        return self.async_show_menu(step_id="user", menu_options=["device", "hub"])
+
+    async def async_step_device(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Add a single device."""
+        return await self._handle_step(user_input, step_id="device")
+
+    async def async_step_hub(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Create the hub entry, optionally moving the device entries into it."""
+        await self.async_set_unique_id(HUB_UNIQUE_ID)
+        self._abort_if_unique_id_configured()
+        if user_input is not None:
+            devices = {}
+            if user_input[CONF_IMPORT_ENTRIES]:
+                devices = {
+                    entry.unique_id: {
+                        CONF_HOST: entry.data[CONF_HOST],
+                        UPDATE_INTERVAL: entry.data.get(UPDATE_INTERVAL, 10),
+                        "device": entry.data["device"],
+                    }
+                    for entry in self._async_current_entries(include_ignore=False)
+                    if entry.unique_id and entry.data.get("device")
+                }
+            return self.async_create_entry(
+                title="Refoss LAN", data={CONF_HUB: True, CONF_DEVICES: devices}
+            )
+        return self.async_show_form(
+            step_id="hub",
+            data_schema=vol.Schema(
+                {vol.Required(CONF_IMPORT_ENTRIES, default=True): bool}
+            ),
+        )
+
+    def _hub_entry(self) -> ConfigEntry | None:
+        """Return the hub entry, if one exists."""
+        return next(
+            (
+                entry
+                for entry in self._async_current_entries(include_ignore=False)
+                if entry.data.get(CONF_HUB)
+            ),
+            None,
+        )
+
+    def _async_create_device(
+        self, title: str, data: dict[str, Any]
+    ) -> ConfigFlowResult:
+        """Create a device entry, or add the device to the hub if there is one."""
+        if (hub := self._hub_entry()) is None:
+            return self.async_create_entry(title=title, data=data)
+        self.hass.config_entries.async_update_entry(
+            hub,
+            data={
+                **hub.data,
+                CONF_DEVICES: {**hub.data[CONF_DEVICES], self.unique_id: data},
+            },
+        )
+        return self.async_abort(reason="added_to_hub")
+
+    def _abort_if_in_hub(self, mac: str, host: str) -> None:
+        """Abort if the hub has the device, moving it to ``host`` first."""
+        hub = self._hub_entry()
+        if hub is None or (data := hub.data[CONF_DEVICES].get(mac)) is None:
+            return
+        if data[CONF_HOST] != host:
+            self.hass.config_entries.async_update_entry(
+                hub,
+                data={
+                    **hub.data,
+                    CONF_DEVICES: {
+                        **hub.data[CONF_DEVICES],
+                        mac: {
+                            **data,
+                            CONF_HOST: host,
+                            "device": {**data["device"], "ip": host},
+                        },
+                    },
+                },
+            )
+        raise AbortFlow("already_configured")
+
+    async def async_step_zeroconf(
+        self, discovery_info: ZeroconfServiceInfo
+    ) -> ConfigFlowResult:
+        """Handle an Open API (RPC) device announced over mDNS."""
+        if discovery_info.ip_address.version != 4:
+            return self.async_abort(reason="not_ipv4_address")
+        host = discovery_info.host
+        if discovery_info.port and discovery_info.port != 80:
+            host = f"{host}:{discovery_info.port}"
+        properties = discovery_info.properties
+        # Known devices are recognised from the announcement alone.
+        if mac := properties.get("mac"):
+            await self._async_abort_if_discovered(mac.replace(":", "").lower(), host)
+        device = await DeviceInfoRpc.async_from_zeroconf(host, properties)
+        if device is None:
+            return self.async_abort(reason="cannot_connect")
+        await self._async_abort_if_discovered(device.mac, host)
+
+        self.host = host
+        self._discovered = {**device.to_dict(), CONF_MAC: device.mac}
+        self.context["title_placeholders"] = {"name": device.dev_name}
+        return await self.async_step_zeroconf_confirm()
+
+    async def _async_abort_if_discovered(self, mac: str, host: str) -> None:
+        """Abort if the device is configured, moving its entry to ``host`` first."""
+        await self.async_set_unique_id(mac)
+        self._abort_if_in_hub(mac, host)
+        for entry in self._async_current_entries(include_ignore=False):
+            if entry.unique_id == mac and entry.data.get(CONF_HOST) != host:
+                self.hass.config_entries.async_update_entry(
+                    entry,
+                    data={
+                        **entry.data,
+                        CONF_HOST: host,
+                        "device": {**entry.data["device"], "ip": host},
+                    },
+                )
+                self.hass.config_entries.async_schedule_reload(entry.entry_id)
+        self._abort_if_unique_id_configured()
+
+    async def async_step_zeroconf_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Confirm adding a discovered device."""
+        assert self._discovered is not None
+        if user_input is not None:
+            return self._async_create_device(
+                self._discovered["devName"],
+                {
+                    CONF_HOST: self.host,
+                    UPDATE_INTERVAL: self.update_interval,
+                    "device": self._discovered,
+                },
+            )
+        self._set_confirm_only()
+        return self.async_show_form(
+            step_id="zeroconf_confirm",
+            description_placeholders={
+                "name": self._discovered["devName"],
+                "host": self.host,
+            },
+        )
 
     async def async_step_reconfigure(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
         """Handle a reconfiguration flow initialized by the user."""
         reconfigure_entry = self._get_reconfigure_entry()
+        if reconfigure_entry.data.get(CONF_HUB):
+            return self.async_abort(reason="hub_reconfigure")
         self.host = reconfigure_entry.data[CONF_HOST]
         self.update_interval = reconfigure_entry.data[UPDATE_INTERVAL]
         return await self._handle_step(
@@ -63,7 +228,7 @@ class RefossConfigFlow(ConfigFlow, domain=DOMAIN):
     async def _handle_step(
         self,
         user_input: dict[str, Any] | None = None,
-        step_id: str = "user",
+        step_id: str = "device",
         description_placeholders: dict[str, str] | None = None,
     ) -> ConfigFlowResult:
         errors: dict[str, str] = {}
@@ -77,11 +242,12 @@ class RefossConfigFlow(ConfigFlow, domain=DOMAIN):
             else:
                 if mac := device[CONF_MAC]:
                     await self.async_set_unique_id(mac)
-                    if step_id == "user":
+                    if step_id == "device":
                         self._abort_if_unique_id_configured({CONF_HOST: host})
-                        return self.async_create_entry(
-                            title=device["devName"],
-                            data={
+                        self._abort_if_in_hub(mac, host)
+                        return self._async_create_device(
+                            device["devName"],
+                            {
                                 CONF_HOST: host,
                                 UPDATE_INTERVAL: self.update_interval,
                                 "device": device,
@@ -115,8 +281,32 @@ class RefossConfigFlow(ConfigFlow, domain=DOMAIN):
         )
 
 
+def _options_schema(options: Mapping[str, Any]) -> vol.Schema:
+    """Return the schema of the entry options, defaulting to ``options``."""
+    current_level = options.get(CONF_LOG_LEVEL, LOG_LEVEL_DEFAULT)
+    if current_level not in LOG_LEVEL_OPTIONS:
+        current_level = LOG_LEVEL_DEFAULT
+    return vol.Schema(
+        {
+            vol.Required(CONF_LOG_LEVEL, default=current_level): vol.In(
+                LOG_LEVEL_OPTIONS
+            ),
+            vol.Required(
+                CONF_TRACING, default=options.get(CONF_TRACING, False)
+            ): bool,
+            vol.Required(
+                CONF_IO_THREAD, default=options.get(CONF_IO_THREAD, False)
+            ): bool,
+            vol.Required(
+                CONF_IMPORT_STATISTICS,
+                default=options.get(CONF_IMPORT_STATISTICS, False),
+            ): bool,
+        }
+    )
+
+
 class RefossOptionsFlowHandler(OptionsFlow):
-    """Handle Refoss options (log level)."""
+    """Handle Refoss options (log level, tracing, I/O thread, statistics import)."""
 
     async def async_step_init(
         self, user_input: dict[str, Any] | None = None
@@ -124,18 +314,108 @@ class RefossOptionsFlowHandler(OptionsFlow):
         """Manage the options."""
         if user_input is not None:
             return self.async_create_entry(data=user_input)
+        return self.async_show_form(
+            step_id="init", data_schema=_options_schema(self.config_entry.options)
+        )
+
+
+class RefossHubOptionsFlowHandler(OptionsFlow):
+    """Handle the options and the device list of a hub entry."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Start from the hub menu."""
+        return await self.async_step_hub()
+
+    async def async_step_hub(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Offer the hub's settings and its device list."""
+        return self.async_show_menu(
+            step_id="hub", menu_options=["settings", "add_device", "remove_device"]
+        )
+
+    async def async_step_settings(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the options shared by all devices of the hub."""
+        if user_input is not None:
+            return self.async_create_entry(data=user_input)
+        return self.async_show_form(
+            step_id="settings", data_schema=_options_schema(self.config_entry.options)
+        )
+
+    async def async_step_add_device(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Add a device to the hub; the others keep running."""
+        errors: dict[str, str] = {}
+        devices = self.config_entry.data[CONF_DEVICES]
+        if user_input is not None:
+            host = user_input[CONF_HOST]
+            device = await start_scan_device(host=host)
+            if not device:
+                errors["base"] = "no_devices_found"
+            elif not (mac := device[CONF_MAC]):
+                errors["base"] = "firmware_not_fully_supported"
+            elif mac in devices:
+                errors["base"] = "already_in_hub"
+            else:
+                self._update_devices(
+                    {
+                        **devices,
+                        mac: {
+                            CONF_HOST: host,
+                            UPDATE_INTERVAL: user_input[UPDATE_INTERVAL],
+                            "device": device,
+                        },
+                    }
+                )
+                return self.async_create_entry(data=dict(self.config_entry.options))
 
-        current_level = self.config_entry.options.get(CONF_LOG_LEVEL, LOG_LEVEL_DEFAULT)
-        if current_level not in LOG_LEVEL_OPTIONS:
-            current_level = LOG_LEVEL_DEFAULT
         schema = vol.Schema(
             {
-                vol.Required(CONF_LOG_LEVEL, default=current_level): vol.In(
-                    LOG_LEVEL_OPTIONS
+                vol.Required(CONF_HOST): str,
+                vol.Required(UPDATE_INTERVAL, default=10): vol.All(
+                    vol.Coerce(int), vol.Range(min=1)
                 ),
             }
         )
-        return self.async_show_form(step_id="init", data_schema=schema)
+        return self.async_show_form(
+            step_id="add_device", data_schema=schema, errors=errors
+        )
+
+    async def async_step_remove_device(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Remove devices from the hub; the others keep running."""
+        devices = self.config_entry.data[CONF_DEVICES]
+        if not devices:
+            return self.async_abort(reason="no_hub_devices")
+        if user_input is not None:
+            removed = set(user_input[CONF_DEVICES])
+            self._update_devices(
+                {mac: data for mac, data in devices.items() if mac not in removed}
+            )
+            return self.async_create_entry(data=dict(self.config_entry.options))
+
+        choices = {
+            mac: f"{data['device'].get('devName', mac)} ({data[CONF_HOST]})"
+            for mac, data in devices.items()
+        }
+        return self.async_show_form(
+            step_id="remove_device",
+            data_schema=vol.Schema(
+                {vol.Required(CONF_DEVICES): cv.multi_select(choices)}
+            ),
+        )
+
+    def _update_devices(self, devices: dict[str, Any]) -> None:
+        """Store a new device list; the hub applies it on the entry update."""
+        self.hass.config_entries.async_update_entry(
+            self.config_entry, data={**self.config_entry.data, CONF_DEVICES: devices}
+        )
 
 
 async def start_scan_device(host: str) -> dict | None:
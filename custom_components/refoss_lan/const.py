@@ -13,11 +13,43 @@ CONF_LOG_LEVEL = "log_level"
 LOG_LEVEL_DEFAULT = "WARNING"
 LOG_LEVEL_OPTIONS = ["DEBUG", "INFO", "WARNING", "ERROR"]
 
+CONF_TRACING = "tracing"
+# Poll on a shared background event loop instead of Home Assistant's
+CONF_IO_THREAD = "io_thread"
+# Import hourly energy statistics computed from the device counters
+CONF_IMPORT_STATISTICS = "import_statistics"
+
+# Hub entries: many devices under one entry, polled by one engine
+CONF_HUB = "hub"
+CONF_DEVICES = "devices"
+CONF_IMPORT_ENTRIES = "import_entries"
+HUB_UNIQUE_ID = "hub"
+# Seconds before retrying hub devices that could not be set up
+HUB_RETRY_INTERVAL = 60
+
 
 DOMAIN = "refoss_lan"
+DATA_IO_LOOP = f"{DOMAIN}_io_loop"
+DATA_LAG_PROBE = f"{DOMAIN}_lag_probe"
 
 MAX_ERRORS = 4
 
+# Locally integrated energy checkpoints (for firmware without energy counters)
+ENERGY_STORAGE_VERSION = 1
+ENERGY_SAVE_DELAY = 60
+
+# Services
+SERVICE_GET_HISTORY = "get_history"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+ATTR_MAC = "mac"
+ATTR_CHANNEL = "channel"
+ATTR_FIELD = "field"
+ATTR_START = "start"
+ATTR_END = "end"
+SERVICE_SET_SWITCHES = "set_switches"
+ATTR_CHANNELS = "channels"
+ATTR_STATE = "state"
+
 # Energy monitoring sensor type keys
 SENSOR_EM = "em"
 # New RPC protocol: Em.Status.Get values are in milli-units (mA, mV, mW; pf ×1000; kWh for energy)
@@ -3,22 +3,66 @@
 from __future__ import annotations
 
 import logging
+import time
 from datetime import timedelta
+from functools import partial
+from typing import TYPE_CHECKING, Any
 
 from .refoss_ha.controller.device import BaseDevice
 from .refoss_ha.exceptions import DeviceTimeoutError, RefossError
+from .refoss_ha.history import capacity_for
+from .refoss_ha.io_loop import IoLoop
+from .refoss_ha.request_queue import deadline
+from .refoss_ha.tracing import LoopLagProbe, Tracer, span
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .const import _LOGGER, DOMAIN, MAX_ERRORS, UPDATE_INTERVAL
+from .const import (
+    _LOGGER,
+    DOMAIN,
+    ENERGY_SAVE_DELAY,
+    ENERGY_STORAGE_VERSION,
+    MAX_ERRORS,
+    UPDATE_INTERVAL,
+)
 
-type RefossConfigEntry = ConfigEntry[RefossDataUpdateCoordinator]
+if TYPE_CHECKING:
+    from .hub import RefossHub
+    from .statistics import EnergyStatistics
 
+type RefossConfigEntry = ConfigEntry[RefossDataUpdateCoordinator | RefossHub]
 
-class RefossDataUpdateCoordinator(DataUpdateCoordinator[None]):
-    """Manages polling for state changes from the device."""
+
+def energy_storage_key(entry_id: str, mac: str | None = None) -> str:
+    """Return the storage key for the energy checkpoints of an entry's device.
+
+    Hub entries keep one store per device, keyed by its MAC address.
+    """
+    if mac is not None:
+        return f"{DOMAIN}.{entry_id}.{mac}.energy"
+    return f"{DOMAIN}.{entry_id}.energy"
+
+
+class RefossDataUpdateCoordinator(DataUpdateCoordinator[int]):
+    """Manages polling for state changes from the device.
+
+    The data is the device's :attr:`~BaseDevice.revision`, so listeners are
+    only updated after polls that changed something. Poll listeners (see
+    :meth:`async_add_poll_listener`) run after every poll instead.
+
+    Each poll runs under a deadline derived from the update interval (see
+    :meth:`~BaseDevice.poll_deadline`), shared by all of its requests, so a
+    slow device cannot stretch the polling cadence. Channels the poll does
+    not reach in time keep their last values and are marked stale.
+
+    The devices of a hub entry are given their ``update_interval`` and
+    ``storage_key`` and are not ``scheduled``: the hub's poll engine
+    refreshes them instead of a timer of their own.
+    """
 
     config_entry: ConfigEntry
 
@@ -28,38 +72,135 @@ class RefossDataUpdateCoordinator(DataUpdateCoordinator[None]):
         config_entry: ConfigEntry,
         device: BaseDevice,
         logger: logging.Logger | None = None,
+        update_interval: int | None = None,
+        storage_key: str | None = None,
+        scheduled: bool = True,
     ) -> None:
         """Initialize the data update coordinator."""
-        update_interval = config_entry.data.get(UPDATE_INTERVAL, 10)
+        if update_interval is None:
+            update_interval = config_entry.data.get(UPDATE_INTERVAL, 10)
         self._entry_logger = logger or _LOGGER
         super().__init__(
             hass,
             self._entry_logger,
             config_entry=config_entry,
             name=f"{DOMAIN}-{device.device_info.dev_name}",
-            update_interval=timedelta(seconds=update_interval),
+            update_interval=timedelta(seconds=update_interval) if scheduled else None,
+            always_update=False,
         )
         self.device = device
+        self.poll_interval = update_interval
         self._error_count = 0
+        self._poll_deadline = device.poll_deadline(update_interval)
+        # Allow a few missed polls before an interval counts as a data gap.
+        device.energy_max_gap = max(device.energy_max_gap, 3 * update_interval)
+        # Keep the same span of history whatever the poll interval.
+        device.history.resize(capacity_for(update_interval))
+        # Monthly counters restart at the start of a month in local time.
+        device.timezone = dt_util.get_default_time_zone()
+        self._energy_store: Store[dict[str, Any]] = Store(
+            hass,
+            ENERGY_STORAGE_VERSION,
+            storage_key or energy_storage_key(config_entry.entry_id),
+        )
+        # Shared background loop the device is polled on, if enabled.
+        self.io_loop: IoLoop | None = None
+        # Imports hourly energy statistics after each poll, if enabled.
+        self.statistics: EnergyStatistics | None = None
+        self.tracer = Tracer()
+        # Event-loop lag probe shared by all entries, set with the options.
+        self.lag_probe: LoopLagProbe | None = None
+        # Called after every poll, whether or not it changed anything.
+        self._poll_listeners: list[CALLBACK_TYPE] = []
+        # Optimistic and confirmed command results are pushed between polls.
+        device.register_update_callback(self.async_update_listeners)
+
+    def set_tracing(self, enabled: bool) -> None:
+        """Enable or disable poll tracing and the event-loop lag probe."""
+        self.tracer.enabled = enabled
+        if self.lag_probe is None:
+            return
+        if enabled:
+            self.lag_probe.add(self.tracer)
+        else:
+            self.lag_probe.remove(self.tracer)
 
-    async def _async_update_data(self) -> None:
-        """Update the state of the device."""
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh data, tracing the whole cycle when tracing is enabled."""
+        with self.tracer.trace(self.name):
+            await super()._async_refresh(*args, **kwargs)
+        for update_callback in list(self._poll_listeners):
+            update_callback()
+
+    @callback
+    def async_add_poll_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Call ``update_callback`` after every poll; return a remover.
+
+        For state that changes with every poll, such as the device's metrics,
+        which the revision-based listener updates would leave stale.
+        """
+        self._poll_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._poll_listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners."""
+        with span("entity_dispatch"):
+            super().async_update_listeners()
+
+    async def async_restore_energy(self) -> None:
+        """Restore locally integrated energy from the last checkpoint."""
+        if data := await self._energy_store.async_load():
+            self.device.restore_energy(data)
+
+    async def _async_update_data(self) -> int:
+        """Update the state of the device; return its revision."""
+        started = time.monotonic()
+        poll = self.device.async_handle_update
+        if self.io_loop is not None:
+            poll = partial(self.io_loop.async_poll, self.device)
         try:
-            await self.device.async_handle_update()
+            with deadline(self._poll_deadline):
+                polled = await self.device.queue.async_poll(poll)
+            if not polled:
+                self._entry_logger.debug("Previous poll still running; skipping")
+                return self.data
+            self._record_poll(started)
             self._update_success(True)
+            if self.statistics is not None:
+                await self.statistics.async_record(time.time())
+            if self.device.energy:
+                self._energy_store.async_delay_save(
+                    self.device.energy_checkpoint, ENERGY_SAVE_DELAY
+                )
+            return self.device.revision
         except DeviceTimeoutError as e:
+            self._record_poll(started)
             self._update_error_count()
             if self._error_count >= MAX_ERRORS:
                 self._update_success(False)
             self._entry_logger.debug("Device update timed out")
             raise UpdateFailed("Timeout") from e
         except RefossError as e:
+            self._record_poll(started)
             self._entry_logger.debug("Device connection error: %r", e)
             raise UpdateFailed("Device connect fail") from e
         except Exception as e:
+            self._record_poll(started)
             self._entry_logger.debug("Unexpected device update error: %r", e)
             raise UpdateFailed("Unexpected update error") from e
 
+    def _record_poll(self, started: float) -> None:
+        """Record the duration and schedule drift of a poll."""
+        self.device.metrics.record_poll(
+            started, time.monotonic() - started, self.poll_interval
+        )
+
     def _update_success(self, success: bool) -> None:
         """Update the success state."""
         self.last_update_success = success
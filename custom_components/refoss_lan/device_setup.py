@@ -0,0 +1,151 @@
+"""Per-device setup shared by device entries and hub entries."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+import logging
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
+
+from .const import (
+    _LOGGER,
+    CHANNEL_DISPLAY_NAME,
+    CONF_IMPORT_STATISTICS,
+    CONF_IO_THREAD,
+    CONF_LOG_LEVEL,
+    CONF_TRACING,
+    DATA_IO_LOOP,
+    DATA_LAG_PROBE,
+    DOMAIN,
+    LOG_LEVEL_DEFAULT,
+    LOG_LEVEL_OPTIONS,
+)
+from .coordinator import RefossDataUpdateCoordinator
+from .refoss_ha.controller.device import BaseDevice
+from .refoss_ha.device import DeviceInfo
+from .refoss_ha.device_manager import async_build_base_device, async_build_rpc_device
+from .refoss_ha.device_rpc import DeviceInfoRpc
+from .refoss_ha.io_loop import IoLoop
+from .refoss_ha.tracing import LoopLagProbe
+from .statistics import EnergyStatistics
+
+
+def get_entry_logger(config_entry: ConfigEntry) -> logging.Logger:
+    """Return the per-entry child logger for a config entry."""
+    return logging.getLogger(f"{_LOGGER.name}.{config_entry.entry_id}")
+
+
+def apply_log_level(config_entry: ConfigEntry) -> None:
+    """Apply the configured log level to the per-entry child logger."""
+    entry_logger = get_entry_logger(config_entry)
+    level_name = config_entry.options.get(CONF_LOG_LEVEL, LOG_LEVEL_DEFAULT)
+    if level_name not in LOG_LEVEL_OPTIONS:
+        _LOGGER.warning(
+            "Invalid log level '%s', falling back to %s", level_name, LOG_LEVEL_DEFAULT
+        )
+        level_name = LOG_LEVEL_DEFAULT
+    entry_logger.setLevel(getattr(logging, level_name))
+
+
+def _get_io_loop(hass: HomeAssistant) -> IoLoop:
+    """Return the background poll loop shared by all entries, starting it once."""
+    if (io_loop := hass.data.get(DATA_IO_LOOP)) is None:
+        io_loop = hass.data[DATA_IO_LOOP] = IoLoop()
+        io_loop.start()
+
+        async def _async_stop(event: Event) -> None:
+            await hass.async_add_executor_job(io_loop.stop)
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop)
+    return io_loop
+
+
+def _get_lag_probe(hass: HomeAssistant) -> LoopLagProbe:
+    """Return the event-loop lag probe shared by all entries."""
+    if (probe := hass.data.get(DATA_LAG_PROBE)) is None:
+        probe = hass.data[DATA_LAG_PROBE] = LoopLagProbe(hass.loop)
+    return probe
+
+
+def apply_options(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    coordinator: RefossDataUpdateCoordinator,
+) -> None:
+    """Apply the tracing and I/O thread options to a device's coordinator."""
+    coordinator.lag_probe = _get_lag_probe(hass)
+    coordinator.set_tracing(config_entry.options.get(CONF_TRACING, False))
+    if config_entry.options.get(CONF_IO_THREAD, False):
+        coordinator.io_loop = _get_io_loop(hass)
+    else:
+        coordinator.io_loop = None
+
+
+async def async_build_device(data: Mapping[str, Any]) -> BaseDevice:
+    """Build the controller of a device from its stored data.
+
+    Raises :class:`~.refoss_ha.exceptions.RefossError` if the device cannot
+    be reached.
+    """
+    raw_device = data["device"]
+    if raw_device.get("protocol", "lan") == "rpc":
+        base_device: BaseDevice = await async_build_rpc_device(
+            device_info=DeviceInfoRpc.from_dict(raw_device)
+        )
+    else:
+        base_device = await async_build_base_device(
+            device_info=DeviceInfo.from_dict(raw_device)
+        )
+    if phases := CHANNEL_DISPLAY_NAME.get(base_device.device_type):
+        # Channel labels start with their phase (A1, B1, ...).
+        base_device.enable_aggregates(
+            {channel: label[0].lower() for channel, label in phases.items()}
+        )
+    return base_device
+
+
+async def async_setup_coordinator(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    device: BaseDevice,
+    **kwargs: Any,
+) -> RefossDataUpdateCoordinator:
+    """Create a device's coordinator with the entry's options applied.
+
+    ``kwargs`` are passed to :class:`RefossDataUpdateCoordinator`. The
+    locally integrated energy is restored and, for multi-channel EM devices,
+    the parent device is registered so that the per-channel sub-devices can
+    reference it via ``via_device``.
+    """
+    coordinator = RefossDataUpdateCoordinator(
+        hass, config_entry, device, get_entry_logger(config_entry), **kwargs
+    )
+    apply_options(hass, config_entry, coordinator)
+    if config_entry.options.get(CONF_IMPORT_STATISTICS, False):
+        if "recorder" in hass.config.components:
+            coordinator.statistics = EnergyStatistics(hass, device)
+            await coordinator.statistics.async_load()
+        else:
+            _LOGGER.warning(
+                "Energy statistics import for %s needs the recorder", device.dev_name
+            )
+    await coordinator.async_restore_energy()
+
+    if device.device_type in CHANNEL_DISPLAY_NAME:
+        device_registry = dr.async_get(hass)
+        device_registry.async_get_or_create(
+            config_entry_id=config_entry.entry_id,
+            identifiers={(DOMAIN, device.mac)},
+            connections={(CONNECTION_NETWORK_MAC, device.mac)},
+            manufacturer="Refoss",
+            name=device.device_type,
+            model=device.device_type,
+            sw_version=device.fmware_version,
+            hw_version=device.hdware_version,
+        )
+    return coordinator
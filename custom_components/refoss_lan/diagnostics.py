@@ -7,7 +7,7 @@ from typing import Any
 from homeassistant.components.diagnostics import async_redact_data
 from homeassistant.core import HomeAssistant
 
-from .coordinator import RefossConfigEntry
+from .coordinator import RefossConfigEntry, RefossDataUpdateCoordinator
 from .refoss_ha.controller.electricity import ElectricityXMix
 from .refoss_ha.controller.em_rpc import EmRpcMix
 from .refoss_ha.controller.switch_rpc import SwitchRpcMix
@@ -20,7 +20,23 @@ async def async_get_config_entry_diagnostics(
     config_entry: RefossConfigEntry,
 ) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
-    coordinator = config_entry.runtime_data
+    runtime = config_entry.runtime_data
+    if isinstance(runtime, RefossDataUpdateCoordinator):
+        return async_redact_data(_device_diagnostics(runtime), TO_REDACT)
+    return async_redact_data(
+        {
+            "engine": runtime.engine.as_dict(),
+            "devices": [
+                _device_diagnostics(coordinator)
+                for coordinator in runtime.coordinators.values()
+            ],
+        },
+        TO_REDACT,
+    )
+
+
+def _device_diagnostics(coordinator: RefossDataUpdateCoordinator) -> dict[str, Any]:
+    """Return the diagnostics of one device."""
     device = coordinator.device
 
     device_info: dict[str, Any] = {
@@ -30,6 +46,7 @@ async def async_get_config_entry_diagnostics(
         "firmware_version": device.fmware_version,
         "hardware_version": device.hdware_version,
         "channels": device.channels,
+        "stale_channels": sorted(device.stale),
     }
 
     raw_data: dict[str, Any] = {}
@@ -39,11 +56,15 @@ async def async_get_config_entry_diagnostics(
         raw_data["em_status"] = device.em_status
     elif isinstance(device, SwitchRpcMix):
         raw_data["switch_status"] = device.switch_status
+    if device.aggregates is not None:
+        raw_data["aggregates"] = device.aggregates.as_dict()
 
-    return async_redact_data(
-        {
-            "device_info": device_info,
-            "raw_data": raw_data,
-        },
-        TO_REDACT,
-    )
+    return {
+        "device_info": device_info,
+        "raw_data": raw_data,
+        "integrated_energy": device.energy_checkpoint(),
+        "metrics": device.metrics.as_dict(),
+        "queue": device.queue.as_dict(),
+        "tracing": coordinator.tracer.as_dict(),
+        "io_loop": coordinator.io_loop.as_dict() if coordinator.io_loop else None,
+    }
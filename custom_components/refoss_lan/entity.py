@@ -1,12 +1,33 @@
 """Entity object for shared properties of refoss_lan entities."""
 
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import callback
 from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC, DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .coordinator import RefossDataUpdateCoordinator
+from .coordinator import RefossConfigEntry, RefossDataUpdateCoordinator
 from .const import DOMAIN
 
 
+@callback
+def async_setup_devices(
+    config_entry: RefossConfigEntry,
+    add_device: Callable[[RefossDataUpdateCoordinator], None],
+) -> None:
+    """Call ``add_device`` for the entry's device, or for each device of a hub.
+
+    Devices added to a hub later are passed to ``add_device`` when they are
+    set up.
+    """
+    runtime = config_entry.runtime_data
+    if isinstance(runtime, RefossDataUpdateCoordinator):
+        add_device(runtime)
+    else:
+        runtime.async_add_platform(add_device)
+
+
 class RefossEntity(CoordinatorEntity[RefossDataUpdateCoordinator]):
     """Refoss entity."""
 
@@ -48,3 +69,10 @@ class RefossEntity(CoordinatorEntity[RefossDataUpdateCoordinator]):
                 sw_version=coordinator.device.fmware_version,
                 hw_version=coordinator.device.hdware_version,
             )
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Flag a channel the last poll could not refresh."""
+        if self.channel in self.coordinator.device.stale:
+            return {"stale": True}
+        return None
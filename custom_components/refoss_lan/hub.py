@@ -0,0 +1,222 @@
+"""Hub entries: many devices under one config entry and one poll engine."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    _LOGGER,
+    CONF_DEVICES,
+    CONF_HUB,
+    DOMAIN,
+    ENERGY_STORAGE_VERSION,
+    HUB_RETRY_INTERVAL,
+    UPDATE_INTERVAL,
+)
+from .coordinator import RefossDataUpdateCoordinator, energy_storage_key
+from .device_setup import async_build_device, async_setup_coordinator
+from .refoss_ha.engine import PollEngine
+from .refoss_ha.exceptions import RefossError
+
+
+def device_mac(device_entry: dr.DeviceEntry) -> str | None:
+    """Return the MAC of the Refoss device a registry device belongs to.
+
+    Per-channel sub-devices are identified as ``<mac>_<channel>``.
+    """
+    for domain, identifier in device_entry.identifiers:
+        if domain == DOMAIN:
+            return identifier.split("_", 1)[0]
+    return None
+
+
+class RefossHub:
+    """The devices of a hub entry.
+
+    A hub entry lists its devices under ``devices`` in its data, keyed by
+    MAC address, each with the host, update interval and device data a
+    device entry would have. Every device gets a coordinator without a
+    timer of its own; one :class:`PollEngine` refreshes them all at their
+    intervals, and the platforms are forwarded once for the whole hub.
+
+    Editing the device list and calling :meth:`async_sync` sets up added
+    devices, removes removed ones and follows moved ones to their new host,
+    without touching the others. When a
+    device entry exists for an added device, its registry devices, entities
+    and energy checkpoints move to the hub and the device entry is removed.
+    Devices that cannot be reached are retried every
+    :data:`HUB_RETRY_INTERVAL` seconds.
+    """
+
+    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+        """Initialize a hub without devices."""
+        self.hass = hass
+        self.config_entry = config_entry
+        self.engine = PollEngine()
+        self.coordinators: dict[str, RefossDataUpdateCoordinator] = {}
+        self._platforms: list[Callable[[RefossDataUpdateCoordinator], None]] = []
+        self._lock = asyncio.Lock()
+        self._known: set[str] = set()
+        self._unreachable: set[str] = set()
+        self._unsub_retry: CALLBACK_TYPE | None = None
+
+    @property
+    def devices(self) -> dict[str, dict[str, Any]]:
+        """Return the stored data of the hub's devices, keyed by MAC."""
+        return self.config_entry.data.get(CONF_DEVICES, {})
+
+    @callback
+    def async_add_platform(
+        self, add_device: Callable[[RefossDataUpdateCoordinator], None]
+    ) -> None:
+        """Call ``add_device`` for every device now and for devices added later."""
+        self._platforms.append(add_device)
+        for coordinator in self.coordinators.values():
+            add_device(coordinator)
+
+    async def async_sync(self) -> None:
+        """Set up the devices added to the list and remove the removed ones."""
+        async with self._lock:
+            if self._unsub_retry is not None:
+                self._unsub_retry()
+                self._unsub_retry = None
+            devices = self.devices
+            for mac in self._known - set(devices):
+                await self._async_stop_device(mac)
+                await Store(
+                    self.hass,
+                    ENERGY_STORAGE_VERSION,
+                    energy_storage_key(self.config_entry.entry_id, mac),
+                ).async_remove()
+            self._known = set(devices)
+            self._remove_orphans()
+            for mac, coordinator in self.coordinators.items():
+                device_info = coordinator.device.device_info
+                if device_info.inner_ip != devices[mac][CONF_HOST]:
+                    # Moved to a new address; keep polling it there.
+                    device_info.inner_ip = devices[mac][CONF_HOST]
+                    device_info.forget_responses()
+
+            added = [mac for mac in devices if mac not in self.coordinators]
+            for mac in added:
+                await self._async_adopt_entry(mac)
+            await asyncio.gather(
+                *(self._async_add_device(mac, devices[mac]) for mac in added)
+            )
+            if len(self.coordinators) < len(devices):
+                self._unsub_retry = async_call_later(
+                    self.hass, HUB_RETRY_INTERVAL, self._async_retry
+                )
+
+    @callback
+    def _async_retry(self, _now: datetime) -> None:
+        """Retry the devices that could not be set up."""
+        self._unsub_retry = None
+        self.config_entry.async_create_background_task(
+            self.hass, self.async_sync(), f"{DOMAIN} hub retry"
+        )
+
+    async def _async_add_device(self, mac: str, data: dict[str, Any]) -> None:
+        """Set up one device."""
+        name = data["device"].get("devName", mac)
+        try:
+            device = await async_build_device(data)
+        except RefossError as err:
+            log = _LOGGER.debug if mac in self._unreachable else _LOGGER.warning
+            log(
+                "Cannot set up %s (%s), retrying later: %r", name, data[CONF_HOST], err
+            )
+            self._unreachable.add(mac)
+            return
+        except Exception:
+            _LOGGER.exception("Unexpected error setting up %s", name)
+            return
+        self._unreachable.discard(mac)
+        coordinator = await async_setup_coordinator(
+            self.hass,
+            self.config_entry,
+            device,
+            update_interval=data.get(UPDATE_INTERVAL, 10),
+            storage_key=energy_storage_key(self.config_entry.entry_id, mac),
+            scheduled=False,
+        )
+        await coordinator.async_refresh()
+        self.coordinators[mac] = coordinator
+        self.engine.add(mac, coordinator.poll_interval, coordinator.async_refresh)
+        for add_device in self._platforms:
+            add_device(coordinator)
+
+    async def _async_stop_device(self, mac: str) -> None:
+        """Stop polling a device and shut its coordinator down."""
+        self.engine.remove(mac)
+        self._unreachable.discard(mac)
+        if (coordinator := self.coordinators.pop(mac, None)) is not None:
+            coordinator.set_tracing(False)
+            await coordinator.async_shutdown()
+
+    @callback
+    def _remove_orphans(self) -> None:
+        """Detach registry devices (and their entities) of devices not in the list."""
+        entry_id = self.config_entry.entry_id
+        device_registry = dr.async_get(self.hass)
+        for device_entry in dr.async_entries_for_config_entry(device_registry, entry_id):
+            if device_mac(device_entry) not in self.devices:
+                device_registry.async_update_device(
+                    device_entry.id, remove_config_entry_id=entry_id
+                )
+
+    async def _async_adopt_entry(self, mac: str) -> None:
+        """Move a device entry of ``mac`` into the hub and remove the entry."""
+        entry = next(
+            (
+                entry
+                for entry in self.hass.config_entries.async_entries(DOMAIN)
+                if entry.unique_id == mac and not entry.data.get(CONF_HUB)
+            ),
+            None,
+        )
+        if entry is None:
+            return
+        hub_id = self.config_entry.entry_id
+        device_registry = dr.async_get(self.hass)
+        for device_entry in dr.async_entries_for_config_entry(
+            device_registry, entry.entry_id
+        ):
+            device_registry.async_update_device(
+                device_entry.id, add_config_entry_id=hub_id
+            )
+        entity_registry = er.async_get(self.hass)
+        for entity_entry in er.async_entries_for_config_entry(
+            entity_registry, entry.entry_id
+        ):
+            entity_registry.async_update_entity(
+                entity_entry.entity_id, config_entry_id=hub_id
+            )
+        energy = await Store(
+            self.hass, ENERGY_STORAGE_VERSION, energy_storage_key(entry.entry_id)
+        ).async_load()
+        if energy:
+            await Store(
+                self.hass, ENERGY_STORAGE_VERSION, energy_storage_key(hub_id, mac)
+            ).async_save(energy)
+        _LOGGER.info("Moving %s into the Refoss LAN hub", entry.title)
+        await self.hass.config_entries.async_remove(entry.entry_id)
+
+    async def async_unload(self) -> None:
+        """Stop retrying and shut the device coordinators down."""
+        if self._unsub_retry is not None:
+            self._unsub_retry()
+            self._unsub_retry = None
+        for coordinator in self.coordinators.values():
+            coordinator.set_tracing(False)
+            await coordinator.async_shutdown()
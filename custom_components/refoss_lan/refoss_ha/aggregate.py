@@ -0,0 +1,83 @@
+"""Per-phase and whole-device aggregates of energy-monitor channels."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+
+from .state import ChannelStateStore
+
+# The aggregates live in a single row of their own store.
+AGGREGATE_ROW = 0
+
+
+class PhaseAggregates:
+    """Sums of channel readings per phase and for the whole device.
+
+    Computed once per poll by the EM controllers from the same readings they
+    store per channel, so the aggregates change together with their inputs.
+    Units are those of the readings (mW and mA on all EM models). Fields:
+
+    - ``power_<phase>`` and ``current_<phase>``: sums over the phase's channels;
+    - ``power``: sum over all channels;
+    - ``import_power`` / ``export_power``: the positive and negative part of
+      ``power``;
+    - ``imbalance``: largest deviation of a phase current from the mean of
+      the phase currents, in percent of that mean.
+
+    A sum is *None* when none of its channels reported the field.
+    """
+
+    def __init__(self, phases: Mapping[int, str]) -> None:
+        """Initialize from a channel to phase name mapping."""
+        self.phases: tuple[str, ...] = tuple(sorted(set(phases.values())))
+        self._phase_of = dict(phases)
+        fields = ["power", "import_power", "export_power", "imbalance"]
+        for phase in self.phases:
+            fields += [f"power_{phase}", f"current_{phase}"]
+        self.state = ChannelStateStore(fields, [AGGREGATE_ROW])
+
+    def get(self, field: str):
+        """Return an aggregate value, or *None*."""
+        return self.state.get(AGGREGATE_ROW, field)
+
+    def update(self, readings: Iterable[tuple[int, float | None, float | None]]) -> bool:
+        """Recompute from ``(channel, power, current)`` readings of one poll.
+
+        Returns *True* if any aggregate changed.
+        """
+        power: dict[str, float] = {}
+        current: dict[str, float] = {}
+        for channel, channel_power, channel_current in readings:
+            phase = self._phase_of.get(channel)
+            if phase is None:
+                continue
+            if channel_power is not None:
+                power[phase] = power.get(phase, 0) + channel_power
+            if channel_current is not None:
+                current[phase] = current.get(phase, 0) + channel_current
+        values: dict[str, float | None] = {}
+        for phase in self.phases:
+            values[f"power_{phase}"] = power.get(phase)
+            values[f"current_{phase}"] = current.get(phase)
+        if power:
+            total = sum(power.values())
+            values["power"] = total
+            values["import_power"] = max(total, 0)
+            values["export_power"] = max(-total, 0)
+        values["imbalance"] = _imbalance(current.values())
+        return self.state.update(AGGREGATE_ROW, values)
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the known aggregates (for diagnostics)."""
+        return self.state.row(AGGREGATE_ROW)
+
+
+def _imbalance(currents: Iterable[float]) -> float | None:
+    """Return the maximum deviation from the mean in percent of the mean."""
+    values = list(currents)
+    if len(values) < 2:
+        return None
+    mean = sum(values) / len(values)
+    if mean <= 0:
+        return None
+    return max(abs(value - mean) for value in values) / mean * 100.0
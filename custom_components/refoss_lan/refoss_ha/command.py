@@ -0,0 +1,125 @@
+"""Optimistic, collapsing command pipeline for switch channels."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+import logging
+
+from .exceptions import RefossError
+from .request_queue import Priority, priority
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CommandPipeline:
+    """Send on/off commands per channel with optimistic state.
+
+    :meth:`async_set_many` applies the requested states at once and notifies
+    listeners, then hands the channels to one worker, which sends them with
+    a single ``send`` call. While a worker owns a channel, further commands
+    for it only replace the desired state, so any number of rapid taps
+    results in at most one follow-up request carrying the final state. Once
+    the device has acknowledged the final states the worker reads those
+    channels back and applies what the device reports. If sending fails the
+    channels are rolled back to their last acknowledged state and the error
+    is raised to every waiting caller; a channel the device acknowledged
+    before the failure keeps its new state. Commands and readbacks go ahead of
+    queued polls (see :class:`.request_queue.RequestQueue`).
+    """
+
+    def __init__(
+        self,
+        send: Callable[[dict[int, bool], Callable[[int], None]], Awaitable[None]],
+        readback: Callable[[list[int]], Awaitable[dict[int, bool]]],
+        get_state: Callable[[int], bool | None],
+        set_state: Callable[[int, bool | None], None],
+        notify: Callable[[], None],
+    ) -> None:
+        """Initialize the pipeline with the controller's primitives.
+
+        ``send`` sets several channels, calls its second argument with each
+        channel the device acknowledged and raises on failure; ``readback``
+        returns the states reported by the device for the given channels.
+        """
+        self._send = send
+        self._readback = readback
+        self._get_state = get_state
+        self._set_state = set_state
+        self._notify = notify
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+        self._desired: dict[int, bool] = {}
+        self._confirmed: dict[int, bool | None] = {}
+
+    def pending(self, channel: int) -> bool:
+        """Return *True* while a command for the channel is being processed."""
+        return channel in self._tasks
+
+    async def async_set(self, channel: int, on: bool) -> None:
+        """Request one channel state and wait until it is confirmed or failed."""
+        await self.async_set_many({channel: on})
+
+    async def async_set_many(self, states: dict[int, bool]) -> None:
+        """Request several channel states and wait until all are settled."""
+        waits = {self._tasks[ch] for ch in states if ch in self._tasks}
+        new = [ch for ch in states if ch not in self._tasks]
+        for channel in new:
+            self._confirmed[channel] = self._get_state(channel)
+        for channel, on in states.items():
+            self._desired[channel] = on
+            self._set_state(channel, on)
+        self._notify()
+        if new:
+            task = asyncio.get_running_loop().create_task(self._run(new))
+            for channel in new:
+                self._tasks[channel] = task
+            waits.add(task)
+        # A caller giving up must not cancel the command for the others.
+        await asyncio.shield(asyncio.gather(*waits))
+
+    def _changed(self, channels: Iterable[int]) -> dict[int, bool]:
+        """Return the channels whose desired state differs from the acknowledged one."""
+        desired = self._desired
+        confirmed = self._confirmed
+        return {ch: desired[ch] for ch in channels if desired[ch] != confirmed[ch]}
+
+    async def _run(self, channels: list[int]) -> None:
+        """Send desired states until they stop changing, then confirm them."""
+        targets = {ch: self._desired[ch] for ch in channels}
+        actual: dict[int, bool] = {}
+
+        def acknowledge(channel: int) -> None:
+            self._confirmed[channel] = targets[channel]
+
+        try:
+            while True:
+                if targets:
+                    with priority(Priority.COMMAND):
+                        await self._send(targets, acknowledge)
+                    self._confirmed.update(targets)
+                if targets := self._changed(channels):
+                    continue
+                try:
+                    with priority(Priority.READBACK):
+                        actual = await self._readback(channels)
+                except RefossError as err:
+                    # The commands were acknowledged; keep the requested states.
+                    _LOGGER.debug("Readback of channels %s failed: %r", channels, err)
+                    actual = {}
+                if not (targets := self._changed(channels)):
+                    break
+            for channel in channels:
+                reported = actual.get(channel)
+                self._set_state(
+                    channel, self._confirmed[channel] if reported is None else reported
+                )
+        except BaseException:
+            for channel in channels:
+                self._set_state(channel, self._confirmed[channel])
+            raise
+        finally:
+            for channel in channels:
+                del self._tasks[channel]
+                del self._desired[channel]
+                del self._confirmed[channel]
+            self._notify()
@@ -0,0 +1,51 @@
+"""ConsumptionXMix."""
+
+from datetime import datetime
+import logging
+
+from ..enums import Namespace
+from .device import BaseDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+# Entries without a channel describe the whole device.
+DEVICE_CHANNEL = 0
+
+
+class ConsumptionXMix(BaseDevice):
+    """A device keeping daily consumption history."""
+
+    async def async_get_consumption(self) -> dict[int, list[tuple[float, float]]]:
+        """Read the daily consumption history of all channels in one request.
+
+        Returns ``(midnight timestamp, Wh)`` pairs per channel, oldest first;
+        the dates are taken as days of :attr:`timezone` (local time if
+        *None*). The history is not polled; it is read on demand, e.g. to fill
+        a gap in the energy statistics.
+        """
+        res = await self.async_execute_cmd(
+            device_uuid=self.uuid,
+            method="GET",
+            namespace=Namespace.CONTROL_CONSUMPTIONX,
+            payload={"consumptionx": {"channel": 65535}},
+        )
+        if res is None:
+            return {}
+        days: dict[int, list[tuple[float, float]]] = {}
+        for entry in res.get("payload", {}).get("consumptionx", []):
+            try:
+                day = (
+                    datetime.strptime(entry["date"], "%Y-%m-%d")
+                    .replace(tzinfo=self.timezone)
+                    .timestamp()
+                )
+                value = float(entry["value"])
+            except (KeyError, TypeError, ValueError):
+                _LOGGER.debug(
+                    "%s: skipping consumption entry %s", self.dev_name, entry
+                )
+                continue
+            days.setdefault(entry.get("channel", DEVICE_CHANNEL), []).append((day, value))
+        for history in days.values():
+            history.sort()
+        return days
@@ -2,30 +2,62 @@
 
 from __future__ import annotations
 
+from collections.abc import AsyncIterator, Callable, Iterable
+from copy import copy
+from datetime import tzinfo
 import json
 import logging
+import time
+from typing import NamedTuple
 
+from ..aggregate import PhaseAggregates
 from ..enums import Namespace
 from ..device import DeviceInfo
+from ..energy import DEFAULT_MAX_GAP, EnergyIntegrator
+from ..exceptions import DeviceTimeoutError
+from ..history import ReadingHistory
+from ..metrics import DeviceMetrics
+from ..util import NOT_MODIFIED
+from ..request_queue import RequestQueue
+from ..state import FieldCallback, Subscriptions, defer
+from ..stream import PollStream, Snapshot
 
 _LOGGER = logging.getLogger(__name__)
 
+# Share of the poll interval a poll may take before it is cut short.
+POLL_DEADLINE_FACTOR = 0.8
+
+# Consecutive failed Appliance.Control.Multiple requests after which polls
+# read each namespace on its own, and for how long (seconds) before the
+# batch is tried again.
+MULTIPLE_MAX_FAILURES = 3
+MULTIPLE_RETRY_AFTER = 3600.0
+
+
+class PollRequest(NamedTuple):
+    """A legacy namespace read issued on every poll.
+
+    ``handler`` receives the response payload and the time the request was
+    started, and returns the channels the payload refreshed. ``unchanged``,
+    if set, is called with that time instead when the response is identical
+    to the previous one, and returns *True* if it still changed state.
+    """
+
+    namespace: Namespace
+    payload: dict
+    handler: Callable[[dict, float], Iterable[int]]
+    unchanged: Callable[[float], bool] | None = None
+
 
 class BaseDevice:
     """ "BaseDevice."""
 
+    # Timeout of a poll request when no deadline shortens it.
+    request_timeout = 5
+
     def __init__(self, device_info: DeviceInfo):
         """Construct BaseDevice."""
         self.device_info = device_info
-        self.uuid = device_info.uuid
-        self.dev_name = device_info.dev_name
-        self.device_type = device_info.device_type
-        self.fmware_version = device_info.fmware_version
-        self.hdware_version = device_info.hdware_version
-        self.inner_ip = device_info.inner_ip
-        self.port = device_info.port
-        self.mac = device_info.mac
-        self.sub_type = device_info.sub_type
         raw_channels = (
             device_info.channels
             if isinstance(device_info.channels, list)
@@ -45,9 +77,363 @@ class BaseDevice:
                 self.channels.append(int(ch))
         else:
             self.channels = [int(c) for c in raw_channels] if raw_channels else []
+        # Recent readings of every channel, fed by the controllers on each poll.
+        self.history = ReadingHistory()
+        # channel → integrator, created for channels whose firmware omits energy counters
+        self.energy: dict[int, EnergyIntegrator] = {}
+        self.energy_max_gap = DEFAULT_MAX_GAP
+        # Time zone of the calendar the device's counters follow; local if None.
+        self.timezone: tzinfo | None = None
+        # Phase and device totals, computed by EM controllers once enabled.
+        self.aggregates: PhaseAggregates | None = None
+        # Increases with every poll that changed state; unchanged responses
+        # leave it alone.
+        self.revision = 0
+        # Channels whose last values were not refreshed by the latest poll,
+        # because its deadline passed or their read failed.
+        self.stale: set[int] = set()
+        self._update_callbacks: list[Callable[[], None]] = []
+        # Field-level change callbacks, fed by the controllers' state.
+        self.subscriptions = Subscriptions()
+        self._stream: PollStream | None = None
+        self._multiple_supported = (
+            Namespace.CONTROL_MULTIPLE.value in self.abilities
+        )
+        # Failed batches in a row, and the monotonic time before which polls
+        # do not batch after the firmware rejected or kept failing them.
+        self._multiple_failures = 0
+        self._multiple_retry_at = 0.0
+
+    # Identity fields are read through from device_info rather than copied.
+
+    @property
+    def uuid(self) -> str:
+        """Return the device uuid."""
+        return self.device_info.uuid
+
+    @property
+    def dev_name(self) -> str:
+        """Return the device name."""
+        return self.device_info.dev_name
+
+    @property
+    def device_type(self) -> str:
+        """Return the device model."""
+        return self.device_info.device_type
+
+    @property
+    def fmware_version(self) -> str:
+        """Return the firmware version."""
+        return self.device_info.fmware_version
+
+    @property
+    def hdware_version(self) -> str:
+        """Return the hardware version."""
+        return self.device_info.hdware_version
+
+    @property
+    def inner_ip(self) -> str:
+        """Return the device IP address."""
+        return self.device_info.inner_ip
+
+    @property
+    def port(self) -> str:
+        """Return the device port."""
+        return self.device_info.port
+
+    @property
+    def mac(self) -> str:
+        """Return the device MAC address."""
+        return self.device_info.mac
+
+    @property
+    def sub_type(self) -> str:
+        """Return the device sub type."""
+        return self.device_info.sub_type
+
+    @property
+    def metrics(self) -> DeviceMetrics:
+        """Return the request and poll metrics of the device."""
+        return self.device_info.metrics
+
+    @property
+    def queue(self) -> RequestQueue:
+        """Return the queue all requests to the device go through."""
+        return self.device_info.queue
+
+    def poll_deadline(self, interval: float) -> float:
+        """Return how long a poll repeated every ``interval`` seconds may take.
+
+        This is :data:`POLL_DEADLINE_FACTOR` of the interval, but never less
+        than one request timeout, so a short interval does not fail requests
+        that would succeed on their own.
+        """
+        return max(interval * POLL_DEADLINE_FACTOR, self.request_timeout)
+
+    def enable_aggregates(self, phases: dict[int, str]) -> PhaseAggregates:
+        """Compute phase and device aggregates on every poll; return them.
+
+        ``phases`` maps each channel to the name of its phase.
+        """
+        if self.aggregates is None:
+            self.aggregates = PhaseAggregates(phases)
+            # Compute them from the next poll even if nothing changed.
+            self.device_info.forget_responses()
+        return self.aggregates
+
+    def register_update_callback(
+        self, callback: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Call ``callback`` when state changes outside a poll; return a remover."""
+        self._update_callbacks.append(callback)
+        return lambda: self._update_callbacks.remove(callback)
+
+    def subscribe(
+        self, channel: int | None, field: str | None, callback: FieldCallback
+    ) -> Callable[[], None]:
+        """Call ``callback(channel, field, value)`` when a field's value changes.
+
+        ``channel`` or ``field`` of *None* matches every channel or field, so
+        ``subscribe(None, "power", cb)`` follows power on all channels and
+        ``subscribe(1, None, cb)`` every field of channel 1. Fields are named
+        as in :meth:`channel_status`. Callbacks run when a response or command
+        result is applied, only for values that changed. Returns a function
+        that removes the subscription.
+        """
+        return self.subscriptions.subscribe(channel, field, callback)
+
+    def _notify_update(self) -> None:
+        """Run the registered update callbacks."""
+        for callback in list(self._update_callbacks):
+            callback()
+
+    def channel_status(self) -> dict[int, dict]:
+        """Return the fields of every channel as plain dicts; mixins extend this."""
+        return {}
+
+    def stream(self, interval: float) -> AsyncIterator[Snapshot]:
+        """Poll the device and yield a :class:`Snapshot` every ``interval`` seconds.
+
+        All streams of a device share one poll loop (see :class:`PollStream`),
+        which stops when the last of them is closed. A consumer that falls
+        behind skips snapshots instead of queueing them. Close the iterator
+        (e.g. with :func:`contextlib.aclosing`) when leaving the loop early.
+        """
+        if self._stream is None:
+            self._stream = PollStream(self)
+        return self._stream.subscribe(interval)
+
+    @property
+    def abilities(self) -> dict:
+        """Return the abilities the controller type was built from."""
+        return getattr(self, "_abilities_spec", {})
+
+    def _poll_requests(self) -> list[PollRequest]:
+        """Return the namespace reads of one poll; mixins extend this."""
+        return []
 
     async def async_handle_update(self):
-        """update device state."""
+        """Poll every namespace, in one batched request where supported."""
+        requests = self._poll_requests()
+        if not requests:
+            return
+        total = len(requests)
+        # Channels refreshed by a response of this poll.
+        refreshed: set[int] = set()
+        if (
+            total > 1
+            and self._multiple_supported
+            and time.monotonic() >= self._multiple_retry_at
+        ):
+            requests = await self._async_poll_multiple(requests, refreshed)
+        for index, request in enumerate(requests):
+            started = time.time()
+            try:
+                res = await self.async_execute_cmd(
+                    device_uuid=self.uuid,
+                    method="GET",
+                    namespace=request.namespace,
+                    payload=request.payload,
+                    skip_unchanged=True,
+                    timeout=self.request_timeout,
+                )
+            except DeviceTimeoutError:
+                if index == 0 and len(requests) == total:
+                    raise
+                self._set_stale(refreshed, False)
+                self._cut_short(
+                    [channel for channel in self.channels if channel not in refreshed]
+                )
+                return
+            if res is NOT_MODIFIED:
+                self._poll_unchanged(request, started)
+                refreshed.update(self.channels)
+            elif res is not None:
+                refreshed.update(request.handler(res.get("payload", {}), started))
+                self._bump_revision()
+        self._set_stale(self.channels, False)
+
+    async def _async_poll_multiple(
+        self, requests: list[PollRequest], refreshed: set[int]
+    ) -> list[PollRequest]:
+        """Send all reads in one Appliance.Control.Multiple request.
+
+        Returns the requests that still have to be sent on their own: all of
+        them if the batch failed, otherwise any the batch response did not
+        answer. The channels the answers refreshed are added to
+        ``refreshed``. A timeout is raised to the caller like that of any
+        other poll request and does not count as a failed batch.
+        """
+        started = time.time()
+        res = await self.async_execute_cmd(
+            device_uuid=self.uuid,
+            method="SET",
+            namespace=Namespace.CONTROL_MULTIPLE,
+            payload={
+                "multiple": [
+                    self.device_info.build_message(
+                        "GET", request.namespace, request.payload, self.uuid
+                    )[0]
+                    for request in requests
+                ]
+            },
+            skip_unchanged=True,
+            timeout=self.request_timeout,
+        )
+        if res is NOT_MODIFIED:
+            for request in requests:
+                self._poll_unchanged(request, started)
+            refreshed.update(self.channels)
+            return []
+        items = (res or {}).get("payload", {}).get("multiple")
+        if not isinstance(items, list):
+            # An acknowledged batch without answers is an explicit rejection;
+            # no response at all may be a transient failure.
+            defer(self._multiple_failed, res is not None)
+            return requests
+        if self._multiple_failures:
+            defer(setattr, self, "_multiple_failures", 0)
+        answers = {
+            item.get("header", {}).get("namespace"): item.get("payload", {})
+            for item in items
+            if item.get("header", {}).get("method") == "GETACK"
+        }
+        remaining = []
+        for request in requests:
+            data = answers.get(request.namespace.value)
+            if data is None:
+                remaining.append(request)
+            else:
+                refreshed.update(request.handler(data, started))
+        if answers:
+            self._bump_revision()
+        return remaining
+
+    def _multiple_failed(self, rejected: bool) -> None:
+        """Count a failed batch; stop batching for a while if it keeps failing."""
+        self._multiple_failures += 1
+        if not rejected and self._multiple_failures < MULTIPLE_MAX_FAILURES:
+            return
+        _LOGGER.debug(
+            "%s: %s %s; polling namespaces separately for %d s",
+            self.inner_ip,
+            Namespace.CONTROL_MULTIPLE.value,
+            "rejected" if rejected else "failed repeatedly",
+            MULTIPLE_RETRY_AFTER,
+        )
+        self._multiple_failures = 0
+        self._multiple_retry_at = time.monotonic() + MULTIPLE_RETRY_AFTER
+
+    def _poll_unchanged(self, request: PollRequest, started: float) -> None:
+        """Handle a poll response identical to the previous one."""
+        if request.unchanged is not None and request.unchanged(started):
+            self._bump_revision()
+
+    def _cut_short(self, channels: Iterable[int]) -> None:
+        """Keep the last values of the channels a timed-out poll did not reach."""
+        channels = list(channels)
+        _LOGGER.debug(
+            "%s: poll timed out; channels %s keep their last values",
+            self.inner_ip,
+            channels,
+        )
+        defer(self.metrics.record_cut_poll)
+        self._set_stale(channels, True)
+
+    # Polls may run on another thread (see :mod:`..io_loop`). They write the
+    # state read by the caller's loop (revision, stale channels, energy,
+    # history, metrics) through :func:`..state.defer`, so the writes are
+    # applied on that loop together with the poll's other state changes.
+
+    def _bump_revision(self) -> None:
+        """Count a state change made by the current poll."""
+        defer(self._increment_revision)
+
+    def _increment_revision(self) -> None:
+        """Apply :meth:`_bump_revision`."""
+        self.revision += 1
+
+    def _set_stale(self, channels: Iterable[int], stale: bool) -> None:
+        """Mark channels stale or refreshed; a change bumps the revision."""
+        defer(self._apply_stale, tuple(channels), stale)
+
+    def _apply_stale(self, channels: tuple[int, ...], stale: bool) -> None:
+        """Apply :meth:`_set_stale`."""
+        before = len(self.stale)
+        if stale:
+            self.stale.update(channels)
+        else:
+            self.stale.difference_update(channels)
+        if len(self.stale) != before:
+            self.revision += 1
+
+    def _integrate_energy(
+        self, channel: int, ts: float, power_w: float
+    ) -> EnergyIntegrator:
+        """Feed a power sample to the channel's integrator and return it.
+
+        The sample is added to a copy, which replaces the integrator with
+        the poll's other state writes.
+        """
+        integrator = self.energy.get(channel)
+        if integrator is None:
+            integrator = EnergyIntegrator(self.timezone)
+        else:
+            integrator = copy(integrator)
+        integrator.add(ts, power_w, self.energy_max_gap)
+        defer(self.energy.__setitem__, channel, integrator)
+        return integrator
+
+    def _extend_energy(
+        self, ts: float, channels: list[int] | None = None
+    ) -> dict[int, EnergyIntegrator]:
+        """Continue integrating at the last power after an unchanged reading.
+
+        Returns the integrators of the channels whose whole Wh changed.
+        """
+        changed = {}
+        for channel, integrator in list(self.energy.items()):
+            if channels is not None and channel not in channels:
+                continue
+            integrator = copy(integrator)
+            if integrator.extend(ts, self.energy_max_gap):
+                changed[channel] = integrator
+            defer(self.energy.__setitem__, channel, integrator)
+        return changed
+
+    def energy_checkpoint(self) -> dict[str, dict]:
+        """Return the integrator state of all channels, keyed by channel."""
+        return {
+            str(channel): integrator.checkpoint()
+            for channel, integrator in self.energy.items()
+        }
+
+    def restore_energy(self, data: dict[str, dict]) -> None:
+        """Restore integrators from :meth:`energy_checkpoint` output."""
+        for channel, checkpoint in data.items():
+            integrator = EnergyIntegrator(self.timezone)
+            integrator.restore(checkpoint)
+            self.energy[int(channel)] = integrator
 
     async def async_execute_cmd(
         self,
@@ -56,6 +442,7 @@ class BaseDevice:
         namespace: Namespace | str,
         payload: dict,
         timeout: int = 5,
+        skip_unchanged: bool = False,
     ):
         """Execute command."""
         res = await self.device_info.async_execute_cmd(
@@ -64,5 +451,6 @@ class BaseDevice:
             namespace=namespace,
             payload=payload,
             timeout=timeout,
+            skip_unchanged=skip_unchanged,
         )
         return res
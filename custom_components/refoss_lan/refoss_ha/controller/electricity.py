@@ -1,78 +1,175 @@
 """ElectricityXMix."""
 
 import logging
+import time
 
 from ..enums import Namespace
 from ..device import DeviceInfo
-from .device import BaseDevice
+from ..state import ChannelStateStore, defer
+from ..tracing import span
+from .device import BaseDevice, PollRequest
 
 _LOGGER = logging.getLogger(__name__)
 
 # Fields that the old LAN protocol *may* include but often omits on EM06/EM16.
 _OPTIONAL_ELECTRICITY_KEYS = {"factor", "mConsume"}
 
+# Fields kept per channel; everything else in the response is dropped.
+# mReturned is derived: the exported Wh this month (see _returned_energy).
+ELECTRICITY_FIELDS = (
+    "power",
+    "voltage",
+    "current",
+    "factor",
+    "mConsume",
+    "mReturned",
+    "today",
+    "week",
+)
+
+
+def _returned_energy(consumed: int | None) -> int | None:
+    """Return the exported Wh of a device counter that nets export into mConsume."""
+    if consumed is None:
+        return None
+    return -consumed if consumed < 0 else 0
+
 
 class ElectricityXMix(BaseDevice):
     """A device."""
 
     def __init__(self, device: DeviceInfo):
         """Initialize."""
-        self.device = device
-        self.electricity_status = {}
         self._electricity_keys_logged = False
+        # Channel entries of the last decoded response, re-recorded into the
+        # history while the device keeps sending the same one.
+        self._last_electricity: list[dict] = []
         super().__init__(device)
+        self.electricity_state = ChannelStateStore(
+            ELECTRICITY_FIELDS, self.channels, self.subscriptions
+        )
+
+    @property
+    def electricity_status(self) -> dict[int, dict]:
+        """Return the per-channel status as plain dicts."""
+        return self.electricity_state.as_dict()
+
+    def channel_status(self) -> dict[int, dict]:
+        """Return the fields of every channel."""
+        status = super().channel_status()
+        for channel, row in self.electricity_status.items():
+            status.setdefault(channel, {}).update(row)
+        return status
 
     def get_value(self, channel: int, subkey: str):
         """
         Returns the value for the given channel and subkey, or None if not found.
         """
-        channel_status = self.electricity_status.get(channel, None)
-        if channel_status is not None and subkey in channel_status:
-            return channel_status.get(subkey, None)
-        return None
+        return self.electricity_state.get(channel, subkey)
 
-    async def async_handle_update(self):
-        """Update device state,65535 get all channel."""
+    def _poll_requests(self) -> list[PollRequest]:
+        """Read all channels (65535) of ElectricityX on every poll."""
+        return [
+            *super()._poll_requests(),
+            PollRequest(
+                Namespace.CONTROL_ELECTRICITYX,
+                {"electricity": {"channel": 65535}},
+                self._apply_electricity,
+                self._electricity_unchanged,
+            ),
+        ]
 
-        payload = {"electricity": {"channel": 65535}}
-        res = await self.async_execute_cmd(
-            device_uuid=self.uuid,
-            method="GET",
-            namespace=Namespace.CONTROL_ELECTRICITYX,
-            payload=payload,
-        )
-        if res is not None:
-            data = res.get("payload", {})
-            payload = data.get("electricity")
-            if payload is None:
-                _LOGGER.debug(
-                    "%s could not find 'electricity' attribute in push notification data",
-                    data,
-                )
+    def _electricity_unchanged(self, started: float) -> bool:
+        """Advance locally integrated energy after an unchanged response.
+
+        The unchanged readings are recorded into the history again.
+        """
+        now = (started + time.time()) / 2
+        changed = self._extend_energy(now)
+        entries = []
+        for state in self._last_electricity:
+            channel = state["channel"]
+            if channel in changed:
+                integrator = changed[channel]
+                state["mConsume"] = integrator.published
+                state["mReturned"] = integrator.exported
+                self.electricity_state.set(channel, "mConsume", integrator.published)
+                self.electricity_state.set(channel, "mReturned", integrator.exported)
+            entries.append((channel, state))
+        defer(self.history.record_entries, now, entries, ELECTRICITY_FIELDS)
+        return bool(changed)
 
-            elif isinstance(payload, list):
+    def _apply_electricity(self, data: dict, started: float) -> list[int]:
+        """Apply an ElectricityX GET response payload; return the channels it covered."""
+        payload = data.get("electricity")
+        if payload is None:
+            _LOGGER.debug(
+                "%s could not find 'electricity' attribute in push notification data",
+                data,
+            )
+
+        elif isinstance(payload, list):
+            # Sample time is the midpoint of the request round trip.
+            now = (started + time.time()) / 2
+            reported = set(payload[0].keys()) if payload else set()
+            with span("state_apply"):
                 for state in payload:
                     channel = state["channel"]
-                    self.electricity_status[channel] = state
-                if payload and not self._electricity_keys_logged:
-                    self._electricity_keys_logged = True
-                    available = set(payload[0].keys()) - {"channel"}
-                    missing = _OPTIONAL_ELECTRICITY_KEYS - available
-                    if missing:
-                        _LOGGER.warning(
-                            "Device %s (%s) does not provide %s in its "
-                            "ElectricityX response; those sensors will show "
-                            "as Unknown. Available fields: %s",
-                            self.inner_ip,
-                            self.device_type,
-                            sorted(missing),
-                            sorted(available),
+                    if "mConsume" not in state and "power" in state:
+                        integrator = self._integrate_energy(
+                            channel, now, state["power"] / 1000.0
                         )
+                        state["mConsume"] = integrator.published
+                        state["mReturned"] = integrator.exported
                     else:
-                        _LOGGER.debug(
-                            "Device %s (%s) ElectricityX fields: %s",
-                            self.inner_ip,
-                            self.device_type,
-                            sorted(available),
-                        )
-        await super().async_handle_update()
+                        state["mReturned"] = _returned_energy(state.get("mConsume"))
+                    self.electricity_state.update(channel, state)
+                defer(
+                    self.history.record_entries,
+                    now,
+                    [(state["channel"], state) for state in payload],
+                    ELECTRICITY_FIELDS,
+                )
+                if self.aggregates is not None:
+                    self.aggregates.update(
+                        (state["channel"], state.get("power"), state.get("current"))
+                        for state in payload
+                    )
+            self._last_electricity = payload
+            if payload and not self._electricity_keys_logged:
+                defer(self._log_electricity_keys, reported - {"channel"})
+            return [state["channel"] for state in payload]
+        return []
+
+    def _log_electricity_keys(self, available: set[str]) -> None:
+        """Log once which optional fields the device leaves out."""
+        if self._electricity_keys_logged:
+            return
+        self._electricity_keys_logged = True
+        missing = _OPTIONAL_ELECTRICITY_KEYS - available
+        if "mConsume" in missing and "power" in available:
+            missing.discard("mConsume")
+            _LOGGER.info(
+                "Device %s (%s) does not provide mConsume in its "
+                "ElectricityX response; energy is integrated "
+                "locally from power",
+                self.inner_ip,
+                self.device_type,
+            )
+        if missing:
+            _LOGGER.warning(
+                "Device %s (%s) does not provide %s in its "
+                "ElectricityX response; those sensors will show "
+                "as Unknown. Available fields: %s",
+                self.inner_ip,
+                self.device_type,
+                sorted(missing),
+                sorted(available),
+            )
+        else:
+            _LOGGER.debug(
+                "Device %s (%s) ElectricityX fields: %s",
+                self.inner_ip,
+                self.device_type,
+                sorted(available),
+            )
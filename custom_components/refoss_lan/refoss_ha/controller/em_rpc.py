@@ -3,8 +3,12 @@
 from __future__ import annotations
 
 import logging
+import time
 
 from ..device_rpc import DeviceInfoRpc
+from ..state import ChannelStateStore, defer
+from ..tracing import span
+from ..util import NOT_MODIFIED
 from .device import BaseDevice
 from ..exceptions import DeviceTimeoutError
 
@@ -14,6 +18,9 @@ _LOGGER = logging.getLogger(__name__)
 # Fields the RPC Em.Status.Get response is expected to include.
 _EXPECTED_EM_RPC_KEYS = {"power_factor", "month_energy"}
 
+# Fields kept per channel; everything else in the response is dropped.
+EM_RPC_FIELDS = ("power", "voltage", "current", "power_factor", "month_energy")
+
 
 class EmRpcMix(BaseDevice):
     """Energy-monitor controller using the new Refoss Open API.
@@ -29,13 +36,32 @@ class EmRpcMix(BaseDevice):
     - month_energy: kilowatt-hours (kWh, not milli-scaled)
     """
 
+    # Timeout of a poll request when no deadline shortens it.
+    request_timeout = 10
+
     def __init__(self, device: DeviceInfoRpc) -> None:
         """Initialise the controller."""
-        self.device = device
-        # channel_id → status dict from Em.Status.Get
-        self.em_status: dict[int, dict] = {}
         self._em_keys_logged = False
+        # Channel entries of the last decoded response, re-recorded into the
+        # history while the device keeps sending the same one.
+        self._last_em: list[dict] = []
         super().__init__(device)
+        # channel_id → tracked fields from Em.Status.Get
+        self.em_state = ChannelStateStore(
+            EM_RPC_FIELDS, self.channels, self.subscriptions
+        )
+
+    @property
+    def em_status(self) -> dict[int, dict]:
+        """Return the per-channel status as plain dicts."""
+        return self.em_state.as_dict()
+
+    def channel_status(self) -> dict[int, dict]:
+        """Return the fields of every channel."""
+        status = super().channel_status()
+        for channel, row in self.em_status.items():
+            status.setdefault(channel, {}).update(row)
+        return status
 
     # ------------------------------------------------------------------
     # State helper (same interface as ElectricityXMix)
@@ -43,7 +69,7 @@ class EmRpcMix(BaseDevice):
 
     def get_value(self, channel: int, subkey: str):
         """Return a sensor value for the given channel and sub-key, or *None*."""
-        return self.em_status.get(channel, {}).get(subkey)
+        return self.em_state.get(channel, subkey)
 
     # ------------------------------------------------------------------
     # Update
@@ -52,38 +78,64 @@ class EmRpcMix(BaseDevice):
     async def async_handle_update(self) -> None:
         """Poll all Em channels in a single request (id=65535 = all channels)."""
         try:
+            started = time.time()
             res = await self.device_info.async_execute_rpc_cmd(
-                "Em.Status.Get", {"id": 65535}
+                "Em.Status.Get",
+                {"id": 65535},
+                timeout=self.request_timeout,
+                skip_unchanged=True,
             )
-            if res is not None:
+            if res is NOT_MODIFIED:
+                now = (started + time.time()) / 2
+                changed = self._extend_energy(now)
+                for entry in self._last_em:
+                    ch = entry["id"]
+                    if ch in changed:
+                        entry["month_energy"] = changed[ch].published / 1000.0
+                        self.em_state.set(ch, "month_energy", entry["month_energy"])
+                defer(
+                    self.history.record_entries,
+                    now,
+                    [(entry["id"], entry) for entry in self._last_em],
+                    EM_RPC_FIELDS,
+                )
+                if changed:
+                    self._bump_revision()
+            elif res is not None:
+                self._bump_revision()
                 # HTTP GET may or may not wrap data in a "result" key
                 data = res.get("result", res)
                 entries = data.get("status", [])
-                for entry in entries:
-                    ch = entry.get("id")
-                    if ch is not None:
-                        self.em_status[ch] = entry
-                if entries and not self._em_keys_logged:
-                    self._em_keys_logged = True
-                    available = set(entries[0].keys()) - {"id"}
-                    missing = _EXPECTED_EM_RPC_KEYS - available
-                    if missing:
-                        _LOGGER.warning(
-                            "Device %s (%s) does not provide %s in its "
-                            "Em.Status.Get response; those sensors will show "
-                            "as Unknown. Available fields: %s",
-                            self.inner_ip,
-                            self.device_type,
-                            sorted(missing),
-                            sorted(available),
-                        )
-                    else:
-                        _LOGGER.debug(
-                            "Device %s (%s) Em.Status.Get fields: %s",
-                            self.inner_ip,
-                            self.device_type,
-                            sorted(available),
+                # Sample time is the midpoint of the request round trip.
+                now = (started + time.time()) / 2
+                reported = set(entries[0].keys()) if entries else set()
+                with span("state_apply"):
+                    for entry in entries:
+                        ch = entry.get("id")
+                        if ch is not None:
+                            if "month_energy" not in entry and "power" in entry:
+                                # month_energy is in kWh; integrate mW power locally.
+                                integrator = self._integrate_energy(
+                                    ch, now, entry["power"] / 1000.0
+                                )
+                                entry["month_energy"] = integrator.published / 1000.0
+                            self.em_state.update(ch, entry)
+                    self._last_em = [
+                        entry for entry in entries if entry.get("id") is not None
+                    ]
+                    defer(
+                        self.history.record_entries,
+                        now,
+                        [(entry["id"], entry) for entry in self._last_em],
+                        EM_RPC_FIELDS,
+                    )
+                    if self.aggregates is not None:
+                        self.aggregates.update(
+                            (entry.get("id"), entry.get("power"), entry.get("current"))
+                            for entry in entries
                         )
+                if entries and not self._em_keys_logged:
+                    defer(self._log_em_keys, reported - {"id"})
         except DeviceTimeoutError:
             raise
         except Exception as exc:  # noqa: BLE001
@@ -91,3 +143,36 @@ class EmRpcMix(BaseDevice):
                 "Error updating Em status for %s: %r", self.inner_ip, exc
             )
         await super().async_handle_update()
+
+    def _log_em_keys(self, available: set[str]) -> None:
+        """Log once which expected fields the device leaves out."""
+        if self._em_keys_logged:
+            return
+        self._em_keys_logged = True
+        missing = _EXPECTED_EM_RPC_KEYS - available
+        if "month_energy" in missing and "power" in available:
+            missing.discard("month_energy")
+            _LOGGER.info(
+                "Device %s (%s) does not provide month_energy in its "
+                "Em.Status.Get response; energy is integrated "
+                "locally from power",
+                self.inner_ip,
+                self.device_type,
+            )
+        if missing:
+            _LOGGER.warning(
+                "Device %s (%s) does not provide %s in its "
+                "Em.Status.Get response; those sensors will show "
+                "as Unknown. Available fields: %s",
+                self.inner_ip,
+                self.device_type,
+                sorted(missing),
+                sorted(available),
+            )
+        else:
+            _LOGGER.debug(
+                "Device %s (%s) Em.Status.Get fields: %s",
+                self.inner_ip,
+                self.device_type,
+                sorted(available),
+            )
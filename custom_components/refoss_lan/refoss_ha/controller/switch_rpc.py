@@ -2,11 +2,18 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable
 import logging
+import time
 
+from ..command import CommandPipeline
 from ..device_rpc import DeviceInfoRpc
+from ..state import ChannelStateStore, defer
+from ..tracing import span
+from ..util import NOT_MODIFIED
 from .device import BaseDevice
-from ..exceptions import DeviceTimeoutError
+from ..exceptions import DeviceTimeoutError, InvalidMessage
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -14,6 +21,22 @@ _LOGGER = logging.getLogger(__name__)
 # Fields the RPC Switch.Status.Get response is expected to include.
 _EXPECTED_SWITCH_RPC_KEYS = {"apower", "voltage", "current", "month_consumption"}
 
+# Fields kept per channel; everything else in the response is dropped.
+SWITCH_RPC_FIELDS = ("output", "apower", "voltage", "current", "month_consumption")
+
+
+async def _gather_all(calls: list) -> list:
+    """Await coroutines together; raise the first error once all are done.
+
+    The requests are queued at once, so the device's request queue sends
+    them back to back, ahead of any poll.
+    """
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
 
 class SwitchRpcMix(BaseDevice):
     """Switch controller using the new Refoss Open API.
@@ -23,13 +46,39 @@ class SwitchRpcMix(BaseDevice):
     switch and sensor entity code can treat both device types uniformly.
     """
 
+    # Timeout of a poll request when no deadline shortens it.
+    request_timeout = 10
+
     def __init__(self, device: DeviceInfoRpc) -> None:
         """Initialise the controller."""
-        self.device = device
-        # channel_id → status dict from Switch.Status.Get
-        self.switch_status: dict[int, dict] = {}
         self._switch_keys_logged = False
+        # Status of the last decoded response per channel, re-recorded into
+        # the history while the device keeps sending the same one.
+        self._last_switch: dict[int, dict] = {}
         super().__init__(device)
+        # channel_id → tracked fields from Switch.Status.Get
+        self.switch_state = ChannelStateStore(
+            SWITCH_RPC_FIELDS, self.channels, self.subscriptions
+        )
+        self._commands = CommandPipeline(
+            self._send_actions,
+            self._async_read_channels,
+            self.is_on,
+            self._set_output,
+            self._notify_update,
+        )
+
+    @property
+    def switch_status(self) -> dict[int, dict]:
+        """Return the per-channel status as plain dicts."""
+        return self.switch_state.as_dict()
+
+    def channel_status(self) -> dict[int, dict]:
+        """Return the fields of every channel."""
+        status = super().channel_status()
+        for channel, row in self.switch_status.items():
+            status.setdefault(channel, {}).update(row)
+        return status
 
     # ------------------------------------------------------------------
     # State helpers (same interface as ToggleXMix)
@@ -37,50 +86,30 @@ class SwitchRpcMix(BaseDevice):
 
     def is_on(self, channel: int = 1) -> bool | None:
         """Return *True* if the given channel is on, *False* if off, *None* if unknown."""
-        return self.switch_status.get(channel, {}).get("output")
+        return self.switch_state.get(channel, "output")
 
     def get_value(self, channel: int, subkey: str):
         """Return a sensor value for the given channel and sub-key, or *None*."""
-        return self.switch_status.get(channel, {}).get(subkey)
+        return self.switch_state.get(channel, subkey)
 
     # ------------------------------------------------------------------
     # Update
     # ------------------------------------------------------------------
 
     async def async_handle_update(self) -> None:
-        """Poll each switch channel for current status."""
-        for channel in self.channels:
+        """Poll each switch channel for current status.
+
+        If the poll's deadline passes after some channels were read, the
+        remaining ones keep their last values and are marked stale.
+        """
+        for index, channel in enumerate(self.channels):
             try:
-                res = await self.device_info.async_execute_rpc_cmd(
-                    "Switch.Status.Get", {"id": channel}
-                )
-                if res is not None:
-                    # HTTP GET may or may not wrap data in a "result" key
-                    data = res.get("result", res)
-                    self.switch_status[channel] = data
-                    if not self._switch_keys_logged:
-                        self._switch_keys_logged = True
-                        available = set(data.keys())
-                        missing = _EXPECTED_SWITCH_RPC_KEYS - available
-                        if missing:
-                            _LOGGER.warning(
-                                "Device %s (%s) does not provide %s in its "
-                                "Switch.Status.Get response; those sensors will show "
-                                "as Unknown. Available fields: %s",
-                                self.inner_ip,
-                                self.device_type,
-                                sorted(missing),
-                                sorted(available),
-                            )
-                        else:
-                            _LOGGER.debug(
-                                "Device %s (%s) Switch.Status.Get fields: %s",
-                                self.inner_ip,
-                                self.device_type,
-                                sorted(available),
-                            )
+                await self._async_update_channel(channel, skip_unchanged=True)
             except DeviceTimeoutError:
-                raise
+                if index == 0:
+                    raise
+                self._cut_short(self.channels[index:])
+                break
             except Exception as exc:  # noqa: BLE001
                 _LOGGER.debug(
                     "Error updating switch channel %d for %s: %r",
@@ -88,45 +117,167 @@ class SwitchRpcMix(BaseDevice):
                     self.inner_ip,
                     exc,
                 )
+                self._set_stale((channel,), True)
+            else:
+                self._set_stale((channel,), False)
         await super().async_handle_update()
 
+    async def _async_update_channel(
+        self, channel: int, skip_unchanged: bool = False
+    ) -> bool | None:
+        """Poll one channel; return the output state the device reported.
+
+        While a command for the channel is in flight its optimistic output
+        is kept; the command pipeline applies the confirmed state. With
+        ``skip_unchanged`` an unchanged response is not applied again and
+        *None* is returned.
+        """
+        started = time.time()
+        res = await self.device_info.async_execute_rpc_cmd(
+            "Switch.Status.Get",
+            {"id": channel},
+            timeout=self.request_timeout,
+            skip_unchanged=skip_unchanged,
+        )
+        if res is NOT_MODIFIED:
+            now = (started + time.time()) / 2
+            changed = self._extend_energy(now, [channel])
+            last = self._last_switch.get(channel)
+            if channel in changed:
+                energy = changed[channel].published
+                self.switch_state.set(channel, "month_consumption", energy)
+                self._bump_revision()
+                if last is not None:
+                    last["month_consumption"] = energy
+            if last is not None:
+                defer(self.history.record_entry, channel, now, last, SWITCH_RPC_FIELDS)
+            return None
+        if res is None:
+            return None
+        self._bump_revision()
+        # HTTP GET may or may not wrap data in a "result" key
+        data = res.get("result", res)
+        # Sample time is the midpoint of the request round trip.
+        now = (started + time.time()) / 2
+        available = set(data.keys())
+        reported = data.get("output")
+        with span("state_apply"):
+            if "month_consumption" not in data and "apower" in data:
+                data["month_consumption"] = self._integrate_energy(
+                    channel, now, data["apower"] / 1000.0
+                ).published
+            defer(self._apply_status, channel, now, data)
+            self._last_switch[channel] = data
+        if not self._switch_keys_logged:
+            defer(self._log_switch_keys, available)
+        return reported
+
+    def _apply_status(self, channel: int, ts: float, data: dict) -> None:
+        """Store a channel's status, keeping the output of a command in flight.
+
+        Runs with the poll's other state writes, so the check sees commands
+        sent while the status was being read.
+        """
+        if self._commands.pending(channel):
+            data = {**data, "output": self.switch_state.get(channel, "output")}
+        self.switch_state.update(channel, data)
+        self.history.record_entry(channel, ts, data, SWITCH_RPC_FIELDS)
+
+    def _log_switch_keys(self, available: set[str]) -> None:
+        """Log once which expected fields the device leaves out."""
+        if self._switch_keys_logged:
+            return
+        self._switch_keys_logged = True
+        missing = _EXPECTED_SWITCH_RPC_KEYS - available
+        if "month_consumption" in missing and "apower" in available:
+            missing.discard("month_consumption")
+            _LOGGER.info(
+                "Device %s (%s) does not provide month_consumption "
+                "in its Switch.Status.Get response; energy is "
+                "integrated locally from power",
+                self.inner_ip,
+                self.device_type,
+            )
+        if missing:
+            _LOGGER.warning(
+                "Device %s (%s) does not provide %s in its "
+                "Switch.Status.Get response; those sensors will show "
+                "as Unknown. Available fields: %s",
+                self.inner_ip,
+                self.device_type,
+                sorted(missing),
+                sorted(available),
+            )
+        else:
+            _LOGGER.debug(
+                "Device %s (%s) Switch.Status.Get fields: %s",
+                self.inner_ip,
+                self.device_type,
+                sorted(available),
+            )
+
     # ------------------------------------------------------------------
     # Control
     # ------------------------------------------------------------------
 
     async def async_turn_on(self, channel: int = 1) -> None:
         """Turn channel on."""
-        await self._send_action(channel, "on")
+        await self._async_command({channel: True})
 
     async def async_turn_off(self, channel: int = 1) -> None:
         """Turn channel off."""
-        await self._send_action(channel, "off")
+        await self._async_command({channel: False})
 
     async def async_toggle(self, channel: int = 1) -> None:
-        """Toggle channel."""
-        await self._send_action(channel, "toggle")
+        """Toggle channel, starting from the latest requested state."""
+        await self._async_command({channel: not self.is_on(channel)})
 
-    async def _send_action(self, channel: int, action: str) -> None:
-        """Send a Switch.Action.Set command and update cached state."""
+    async def async_set_channels(self, states: dict[int, bool]) -> None:
+        """Switch several channels at once.
+
+        The RPC API sets one channel per request; they are queued together
+        and sent one after another, ahead of any waiting poll. Raises
+        :class:`RefossError` if any channel was not acknowledged.
+        """
+        await self._commands.async_set_many(states)
+
+    async def _async_command(self, states: dict[int, bool]) -> None:
+        """Queue commands through the pipeline."""
         try:
-            res = await self.device_info.async_execute_rpc_cmd(
-                "Switch.Action.Set", {"id": channel, "action": action}
-            )
-            if res is not None:
-                data = res.get("result", res)
-                was_on: bool | None = data.get("was_on")
-                if was_on is not None:
-                    # Derive new state from the previous state + action
-                    new_state: bool | None = None
-                    if action == "on":
-                        new_state = True
-                    elif action == "off":
-                        new_state = False
-                    elif action == "toggle":
-                        new_state = not was_on
-                    if new_state is not None:
-                        if channel not in self.switch_status:
-                            self.switch_status[channel] = {}
-                        self.switch_status[channel]["output"] = new_state
+            await self._commands.async_set_many(states)
         except DeviceTimeoutError:
             pass
+
+    async def _send_actions(
+        self, states: dict[int, bool], acknowledge: Callable[[int], None]
+    ) -> None:
+        """Send Switch.Action.Set for every channel."""
+
+        async def send(channel: int, on: bool) -> None:
+            await self._send_action(channel, on)
+            acknowledge(channel)
+
+        await _gather_all([send(channel, on) for channel, on in states.items()])
+
+    async def _async_read_channels(self, channels: list[int]) -> dict[int, bool]:
+        """Read back channels after a command."""
+        results = await _gather_all(
+            [self._async_update_channel(channel) for channel in channels]
+        )
+        return {
+            channel: output
+            for channel, output in zip(channels, results)
+            if output is not None
+        }
+
+    async def _send_action(self, channel: int, on: bool) -> None:
+        """Send a Switch.Action.Set command."""
+        res = await self.device_info.async_execute_rpc_cmd(
+            "Switch.Action.Set", {"id": channel, "action": "on" if on else "off"}
+        )
+        if res is None:
+            raise InvalidMessage(f"{self.dev_name} did not answer Switch.Action.Set")
+
+    def _set_output(self, channel: int, on: bool | None) -> None:
+        """Set the cached output state of a channel."""
+        self.switch_state.set(channel, "output", on)
@@ -1,11 +1,16 @@
 """ToggleXMix."""
 
+from collections.abc import Callable
 import logging
+import time
 
+from ..command import CommandPipeline
 from ..enums import Namespace
 from ..device import DeviceInfo
-from .device import BaseDevice
-from ..exceptions import DeviceTimeoutError
+from .device import BaseDevice, PollRequest
+from ..exceptions import DeviceTimeoutError, InvalidMessage
+from ..state import defer
+from ..tracing import span
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -15,78 +20,153 @@ class ToggleXMix(BaseDevice):
 
     def __init__(self, device: DeviceInfo):
         """Initialize."""
-        self.device = device
         self.togglex_status = {}
+        # States of the last decoded response, re-recorded into the history
+        # while the device keeps sending the same one.
+        self._last_togglex: dict[int, bool] = {}
         super().__init__(device)
+        self._commands = CommandPipeline(
+            self._send_togglex,
+            self._async_read_channels,
+            self.is_on,
+            self._set_onoff,
+            self._notify_update,
+        )
 
     def is_on(self, channel=0) -> bool | None:
         """is_on(self, channel)."""
         return self.togglex_status.get(channel, None)
 
-    async def async_handle_update(self):
-        """Update device state,65535 get all channel."""
-        payload = {"togglex": {"channel": 65535}}
+    def channel_status(self) -> dict[int, dict]:
+        """Return the fields of every channel, with the switch state as ``onoff``."""
+        status = super().channel_status()
+        for channel, on in self.togglex_status.items():
+            status.setdefault(channel, {})["onoff"] = on
+        return status
+
+    def _poll_requests(self) -> list[PollRequest]:
+        """Read all channels (65535) of ToggleX on every poll."""
+        return [
+            *super()._poll_requests(),
+            PollRequest(
+                Namespace.CONTROL_TOGGLEX,
+                {"togglex": {"channel": 65535}},
+                self._apply_togglex,
+                self._togglex_unchanged,
+            ),
+        ]
+
+    def _togglex_unchanged(self, started: float) -> bool:
+        """Record the unchanged states into the history; nothing else changes."""
+        defer(self._record_onoff, time.time(), self._last_togglex)
+        return False
+
+    def _apply_togglex(self, data: dict, started: float) -> list[int]:
+        """Apply a ToggleX GET response payload; return the channels it covered."""
+        states = self._last_togglex = self._parse_togglex(data)
+        if states:
+            with span("state_apply"):
+                defer(self._record_onoff, time.time(), states)
+                # Compared with the stored states when applied.
+                defer(self._apply_onoff, states)
+        return list(states)
+
+    def _record_onoff(self, ts: float, states: dict[int, bool]) -> None:
+        """Record reported states into the history."""
+        for channel, switch_state in states.items():
+            self.history.record(channel, "onoff", ts, float(switch_state))
+
+    def _apply_onoff(self, states: dict[int, bool]) -> None:
+        """Store reported states, keeping channels with a command in flight."""
+        for channel, switch_state in states.items():
+            if not self._commands.pending(channel):
+                self._set_onoff(channel, switch_state)
+
+    async def _async_get_togglex(self, channel: int) -> dict[int, bool]:
+        """Read the ToggleX state of one channel (65535 for all)."""
         res = await self.async_execute_cmd(
             device_uuid=self.uuid,
             method="GET",
             namespace=Namespace.CONTROL_TOGGLEX,
-            payload=payload,
+            payload={"togglex": {"channel": channel}},
         )
+        if res is None:
+            return {}
+        return self._parse_togglex(res.get("payload", {}))
 
-        if res is not None:
-            data = res.get("payload", {})
-            payload = data.get("togglex")
-            if payload is None:
-                _LOGGER.debug(
-                    "%s could not find 'togglex' attribute in push notification data",
-                    data,
-                )
-
-            elif isinstance(payload, list):
-                for c in payload:
-                    channel = c["channel"]
-                    switch_state = c["onoff"] == 1
-                    self.togglex_status[channel] = switch_state
-
-            elif isinstance(payload, dict):
-                channel = payload["channel"]
-                switch_state = payload["onoff"] == 1
-                self.togglex_status[channel] = switch_state
-        await super().async_handle_update()
+    @staticmethod
+    def _parse_togglex(data: dict) -> dict[int, bool]:
+        """Return ``{channel: on}`` from a ToggleX response payload."""
+        payload = data.get("togglex")
+        if payload is None:
+            _LOGGER.debug(
+                "%s could not find 'togglex' attribute in push notification data",
+                data,
+            )
+            return {}
+        if isinstance(payload, dict):
+            payload = [payload]
+        return {c["channel"]: c["onoff"] == 1 for c in payload}
 
-    async def async_turn_off(self, channel=0) -> None:
-        """Turn off."""
-        payload = {"togglex": {"onoff": 0, "channel": channel}}
+    async def _async_read_channels(self, channels: list[int]) -> dict[int, bool]:
+        """Read back channels after a command."""
+        return await self._async_get_togglex(channels[0] if len(channels) == 1 else 65535)
+
+    async def _send_togglex(
+        self, states: dict[int, bool], acknowledge: Callable[[int], None]
+    ) -> None:
+        """Send one ToggleX SET for any number of channels.
+
+        A single channel uses the dict form of the payload, several
+        channels the list form.
+        """
+        togglex = [
+            {"onoff": int(on), "channel": channel} for channel, on in states.items()
+        ]
+        res = await self.async_execute_cmd(
+            device_uuid=self.uuid,
+            method="SET",
+            namespace=Namespace.CONTROL_TOGGLEX,
+            payload={"togglex": togglex[0] if len(togglex) == 1 else togglex},
+        )
+        if res is None:
+            raise InvalidMessage(f"{self.dev_name} did not acknowledge ToggleX SET")
+        for channel in states:
+            acknowledge(channel)
+
+    def _set_onoff(self, channel: int, on: bool | None) -> None:
+        """Set the cached state of a channel."""
+        if self.togglex_status.get(channel) == on:
+            return
+        if on is None:
+            self.togglex_status.pop(channel, None)
+        else:
+            self.togglex_status[channel] = on
+        if self.subscriptions:
+            self.subscriptions.notify(channel, "onoff", on)
+
+    async def _async_command(self, states: dict[int, bool]) -> None:
+        """Queue commands through the pipeline."""
         try:
-            res = await self.async_execute_cmd(
-                device_uuid=self.uuid,
-                method="SET",
-                namespace=Namespace.CONTROL_TOGGLEX,
-                payload=payload,
-            )
-            if res is not None:
-                self.togglex_status[channel] = False
+            await self._commands.async_set_many(states)
         except DeviceTimeoutError:
             pass
 
+    async def async_set_channels(self, states: dict[int, bool]) -> None:
+        """Switch several channels with a single request.
+
+        Raises :class:`RefossError` if the device does not acknowledge it.
+        """
+        await self._commands.async_set_many(states)
+
+    async def async_turn_off(self, channel=0) -> None:
+        """Turn off."""
+        await self._async_command({channel: False})
+
     async def async_turn_on(self, channel=0) -> None:
         """Turn on."""
-        payload = {"togglex": {"onoff": 1, "channel": channel}}
-        try:
-            res = await self.async_execute_cmd(
-                device_uuid=self.uuid,
-                method="SET",
-                namespace=Namespace.CONTROL_TOGGLEX,
-                payload=payload,
-            )
-            if res is not None:
-                self.togglex_status[channel] = True
-        except DeviceTimeoutError:
-            pass
+        await self._async_command({channel: True})
 
     async def async_toggle(self, channel=0) -> None:
-        """Toggle."""
-        if self.is_on(channel=channel):
-            await self.async_turn_off(channel=channel)
-        else:
-            await self.async_turn_on(channel=channel)
+        """Toggle, starting from the latest requested state."""
+        await self._async_command({channel: not self.is_on(channel=channel)})
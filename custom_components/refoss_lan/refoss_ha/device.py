@@ -7,21 +7,33 @@ from hashlib import md5
 import json
 import logging
 import random
+import re
 import string
 import time
 
 from aiohttp import ClientSession, ClientTimeout
 
 from .enums import Namespace
-from .util import BaseDictPayload
+from .metrics import DeviceMetrics
+from .request_queue import RequestQueue, request_timeout
+from .state import defer
+from .tracing import span, trace_configs
+from .util import NOT_MODIFIED, BaseDictPayload, ResponseDigests
 from .exceptions import DeviceTimeoutError, RefossError
 
 LOGGER = logging.getLogger(__name__)
 
+# Envelope fields that differ between otherwise identical responses.
+_VOLATILE_FIELDS = re.compile(
+    rb'"(?:messageId|timestamp|timestampMs|sign)"\s*:\s*(?:"[^"]*"|\d+)'
+)
+
 
 class DeviceInfo(BaseDictPayload):
     """Base class."""
 
+    _runtime_fields = frozenset({"metrics", "queue"})
+
     def __init__(
         self,
         uuid: str,
@@ -50,6 +62,9 @@ class DeviceInfo(BaseDictPayload):
         self.mac = mac
         self.sub_type = sub_type
         self.channels = channels
+        self.metrics = DeviceMetrics()
+        self.queue = RequestQueue()
+        self._responses = ResponseDigests(_VOLATILE_FIELDS)
 
     def __str__(self) -> str:
         """Returns a string."""
@@ -63,50 +78,87 @@ class DeviceInfo(BaseDictPayload):
         namespace: Namespace | str,
         payload: dict,
         timeout: int = 20,
+        skip_unchanged: bool = False,
     ):
-        """async_execute_cmd."""
+        """Send a command and return the response envelope, or *None*.
+
+        With ``skip_unchanged``, a response identical to the previous one
+        for the same method and namespace (ignoring message ids, timestamps
+        and signatures) is not decoded and :data:`.util.NOT_MODIFIED` is
+        returned instead. Any other request (a command or a readback may
+        change what the device reports) makes the next ones decode again.
+        """
+        if not skip_unchanged:
+            self._responses.clear()
         message, message_id = self._build_mqtt_message(
             method, namespace, payload, device_uuid
         )
+        namespace_str = namespace.value if isinstance(namespace, Namespace) else namespace
+        key = (method, namespace_str)
 
         if self.device_type == "r10":
             path = f"http://{self.inner_ip}/config"
         else:
             path = f"http://{self.inner_ip}/public"
 
-        try:
-            async with ClientSession() as session, session.post(
-                path,
-                json=json.loads(message.decode()),
-                timeout=ClientTimeout(total=timeout),
-            ) as response:
-                data = await response.json()
-                if data is not None:
-                    header = data.get("header", {})
-                    messageId = header.get("messageId")
-                    ack_method = header.get("method")
-                    if messageId == message_id and ack_method == method + "ACK":
-                        return data
-                return None
-        except asyncio.TimeoutError:
-            namespace_str = namespace.value if isinstance(namespace, Namespace) else namespace
-            LOGGER.debug(
-                "Http timeoutError, ip:%s, device_type:%s, namespace:%s",
-                self.inner_ip,
-                self.device_type,
-                namespace_str,
-            )
-            raise DeviceTimeoutError
-        except Exception as e:
-            namespace_str = namespace.value if isinstance(namespace, Namespace) else namespace
-            LOGGER.debug(
-                "Http fail: %s, ip:%s, device_type:%s, namespace:%s",
-                e,
-                self.inner_ip,
-                self.device_type,
-                namespace_str,
-            )
-            raise RefossError("Device connection failed") from e
+        async with self.queue.slot():
+            # Inside a poll, the request gets what is left of its deadline.
+            timeout = request_timeout(timeout)
+            metrics = self.metrics
+            started = time.monotonic()
+            try:
+                async with ClientSession(
+                    trace_configs=trace_configs()
+                ) as session, session.post(
+                    path,
+                    data=message,
+                    headers={"Content-Type": "application/json"},
+                    timeout=ClientTimeout(total=timeout),
+                ) as response:
+                    with span("body_read"):
+                        body = await response.read()
+                    elapsed = time.monotonic() - started
+                    defer(metrics.record_request, elapsed, len(message), len(body))
+                    if (
+                        skip_unchanged
+                        and message_id.encode() in body
+                        and self._responses.unchanged(key, body)
+                    ):
+                        defer(metrics.record_unchanged)
+                        return NOT_MODIFIED
+                    with span("json_decode"):
+                        data = json.loads(body) if body.strip() else None
+                    if data is not None:
+                        header = data.get("header", {})
+                        messageId = header.get("messageId")
+                        ack_method = header.get("method")
+                        if messageId == message_id and ack_method == method + "ACK":
+                            return data
+                    self._responses.forget(key)
+                    return None
+            except asyncio.TimeoutError:
+                LOGGER.debug(
+                    "Http timeoutError, ip:%s, device_type:%s, namespace:%s",
+                    self.inner_ip,
+                    self.device_type,
+                    namespace_str,
+                )
+                defer(metrics.record_timeout)
+                raise DeviceTimeoutError
+            except Exception as e:
+                LOGGER.debug(
+                    "Http fail: %s, ip:%s, device_type:%s, namespace:%s",
+                    e,
+                    self.inner_ip,
+                    self.device_type,
+                    namespace_str,
+                )
+                defer(metrics.record_error)
+                raise RefossError("Device connection failed") from e
+
+    def forget_responses(self) -> None:
+        """Decode the next responses even if they are unchanged."""
+        self._responses.clear()
 
     def _build_mqtt_message(
         self,
@@ -115,6 +167,20 @@ class DeviceInfo(BaseDictPayload):
         payload: dict,
         destination_device_uuid: str,
     ):
+        data, messageId = self.build_message(
+            method, namespace, payload, destination_device_uuid
+        )
+        strdata = json.dumps(data)
+        return strdata.encode("utf-8"), messageId
+
+    def build_message(
+        self,
+        method: str,
+        namespace: Namespace | str,
+        payload: dict,
+        destination_device_uuid: str,
+    ) -> tuple[dict, str]:
+        """Return a signed message dict and its message id."""
         # Generate a random 16 byte string
         randomstring = "".join(
             random.SystemRandom().choice(string.ascii_uppercase + string.digits)
@@ -153,6 +219,4 @@ class DeviceInfo(BaseDictPayload):
             },
             "payload": payload,
         }
-
-        strdata = json.dumps(data)
-        return strdata.encode("utf-8"), messageId
+        return data, messageId
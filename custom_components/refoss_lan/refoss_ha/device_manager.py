@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 
+from .controller.consumption import ConsumptionXMix
 from .controller.device import BaseDevice
 from .controller.toggle import ToggleXMix
 from .controller.electricity import ElectricityXMix
@@ -19,6 +20,7 @@ _LOGGER = logging.getLogger(__name__)
 _ABILITY_MATRIX = {
     Namespace.CONTROL_TOGGLEX.value: ToggleXMix,
     Namespace.CONTROL_ELECTRICITYX.value: ElectricityXMix,
+    Namespace.CONTROL_CONSUMPTIONX.value: ConsumptionXMix,
 }
 
 
@@ -3,12 +3,20 @@
 from __future__ import annotations
 
 import asyncio
+from collections.abc import Mapping
 import json
 import logging
+import time
+from typing import Any
 
 from aiohttp import ClientSession, ClientTimeout
 
 from .exceptions import DeviceTimeoutError, RefossError
+from .metrics import DeviceMetrics
+from .request_queue import RequestQueue, request_timeout
+from .state import defer
+from .tracing import span, trace_configs
+from .util import NOT_MODIFIED, ResponseDigests
 
 LOGGER = logging.getLogger(__name__)
 
@@ -41,6 +49,9 @@ class DeviceInfoRpc:
         self.port = "80"
         self.sub_type = ""
         self.channels: list[int] = channels if channels is not None else [1]
+        self.metrics = DeviceMetrics()
+        self.queue = RequestQueue()
+        self._responses = ResponseDigests()
 
     # ------------------------------------------------------------------
     # Discovery
@@ -61,26 +72,7 @@ class DeviceInfoRpc:
                 if response.status != 200:
                     return None
                 data = await response.json(content_type=None)
-                result = data.get("result", data)
-                model = result.get("model", "")
-                if not model:
-                    return None
-                mac = result.get("mac", "")
-                dev_id = result.get("dev_id", "")
-                fw_ver = result.get("fw_ver", "")
-                hw_ver = result.get("hw_ver", "")
-                name = result.get("name") or model
-                # Channels are discovered later during device setup.
-                return cls(
-                    name=name,
-                    model=model,
-                    dev_id=dev_id,
-                    mac=mac,
-                    fw_ver=fw_ver,
-                    hw_ver=hw_ver,
-                    ip=ip,
-                    channels=[1],
-                )
+                return cls._from_device_info(data.get("result", data), ip)
         except Exception:
             LOGGER.debug(
                 "RPC probe to %s failed; falling back to non-RPC discovery",
@@ -89,17 +81,73 @@ class DeviceInfoRpc:
             )
             return None
 
+    @classmethod
+    async def async_from_zeroconf(
+        cls, ip: str, properties: Mapping[str, str]
+    ) -> DeviceInfoRpc | None:
+        """Build device info from an mDNS announcement.
+
+        The TXT record (``model``, ``mac``, ``fw_ver``) seeds the info and a
+        single ``Refoss.DeviceInfo.Get`` completes it; the device's answer
+        wins where both have a field. Returns *None* if it does not answer.
+        """
+        device = cls(
+            name=properties.get("model", ""),
+            model=properties.get("model", ""),
+            dev_id="",
+            mac=properties.get("mac", ""),
+            fw_ver=properties.get("fw_ver", ""),
+            hw_ver="",
+            ip=ip,
+        )
+        try:
+            res = await device.async_execute_rpc_cmd("Refoss.DeviceInfo.Get", timeout=5)
+        except RefossError as err:
+            LOGGER.debug("DeviceInfo.Get to announced device %s failed: %r", ip, err)
+            return None
+        if res is None:
+            return None
+        return cls._from_device_info({**properties, **res.get("result", res)}, ip)
+
+    @classmethod
+    def _from_device_info(cls, result: Mapping[str, Any], ip: str) -> DeviceInfoRpc | None:
+        """Build device info from a ``Refoss.DeviceInfo.Get`` result."""
+        model = result.get("model", "")
+        if not model:
+            return None
+        # Channels are discovered later during device setup.
+        return cls(
+            name=result.get("name") or model,
+            model=model,
+            dev_id=result.get("dev_id", ""),
+            mac=result.get("mac", ""),
+            fw_ver=result.get("fw_ver", ""),
+            hw_ver=result.get("hw_ver", ""),
+            ip=ip,
+            channels=[1],
+        )
+
     # ------------------------------------------------------------------
     # Command execution
     # ------------------------------------------------------------------
 
     async def async_execute_rpc_cmd(
-        self, method: str, params: dict | None = None, timeout: int = 10
+        self,
+        method: str,
+        params: dict | None = None,
+        timeout: int = 10,
+        skip_unchanged: bool = False,
     ) -> dict | None:
         """Execute an RPC command via HTTP GET.
 
-        Returns the parsed JSON response dict, or *None* on error.
+        Returns the parsed JSON response dict, or *None* on error. With
+        ``skip_unchanged``, a response identical to the previous one for the
+        same method and parameters is not decoded and
+        :data:`.util.NOT_MODIFIED` is returned instead. Any other request
+        makes the next ones decode again.
         """
+        if not skip_unchanged:
+            self._responses.clear()
         url = f"http://{self.inner_ip}/rpc/{method}"
         query_params: dict[str, str] | None = None
         if params:
@@ -112,19 +160,49 @@ class DeviceInfoRpc:
                 else:
                     query_params[k] = str(v)
 
-        try:
-            async with ClientSession() as session, session.get(
-                url, params=query_params, timeout=ClientTimeout(total=timeout)
-            ) as response:
-                return await response.json(content_type=None)
-        except asyncio.TimeoutError:
-            LOGGER.debug("Timeout calling RPC method %s on %s", method, self.inner_ip)
-            raise DeviceTimeoutError
-        except Exception as exc:
-            LOGGER.debug(
-                "Error calling RPC method %s on %s: %r", method, self.inner_ip, exc
-            )
-            raise RefossError("Device connection failed") from exc
+        async with self.queue.slot():
+            # Inside a poll, the request gets what is left of its deadline.
+            timeout = request_timeout(timeout)
+            metrics = self.metrics
+            started = time.monotonic()
+            try:
+                async with ClientSession(
+                    trace_configs=trace_configs()
+                ) as session, session.get(
+                    url, params=query_params, timeout=ClientTimeout(total=timeout)
+                ) as response:
+                    with span("body_read"):
+                        body = await response.read()
+                    elapsed = time.monotonic() - started
+                    defer(
+                        metrics.record_request,
+                        elapsed,
+                        len(response.url.raw_path_qs),
+                        len(body),
+                    )
+                    key = (method, response.url.raw_query_string)
+                    if skip_unchanged and self._responses.unchanged(key, body):
+                        defer(metrics.record_unchanged)
+                        return NOT_MODIFIED
+                    with span("json_decode"):
+                        data = json.loads(body) if body.strip() else None
+                    if data is None:
+                        self._responses.forget(key)
+                    return data
+            except asyncio.TimeoutError:
+                LOGGER.debug("Timeout calling RPC method %s on %s", method, self.inner_ip)
+                defer(metrics.record_timeout)
+                raise DeviceTimeoutError
+            except Exception as exc:
+                LOGGER.debug(
+                    "Error calling RPC method %s on %s: %r", method, self.inner_ip, exc
+                )
+                defer(metrics.record_error)
+                raise RefossError("Device connection failed") from exc
+
+    def forget_responses(self) -> None:
+        """Decode the next responses even if they are unchanged."""
+        self._responses.clear()
 
     # ------------------------------------------------------------------
     # Serialisation (config-entry storage)
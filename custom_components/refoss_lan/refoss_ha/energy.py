@@ -0,0 +1,265 @@
+"""Local energy integration for devices that do not report energy counters."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime, tzinfo
+
+# Intervals longer than this are treated as missing data and not integrated.
+DEFAULT_MAX_GAP = 300.0
+
+
+class EnergyIntegrator:
+    """Integrate power samples into monthly energy using the trapezoidal rule.
+
+    It stands in for the monthly counters of the firmware, so it behaves like
+    one: :attr:`published` counts imported energy only, never decreases
+    within a month and restarts at zero when a sample falls into a new
+    calendar month of ``timezone`` (local time if *None*). Negative power
+    (export) is integrated separately into :attr:`exported`. Totals are kept
+    in full precision but published in whole watt-hour steps so consumers
+    see a stable counter.
+    """
+
+    __slots__ = (
+        "_energy",
+        "_export",
+        "_last_power",
+        "_last_ts",
+        "_month_end",
+        "published",
+        "timezone",
+    )
+
+    def __init__(self, timezone: tzinfo | None = None) -> None:
+        """Initialize an empty integrator."""
+        self.timezone = timezone
+        self._energy = 0.0
+        self._export = 0.0
+        self._last_ts: float | None = None
+        self._last_power = 0.0
+        # Start of the month after the last sample's; computed when needed.
+        self._month_end: float | None = None
+        self.published = 0
+
+    @property
+    def exported(self) -> int:
+        """Return the whole Wh exported this month."""
+        return int(self._export)
+
+    def add(self, ts: float, power_w: float, max_gap: float = DEFAULT_MAX_GAP) -> bool:
+        """Add a power sample taken at ``ts``.
+
+        Returns *True* when :attr:`published` or :attr:`exported` changed.
+        Samples older than the previous one are ignored; intervals longer
+        than ``max_gap`` (device offline, Home Assistant stopped) are skipped
+        rather than guessed.
+        """
+        last_ts = self._last_ts
+        last_power = self._last_power
+        export_wh = int(self._export)
+        if last_ts is not None:
+            dt = ts - last_ts
+            if dt <= 0:
+                return False
+            if self._month_end is None:
+                self._month_end = _next_month(last_ts, self.timezone)
+            if ts >= self._month_end:
+                # Only the part of the interval in the new month counts.
+                boundary = _month_start(ts, self.timezone)
+                if boundary > last_ts:
+                    last_power += (power_w - last_power) * (boundary - last_ts) / dt
+                    dt = ts - boundary
+                self._energy = self._export = 0.0
+                self._month_end = _next_month(ts, self.timezone)
+            if dt <= max_gap:
+                imported, exported = _trapezoid(last_power, power_w, dt)
+                self._energy += imported
+                self._export += exported
+        self._last_ts = ts
+        self._last_power = power_w
+        wh = int(self._energy)
+        if wh != self.published:
+            self.published = wh
+            return True
+        return int(self._export) != export_wh
+
+    def extend(self, ts: float, max_gap: float = DEFAULT_MAX_GAP) -> bool:
+        """Continue at the last power up to ``ts`` (the reading did not change)."""
+        return self.add(ts, self._last_power, max_gap)
+
+    def checkpoint(self) -> dict[str, float | None]:
+        """Return the state needed to resume integration after a restart."""
+        return {
+            "energy": self._energy,
+            "export": self._export,
+            "ts": self._last_ts,
+            "power": self._last_power,
+        }
+
+    def restore(self, data: dict) -> None:
+        """Resume from a :meth:`checkpoint` dict."""
+        # Checkpoints from before export was kept apart hold a net value.
+        self._energy = max(0.0, float(data.get("energy", 0.0)))
+        self._export = float(data.get("export", 0.0))
+        ts = data.get("ts")
+        self._last_ts = float(ts) if ts is not None else None
+        self._last_power = float(data.get("power", 0.0))
+        self._month_end = None
+        self.published = int(self._energy)
+
+
+def _trapezoid(start_w: float, end_w: float, seconds: float) -> tuple[float, float]:
+    """Return the Wh imported and exported while power moved linearly."""
+    if start_w >= 0 and end_w >= 0:
+        return (start_w + end_w) * seconds / 7200.0, 0.0
+    if start_w <= 0 and end_w <= 0:
+        return 0.0, -(start_w + end_w) * seconds / 7200.0
+    # Power crossed zero; each side is a triangle.
+    crossing = seconds * start_w / (start_w - end_w)
+    first = start_w * crossing / 7200.0
+    second = end_w * (seconds - crossing) / 7200.0
+    if start_w > 0:
+        return first, -second
+    return second, -first
+
+
+def _month_start(ts: float, timezone: tzinfo | None) -> float:
+    """Return the start of the calendar month containing ``ts``."""
+    day = datetime.fromtimestamp(ts, timezone)
+    return day.replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+def _next_month(ts: float, timezone: tzinfo | None) -> float:
+    """Return the start of the calendar month after the one containing ``ts``."""
+    day = datetime.fromtimestamp(ts, timezone)
+    year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+    return day.replace(
+        year=year, month=month, day=1, hour=0, minute=0, second=0, microsecond=0
+    ).timestamp()
+
+
+HOUR = 3600.0
+
+
+class HourlyCounter:
+    """Turn readings of a cumulative energy counter into hourly statistics.
+
+    Every reading adds the increase since the previous one to a running
+    :attr:`sum`. A reading below the previous one is taken as a counter
+    reset (the monthly counters restart at zero) and counts in full. When a
+    reading falls into a new hour, the previous hour is closed as a
+    ``(hour start, counter value, sum)`` row; :meth:`take_rows` hands the
+    closed rows out for import. Energy used between the last reading of an
+    hour and the first of the next is booked to the later hour, unless whole
+    hours were missed; :meth:`backfill` spreads the increase over those.
+    """
+
+    __slots__ = ("_open", "hour", "last", "rows", "sum")
+
+    def __init__(
+        self, hour: float | None = None, last: float | None = None, total: float = 0.0
+    ) -> None:
+        """Initialize, optionally resuming after the last imported row."""
+        self.hour = hour
+        self.last = last
+        self.sum = total
+        self.rows: list[tuple[float, float, float]] = []
+        # Whether the current hour has readings not yet closed into a row.
+        self._open = False
+
+    def add(self, ts: float, value: float) -> None:
+        """Add a counter reading taken at ``ts``."""
+        hour = ts - ts % HOUR
+        if self.hour is not None and hour < self.hour:
+            return
+        if self.hour is not None and hour > self.hour and self._open:
+            self.rows.append((self.hour, self.last, self.sum))
+        if self.last is not None:
+            delta = value - self.last
+            self.sum += value if delta < 0 else delta
+        self.last = value
+        self.hour = hour
+        self._open = True
+
+    def missed(self, ts: float) -> bool:
+        """Return *True* if whole hours passed without readings before ``ts``."""
+        return (
+            self.hour is not None
+            and self.last is not None
+            and ts - ts % HOUR > self.hour + HOUR
+        )
+
+    def backfill(
+        self, ts: float, value: float, weight: Callable[[float], float] | None = None
+    ) -> int:
+        """Close the missed hours before a reading of ``value`` at ``ts``.
+
+        The increase since the last reading is the energy used during the
+        gap; it is split over the missed hours and the elapsed part of the
+        current one in proportion to ``weight(hour start)`` (the expected
+        usage rate of that hour, e.g. from the device's daily history), or
+        evenly. The rows of the missed hours are added to :attr:`rows`; the
+        current hour's share is left for :meth:`add`. Returns the number of
+        hours filled.
+        """
+        if not self.missed(ts):
+            return 0
+        if self._open:
+            self.rows.append((self.hour, self.last, self.sum))
+            self._open = False
+        hour = ts - ts % HOUR
+        delta = value - self.last
+        # After a counter reset the counter went up from zero.
+        base = self.last if delta >= 0 else 0.0
+        delta = value - base
+        starts = _hours(self.hour + HOUR, hour)
+        rate = weight or _even
+        shares = [max(0.0, rate(start)) * HOUR for start in starts]
+        shares.append(max(0.0, rate(hour)) * (ts - hour))
+        total = sum(shares)
+        if total <= 0:
+            shares = [HOUR] * len(starts) + [ts - hour]
+            total = sum(shares)
+        used = 0.0
+        for start, share in zip(starts, shares):
+            used += delta * share / total
+            self.rows.append((start, base + used, self.sum + used))
+        self.sum += used
+        self.last = base + used
+        self.hour = hour - HOUR
+        return len(starts)
+
+    def take_rows(self) -> list[tuple[float, float, float]]:
+        """Return and forget the closed hourly rows."""
+        rows, self.rows = self.rows, []
+        return rows
+
+
+def _hours(start: float, end: float) -> list[float]:
+    """Return the hour starts from ``start`` up to, not including, ``end``."""
+    count = max(0, round((end - start) / HOUR))
+    return [start + i * HOUR for i in range(count)]
+
+
+def _even(_hour: float) -> float:
+    """Weigh every hour the same."""
+    return 1.0
+
+
+def daily_weights(days: list[tuple[float, float]]) -> Callable[[float], float]:
+    """Return an hourly usage rate from ``(day start, Wh)`` history.
+
+    Hours of a listed day get that day's average hourly usage; other hours
+    the average over all listed days.
+    """
+    rates = {day: value / 24 for day, value in days}
+    default = sum(rates.values()) / len(rates) if rates else 1.0
+
+    def weight(hour: float) -> float:
+        for day, rate in rates.items():
+            if day <= hour < day + 86400:
+                return rate
+        return default
+
+    return weight
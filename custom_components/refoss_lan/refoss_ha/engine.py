@@ -0,0 +1,155 @@
+"""Poll many devices from a single task, each on its own interval."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+import heapq
+import itertools
+import logging
+import time
+
+from .metrics import LatencyHistogram
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT = 32
+
+# Spreads the first polls of devices added together over their interval.
+_GOLDEN_RATIO = 0.6180339887498949
+
+
+@dataclass(slots=True, eq=False)
+class _Job:
+    """One device's poll and its schedule."""
+
+    key: Hashable
+    interval: float
+    poll: Callable[[], Awaitable[object]]
+    task: asyncio.Task | None = None
+
+
+class PollEngine:
+    """Run the polls of many devices on one timer.
+
+    Every device is added with a key, an interval and a ``poll`` coroutine
+    function. :meth:`run` sleeps until the next poll is due, starts every
+    poll that is due and goes back to sleep, so a fleet costs one task and
+    one timer rather than one per device. Polls keep a fixed rate: the next
+    one is due an interval after the previous one was due, not after it
+    finished, and a poll that is due while the previous one of the device is
+    still running is skipped. At most ``max_concurrent`` polls run at once;
+    the time a poll starts after it was due is recorded as its lag.
+
+    The first polls of devices added one after another are spread over their
+    interval instead of all falling on the same tick. Devices can be added
+    and removed while the engine runs; removing one cancels its running
+    poll. A poll that raises is logged and does not stop the others.
+    """
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT) -> None:
+        """Initialize an engine without devices."""
+        self._jobs: dict[Hashable, _Job] = {}
+        # (due, arrival, job); entries of removed or replaced jobs are skipped.
+        self._schedule: list[tuple[float, int, _Job]] = []
+        self._arrival = itertools.count()
+        self._added = itertools.count()
+        self._wake = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.polls = 0
+        self.failed_polls = 0
+        self.skipped_polls = 0
+        self.lag = LatencyHistogram()
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Return *True* if a device is polled under ``key``."""
+        return key in self._jobs
+
+    def __len__(self) -> int:
+        """Return the number of devices."""
+        return len(self._jobs)
+
+    def add(
+        self, key: Hashable, interval: float, poll: Callable[[], Awaitable[object]]
+    ) -> None:
+        """Poll ``poll`` every ``interval`` seconds, replacing any poll under ``key``."""
+        self.remove(key)
+        job = self._jobs[key] = _Job(key, interval, poll)
+        offset = interval * ((next(self._added) * _GOLDEN_RATIO) % 1.0)
+        self._push(job, time.monotonic() + offset)
+        self._wake.set()
+
+    def remove(self, key: Hashable) -> None:
+        """Stop polling the device under ``key``; cancel its running poll."""
+        job = self._jobs.pop(key, None)
+        if job is not None and job.task is not None:
+            job.task.cancel()
+
+    async def run(self) -> None:
+        """Start the polls as they fall due, until cancelled."""
+        try:
+            while True:
+                now = time.monotonic()
+                while self._schedule and self._schedule[0][0] <= now:
+                    due, _arrival, job = heapq.heappop(self._schedule)
+                    if self._jobs.get(job.key) is not job:
+                        continue
+                    self._start(job, due)
+                    due += job.interval
+                    if due <= now:
+                        # Fell behind by a whole interval; resume from now.
+                        due = now + job.interval
+                    self._push(job, due)
+                self._wake.clear()
+                timeout = self._schedule[0][0] - now if self._schedule else None
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for job in self._jobs.values():
+                if job.task is not None:
+                    job.task.cancel()
+
+    def _push(self, job: _Job, due: float) -> None:
+        """Schedule the next poll of ``job``."""
+        heapq.heappush(self._schedule, (due, next(self._arrival), job))
+
+    def _start(self, job: _Job, due: float) -> None:
+        """Start a due poll unless the previous one is still running."""
+        if job.task is not None and not job.task.done():
+            self.skipped_polls += 1
+            return
+        job.task = asyncio.create_task(
+            self._poll(job, due), name=f"refoss poll {job.key}"
+        )
+
+    async def _poll(self, job: _Job, due: float) -> None:
+        """Run one poll within the concurrency limit."""
+        async with self._slots:
+            self.lag.record(max(0.0, time.monotonic() - due))
+            try:
+                await job.poll()
+            except Exception:  # noqa: BLE001
+                self.failed_polls += 1
+                _LOGGER.debug("Poll of %s failed", job.key, exc_info=True)
+            else:
+                self.polls += 1
+
+    def as_dict(self) -> dict:
+        """Return engine counters (for diagnostics)."""
+        return {
+            "devices": len(self._jobs),
+            "running": sum(
+                1
+                for job in self._jobs.values()
+                if job.task is not None and not job.task.done()
+            ),
+            "max_concurrent": self.max_concurrent,
+            "polls": self.polls,
+            "failed_polls": self.failed_polls,
+            "skipped_polls": self.skipped_polls,
+            "lag": self.lag.as_dict(),
+        }
@@ -9,5 +9,7 @@ class Namespace(Enum):
     SYSTEM_ALL = "Appliance.System.All"
     SYSTEM_ABILITY = "Appliance.System.Ability"
 
+    CONTROL_MULTIPLE = "Appliance.Control.Multiple"
     CONTROL_TOGGLEX = "Appliance.Control.ToggleX"
     CONTROL_ELECTRICITYX = "Appliance.Control.ElectricityX"
+    CONTROL_CONSUMPTIONX = "Appliance.Control.ConsumptionX"
@@ -15,5 +15,9 @@ class DeviceTimeoutError(RefossError):
     """Exception raised when http request timeout."""
 
 
+class DeadlineExceeded(DeviceTimeoutError):
+    """Exception raised when a poll deadline passes before a request is sent."""
+
+
 class SocketError(RefossError):
     """Exception raised when socket send msg."""
@@ -0,0 +1,180 @@
+"""In-memory history of recent readings, one ring buffer per channel and field."""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable
+import logging
+import math
+
+_LOGGER = logging.getLogger(__name__)
+
+# Time span the buffers are sized to cover, in seconds.
+DEFAULT_WINDOW = 600.0
+# 600 samples covers 10 minutes of 1 s polling.
+DEFAULT_CAPACITY = 600
+# Upper bound for all buffers of a single device (timestamp + value = 16 bytes/sample).
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+
+_SAMPLE_SIZE = 16
+
+
+class RingBuffer:
+    """Fixed-size buffer of ``(timestamp, value)`` pairs stored as doubles."""
+
+    __slots__ = ("_capacity", "_size", "_start", "_ts", "_values")
+
+    def __init__(self, capacity: int) -> None:
+        """Allocate the buffer up front so its size never changes."""
+        self._capacity = capacity
+        self._ts = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of stored samples."""
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory held by the sample arrays."""
+        return _SAMPLE_SIZE * self._capacity
+
+    def append(self, ts: float, value: float) -> None:
+        """Store a sample, overwriting the oldest one when full."""
+        if self._size < self._capacity:
+            pos = (self._start + self._size) % self._capacity
+            self._size += 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % self._capacity
+        self._ts[pos] = ts
+        self._values[pos] = value
+
+    def range(
+        self, start: float | None = None, end: float | None = None
+    ) -> list[tuple[float, float]]:
+        """Return the samples with ``start <= timestamp <= end``, oldest first."""
+        result: list[tuple[float, float]] = []
+        capacity = self._capacity
+        ts_arr = self._ts
+        val_arr = self._values
+        for i in range(self._size):
+            pos = (self._start + i) % capacity
+            ts = ts_arr[pos]
+            if start is not None and ts < start:
+                continue
+            if end is not None and ts > end:
+                break
+            result.append((ts, val_arr[pos]))
+        return result
+
+
+def capacity_for(interval: float, window: float = DEFAULT_WINDOW) -> int:
+    """Return the samples per series covering ``window`` at a poll ``interval``."""
+    if interval <= 0:
+        return DEFAULT_CAPACITY
+    return max(1, min(DEFAULT_CAPACITY, math.ceil(window / interval)))
+
+
+class ReadingHistory:
+    """Per-channel, per-field ring buffers sharing one memory budget.
+
+    Buffers are created lazily the first time a field is recorded for a
+    channel. Once the budget is used up new series are ignored, so the
+    memory held by a device never exceeds ``max_bytes``. Only the fields a
+    controller tracks are recorded; identifiers such as ``channel`` or
+    ``id`` in the raw status are not readings.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        """Initialize the history."""
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._series: dict[tuple[int, str], RingBuffer] = {}
+        self._nbytes = 0
+        self._budget_logged = False
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory held by all buffers."""
+        return self._nbytes
+
+    def resize(self, capacity: int) -> None:
+        """Change the samples kept per series, keeping the newest ones."""
+        if capacity == self.capacity:
+            return
+        old = self._series
+        self.capacity = capacity
+        self._series = {}
+        self._nbytes = 0
+        for (channel, field), buffer in old.items():
+            if (resized := self._create(channel, field)) is None:
+                break
+            for ts, value in buffer.range()[-capacity:]:
+                resized.append(ts, value)
+
+    def series(self) -> list[tuple[int, str]]:
+        """Return the recorded ``(channel, field)`` pairs."""
+        return list(self._series)
+
+    def record(self, channel: int, field: str, ts: float, value: float) -> None:
+        """Append a single sample."""
+        buffer = self._series.get((channel, field))
+        if buffer is None:
+            buffer = self._create(channel, field)
+            if buffer is None:
+                return
+        buffer.append(ts, value)
+
+    def record_entry(
+        self, channel: int, ts: float, entry: dict, fields: Iterable[str]
+    ) -> None:
+        """Append the numeric values of ``fields`` in a raw channel status dict."""
+        for field in fields:
+            value = entry.get(field)
+            if isinstance(value, (int, float)):
+                self.record(channel, field, ts, float(value))
+
+    def record_entries(
+        self, ts: float, entries: list[tuple[int, dict]], fields: Iterable[str]
+    ) -> None:
+        """Append the status dicts of several channels, given as ``(channel, dict)``."""
+        for channel, entry in entries:
+            self.record_entry(channel, ts, entry, fields)
+
+    def query(
+        self,
+        channel: int,
+        field: str,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> list[tuple[float, float]]:
+        """Return the samples of one series between ``start`` and ``end``."""
+        buffer = self._series.get((channel, field))
+        if buffer is None:
+            return []
+        return buffer.range(start, end)
+
+    def _create(self, channel: int, field: str) -> RingBuffer | None:
+        """Create a buffer if the memory budget allows it."""
+        size = _SAMPLE_SIZE * self.capacity
+        if self._nbytes + size > self.max_bytes:
+            if not self._budget_logged:
+                self._budget_logged = True
+                _LOGGER.debug(
+                    "History budget of %d bytes reached; not recording channel %s field %s",
+                    self.max_bytes,
+                    channel,
+                    field,
+                )
+            return None
+        buffer = RingBuffer(self.capacity)
+        self._series[(channel, field)] = buffer
+        self._nbytes += size
+        return buffer
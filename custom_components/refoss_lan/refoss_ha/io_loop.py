@@ -0,0 +1,177 @@
+"""Dedicated event loop thread for device polls."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import threading
+from typing import TYPE_CHECKING, Any
+
+from .state import Deltas, apply_deltas, collect_deltas
+
+if TYPE_CHECKING:
+    from .controller.device import BaseDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 0.02
+
+# (caller loop, caller future, queued state writes, poll error)
+_Result = tuple[asyncio.AbstractEventLoop, asyncio.Future, Deltas, BaseException | None]
+
+
+class IoLoop:
+    """Run device polls on a private asyncio loop in a daemon thread.
+
+    :meth:`async_poll` runs ``device.async_handle_update()`` on this loop,
+    so the requests, JSON decoding and response parsing happen off the
+    caller's loop. State writes made by the poll are queued as compact
+    deltas (see :func:`.state.collect_deltas`) rather than applied. Finished
+    polls are handed back in batches: at most one cross-thread callback per
+    caller loop every ``flush_interval`` seconds, which applies the deltas
+    and resumes the waiting callers.
+
+    Commands are not routed through this loop; they stay on the caller's
+    loop where the optimistic state lives.
+    """
+
+    def __init__(
+        self, flush_interval: float = DEFAULT_FLUSH_INTERVAL, name: str = "refoss_io"
+    ) -> None:
+        """Initialize a stopped loop; call :meth:`start` to run it."""
+        self.flush_interval = flush_interval
+        self._name = name
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._ready: list[_Result] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self.polls = 0
+        self.batches = 0
+        self.deltas = 0
+
+    @property
+    def running(self) -> bool:
+        """Return *True* while the thread is running."""
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Start the thread and wait until its loop runs."""
+        if self._thread is not None:
+            return
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+        thread = threading.Thread(
+            target=self._run, args=(loop, started), name=self._name, daemon=True
+        )
+        thread.start()
+        started.wait()
+        self._loop = loop
+        self._thread = thread
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the loop and join the thread. Blocks; run it in an executor."""
+        if self._thread is None or self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop = None
+        self._thread = None
+
+    def _run(self, loop: asyncio.AbstractEventLoop, started: threading.Event) -> None:
+        """Thread body: run the loop, then cancel what is left and close it."""
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        try:
+            loop.run_forever()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            # Release callers of polls that were cancelled above.
+            self._flush()
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+
+    async def async_poll(self, device: BaseDevice) -> None:
+        """Poll ``device`` on the I/O loop and apply its state changes here.
+
+        Raises whatever the poll raised. Context variables of the caller
+        (such as an open poll trace) are visible to the poll.
+        """
+        loop = self._loop
+        if loop is None:
+            raise RuntimeError("The Refoss I/O loop is not running")
+        caller = asyncio.get_running_loop()
+        done = caller.create_future()
+        loop.call_soon_threadsafe(
+            self._start_poll, device, caller, done, contextvars.copy_context()
+        )
+        await done
+
+    def _start_poll(
+        self,
+        device: BaseDevice,
+        caller: asyncio.AbstractEventLoop,
+        done: asyncio.Future,
+        context: contextvars.Context,
+    ) -> None:
+        """Create the poll task on the I/O loop, in the caller's context."""
+        self._loop.create_task(self._poll(device, caller, done), context=context)
+
+    async def _poll(
+        self, device: BaseDevice, caller: asyncio.AbstractEventLoop, done: asyncio.Future
+    ) -> None:
+        """Run one poll and queue its result for the next flush."""
+        error: BaseException | None = None
+        with collect_deltas() as deltas:
+            try:
+                await device.async_handle_update()
+            except (Exception, asyncio.CancelledError) as err:  # handed to the caller
+                error = err
+        self.polls += 1
+        self._ready.append((caller, done, deltas, error))
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.flush_interval, self._flush)
+
+    def _flush(self) -> None:
+        """Hand finished polls back to their loops, one callback per loop."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        ready, self._ready = self._ready, []
+        batches: dict[asyncio.AbstractEventLoop, list[_Result]] = {}
+        for result in ready:
+            batches.setdefault(result[0], []).append(result)
+            self.deltas += len(result[2])
+        for caller, results in batches.items():
+            self.batches += 1
+            try:
+                caller.call_soon_threadsafe(_deliver, results)
+            except RuntimeError:
+                _LOGGER.debug("Dropping %d poll results for a closed loop", len(results))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return counters (for diagnostics)."""
+        return {
+            "running": self.running,
+            "flush_interval_s": self.flush_interval,
+            "polls": self.polls,
+            "batches": self.batches,
+            "deltas": self.deltas,
+        }
+
+
+def _deliver(results: list[_Result]) -> None:
+    """Apply a batch of poll results on the caller's loop."""
+    for _caller, done, deltas, error in results:
+        apply_deltas(deltas)
+        if done.done():
+            continue
+        if error is None:
+            done.set_result(None)
+        elif isinstance(error, asyncio.CancelledError):
+            done.cancel()
+        else:
+            done.set_exception(error)
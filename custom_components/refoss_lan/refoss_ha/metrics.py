@@ -0,0 +1,168 @@
+"""Per-device transport and polling metrics."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+
+# Upper bucket bounds in milliseconds, roughly 19% apart from 1 ms to 60 s.
+_BOUNDS_MS: tuple[float, ...] = tuple(
+    round(1.0 * 1.19**i, 3) for i in range(64) if 1.19**i <= 60000.0
+)
+
+
+class LatencyHistogram:
+    """Latency histogram with fixed logarithmic buckets.
+
+    Recording is a binary search and an integer increment, so it allocates
+    nothing per sample. Percentiles are reported as the upper bound of the
+    bucket they fall in (capped at the maximum seen), which overestimates by
+    at most one bucket width.
+    """
+
+    __slots__ = ("_counts", "count", "max_ms", "total_ms")
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        # One extra bucket for samples above the largest bound.
+        self._counts = [0] * (len(_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Record one sample."""
+        ms = seconds * 1000.0
+        self._counts[bisect_left(_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def merge(self, other: LatencyHistogram) -> None:
+        """Add the samples of ``other`` to this histogram."""
+        for index, count in enumerate(other._counts):
+            self._counts[index] += count
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Return the latency in ms below which ``fraction`` of samples fall."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if count and seen >= rank:
+                if index < len(_BOUNDS_MS):
+                    return min(_BOUNDS_MS[index], round(self.max_ms, 3))
+                return round(self.max_ms, 3)
+        return round(self.max_ms, 3)
+
+    def as_dict(self) -> dict[str, float | int | None]:
+        """Return summary statistics."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class DeviceMetrics:
+    """Counters for one device, fed by its transport and its poller."""
+
+    __slots__ = (
+        "bytes_received",
+        "bytes_sent",
+        "cut_polls",
+        "errors",
+        "interval_drift",
+        "last_poll_duration",
+        "last_poll_start",
+        "latency",
+        "poll_duration",
+        "polls",
+        "requests",
+        "timeouts",
+        "unchanged",
+    )
+
+    def __init__(self) -> None:
+        """Initialize zeroed metrics."""
+        self.reset()
+
+    def reset(self) -> None:
+        """Zero all metrics."""
+        self.latency = LatencyHistogram()
+        self.poll_duration = LatencyHistogram()
+        self.requests = 0
+        self.timeouts = 0
+        self.errors = 0
+        # Responses identical to the previous one, returned undecoded.
+        self.unchanged = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.polls = 0
+        self.last_poll_start: float | None = None
+        self.last_poll_duration: float | None = None
+        # Seconds between the last two poll starts minus the configured interval.
+        self.interval_drift: float | None = None
+        # Polls whose deadline passed before every channel was read.
+        self.cut_polls = 0
+
+    def record_request(self, elapsed: float, sent: int, received: int) -> None:
+        """Record a completed request."""
+        self.requests += 1
+        self.latency.record(elapsed)
+        self.bytes_sent += sent
+        self.bytes_received += received
+
+    def record_unchanged(self) -> None:
+        """Record that the last completed request returned an unchanged response."""
+        self.unchanged += 1
+
+    def record_timeout(self) -> None:
+        """Record a request that timed out."""
+        self.requests += 1
+        self.timeouts += 1
+
+    def record_error(self) -> None:
+        """Record a request that failed for any other reason."""
+        self.requests += 1
+        self.errors += 1
+
+    def record_poll(self, started: float, duration: float, interval: float) -> None:
+        """Record one poll, timed on a monotonic clock."""
+        if self.last_poll_start is not None:
+            self.interval_drift = started - self.last_poll_start - interval
+        self.last_poll_start = started
+        self.last_poll_duration = duration
+        self.poll_duration.record(duration)
+        self.polls += 1
+
+    def record_cut_poll(self) -> None:
+        """Record a poll that timed out after reading part of the device."""
+        self.cut_polls += 1
+
+    def as_dict(self) -> dict:
+        """Return all metrics (for diagnostics)."""
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "unchanged": self.unchanged,
+            "unchanged_ratio": (
+                round(self.unchanged / self.requests, 3) if self.requests else None
+            ),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency": self.latency.as_dict(),
+            "polls": self.polls,
+            "poll_duration": self.poll_duration.as_dict(),
+            "interval_drift_s": self.interval_drift,
+            "cut_polls": self.cut_polls,
+        }
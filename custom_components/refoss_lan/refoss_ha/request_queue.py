@@ -0,0 +1,215 @@
+"""Per-device request queue: one request at a time, commands first, polls on a deadline."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+import heapq
+import itertools
+import threading
+import time
+
+from .exceptions import DeadlineExceeded
+
+
+class Priority(IntEnum):
+    """Order in which waiting requests are sent; lower goes first."""
+
+    COMMAND = 0
+    READBACK = 1
+    POLL = 2
+
+
+# Priority of the requests made by the current task.
+_priority: ContextVar[Priority] = ContextVar("refoss_priority", default=Priority.POLL)
+
+
+@contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    """Send the requests made inside the block with ``level``."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# Monotonic time by which the requests of the current task must be done.
+_deadline: ContextVar[float | None] = ContextVar("refoss_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Let the requests made inside the block share ``seconds`` in total.
+
+    Waiting for the device's slot and the requests themselves count against
+    it. A nested deadline can only shorten the outer one.
+    """
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(at, outer))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> float | None:
+    """Return the seconds left before the current deadline, or *None*."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def request_timeout(timeout: float) -> float:
+    """Return ``timeout`` capped to the time left before the current deadline.
+
+    Raises :class:`DeadlineExceeded` when the deadline has passed.
+    """
+    left = time_left()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded
+    return min(timeout, left)
+
+
+# (priority, arrival, waiter loop, waiter future)
+_Waiter = tuple[int, int, asyncio.AbstractEventLoop, asyncio.Future]
+
+
+class RequestQueue:
+    """Serialize the requests to one device and order them by priority.
+
+    The devices answer HTTP on a single thread, so concurrent requests only
+    queue up on the device, where a command can end up behind a slow
+    multi-channel status read. Here every request takes the device's only
+    slot (:meth:`slot`); while it is taken, new requests wait and are
+    admitted by :class:`Priority` (user commands, then command readbacks,
+    then polls) and in arrival order within a priority. A request in flight
+    is never interrupted.
+
+    :meth:`async_poll` runs a whole poll at :attr:`Priority.POLL` and skips
+    it if the previous poll of the device has not finished yet. Inside a
+    :func:`deadline` a request stops waiting for the slot when the deadline
+    passes.
+
+    Requests may come from several event loops (see :mod:`.io_loop`); the
+    queue state is guarded by a lock and waiters are resumed on their own
+    loop.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an idle queue."""
+        self._lock = threading.Lock()
+        self._busy = False
+        self._waiters: list[_Waiter] = []
+        self._arrival = itertools.count()
+        self._polling = False
+        self.skipped_polls = 0
+        self.requests = dict.fromkeys(Priority, 0)
+        self.waited = dict.fromkeys(Priority, 0)
+        self.max_wait = dict.fromkeys(Priority, 0.0)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold the device's request slot for the duration of the block."""
+        level = _priority.get()
+        with self._lock:
+            self.requests[level] += 1
+            if not self._busy:
+                self._busy = True
+                future = None
+            else:
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                heapq.heappush(
+                    self._waiters, (level, next(self._arrival), loop, future)
+                )
+        if future is not None:
+            started = time.monotonic()
+            left = time_left()
+            try:
+                if left is None:
+                    await future
+                else:
+                    await asyncio.wait_for(future, max(left, 0))
+            except (asyncio.CancelledError, asyncio.TimeoutError) as err:
+                if future.done() and not future.cancelled():
+                    # Granted just before giving up; pass the slot on.
+                    self._release()
+                if isinstance(err, asyncio.TimeoutError):
+                    raise DeadlineExceeded from None
+                raise
+            wait = time.monotonic() - started
+            with self._lock:
+                self.waited[level] += 1
+                self.max_wait[level] = max(self.max_wait[level], wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        """Hand the slot to the first waiter, or free it."""
+        with self._lock:
+            if not self._waiters:
+                self._busy = False
+                return
+            _level, _arrival, loop, future = heapq.heappop(self._waiters)
+        if loop is _running_loop():
+            self._grant(future)
+            return
+        try:
+            loop.call_soon_threadsafe(self._grant, future)
+        except RuntimeError:
+            # The waiter's loop is closed; try the next one.
+            self._release()
+
+    def _grant(self, future: asyncio.Future) -> None:
+        """Resume a waiter on its loop; skip it if it gave up meanwhile."""
+        if future.done():
+            self._release()
+        else:
+            future.set_result(None)
+
+    async def async_poll(self, poll: Callable[[], Awaitable[None]]) -> bool:
+        """Run ``poll`` unless one is in flight; return *False* if skipped."""
+        with self._lock:
+            if self._polling:
+                self.skipped_polls += 1
+                return False
+            self._polling = True
+        try:
+            with priority(Priority.POLL):
+                await poll()
+        finally:
+            self._polling = False
+        return True
+
+    def as_dict(self) -> dict:
+        """Return queue counters (for diagnostics)."""
+        with self._lock:
+            return {
+                "busy": self._busy,
+                "waiting": len(self._waiters),
+                "skipped_polls": self.skipped_polls,
+                "priorities": {
+                    level.name.lower(): {
+                        "requests": self.requests[level],
+                        "waited": self.waited[level],
+                        "max_wait_ms": round(self.max_wait[level] * 1000, 3),
+                    }
+                    for level in Priority
+                },
+            }
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    """Return the event loop of the calling thread, if one is running."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
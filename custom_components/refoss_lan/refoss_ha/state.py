@@ -0,0 +1,286 @@
+"""Compact per-channel state storage shared by the controllers."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+# Queued state writes: (function, arguments) pairs.
+Deltas = list[tuple[Callable[..., Any], tuple[Any, ...]]]
+
+_deltas: ContextVar[Deltas | None] = ContextVar("refoss_state_deltas", default=None)
+
+
+@contextmanager
+def collect_deltas() -> Iterator[Deltas]:
+    """Queue state writes made inside the block instead of applying them.
+
+    Used when a poll runs on another thread than the one reading the state:
+    the poll computes what changed and :func:`apply_deltas` writes it later
+    on the owning thread.
+    """
+    deltas: Deltas = []
+    token = _deltas.set(deltas)
+    try:
+        yield deltas
+    finally:
+        _deltas.reset(token)
+
+
+def apply_deltas(deltas: Deltas) -> None:
+    """Apply state writes queued by :func:`collect_deltas`, in order."""
+    for func, args in deltas:
+        func(*args)
+
+
+def defer(func: Callable[..., Any], *args: Any) -> None:
+    """Call ``func(*args)`` now, or queue it while deltas are being collected."""
+    deltas = _deltas.get()
+    if deltas is None:
+        func(*args)
+    else:
+        deltas.append((func, args))
+
+
+# Called with (channel, field, new value).
+FieldCallback = Callable[[int, str, Any], None]
+
+
+class Subscriptions:
+    """Callbacks for changes of single fields, by channel and field.
+
+    A channel or field of *None* subscribes to every channel or field. A
+    callback that raises is logged and does not stop the others.
+    """
+
+    __slots__ = ("_callbacks",)
+
+    def __init__(self) -> None:
+        """Initialize without subscriptions."""
+        self._callbacks: dict[tuple[int | None, str | None], list[FieldCallback]] = {}
+
+    def __len__(self) -> int:
+        """Return the number of subscribed ``(channel, field)`` keys."""
+        return len(self._callbacks)
+
+    def subscribe(
+        self, channel: int | None, field: str | None, callback: FieldCallback
+    ) -> Callable[[], None]:
+        """Call ``callback`` when the field changes; return an unsubscriber."""
+        key = (channel, field)
+        self._callbacks.setdefault(key, []).append(callback)
+
+        def unsubscribe() -> None:
+            callbacks = self._callbacks.get(key)
+            if callbacks and callback in callbacks:
+                callbacks.remove(callback)
+                if not callbacks:
+                    del self._callbacks[key]
+
+        return unsubscribe
+
+    def notify(self, channel: int, field: str, value: Any) -> None:
+        """Run the callbacks subscribed to ``(channel, field)``."""
+        callbacks = self._callbacks
+        for key in ((channel, field), (channel, None), (None, field), (None, None)):
+            for callback in list(callbacks.get(key, ())):
+                try:
+                    callback(channel, field, value)
+                except Exception:
+                    _LOGGER.exception(
+                        "Error in callback for channel %s field %s", channel, field
+                    )
+
+
+class ChannelStateStore:
+    """Store a fixed set of fields for every channel in one flat list.
+
+    Each channel owns a contiguous row of ``len(fields)`` slots. Field
+    positions are resolved once through a precomputed index, so a lookup is
+    two dict hits and a list index instead of a nested dict walk, and a poll
+    overwrites the existing slots in place instead of allocating a new dict
+    per channel. Fields not listed in ``fields`` are dropped.
+
+    ``generation`` increases whenever a stored value changes, which lets
+    consumers cache anything derived from the store.
+
+    Inside :func:`collect_deltas`, :meth:`set` and :meth:`update` leave the
+    store untouched and queue only the changed slots.
+
+    Every value written that differs from the stored one is reported to
+    ``subscriptions``, once the whole row is written (for queued changes,
+    when they are applied).
+    """
+
+    __slots__ = (
+        "_index",
+        "_offsets",
+        "_values",
+        "fields",
+        "generation",
+        "subscriptions",
+    )
+
+    def __init__(
+        self,
+        fields: Iterable[str],
+        channels: Iterable[int] = (),
+        subscriptions: Subscriptions | None = None,
+    ) -> None:
+        """Initialize the store, pre-allocating rows for known channels."""
+        self.fields: tuple[str, ...] = tuple(fields)
+        self._index: dict[str, int] = {f: i for i, f in enumerate(self.fields)}
+        self._offsets: dict[int, int] = {}
+        self._values: list[Any] = []
+        self.generation = 0
+        self.subscriptions = subscriptions
+        for channel in channels:
+            self._add_channel(channel)
+
+    def _add_channel(self, channel: int) -> int:
+        """Append an empty row for a channel and return its offset."""
+        offset = len(self._values)
+        self._values.extend([None] * len(self.fields))
+        self._offsets[channel] = offset
+        return offset
+
+    @property
+    def channels(self) -> list[int]:
+        """Return the channels with a row in the store."""
+        return list(self._offsets)
+
+    def field_index(self, field: str) -> int | None:
+        """Return the position of a field within a row, or *None*."""
+        return self._index.get(field)
+
+    def offset(self, channel: int) -> int | None:
+        """Return the offset of a channel's row, or *None*."""
+        return self._offsets.get(channel)
+
+    def slot(self, channel: int, field: str) -> int | None:
+        """Return the flat position of ``(channel, field)``, or *None*."""
+        offset = self._offsets.get(channel)
+        index = self._index.get(field)
+        if offset is None or index is None:
+            return None
+        return offset + index
+
+    def value_at(self, slot: int) -> Any:
+        """Return the value at a flat position obtained from :meth:`slot`."""
+        return self._values[slot]
+
+    def get(self, channel: int, field: str) -> Any:
+        """Return the value of a field, or *None* if unknown."""
+        offset = self._offsets.get(channel)
+        index = self._index.get(field)
+        if offset is None or index is None:
+            return None
+        return self._values[offset + index]
+
+    def set(self, channel: int, field: str, value: Any) -> bool:
+        """Set a single field; return *True* if the stored value changed."""
+        index = self._index.get(field)
+        if index is None:
+            return False
+        if (deltas := _deltas.get()) is not None:
+            if self.get(channel, field) == value:
+                return False
+            deltas.append((self.apply, (channel, {index: value})))
+            return True
+        offset = self._offsets.get(channel)
+        if offset is None:
+            offset = self._add_channel(channel)
+        pos = offset + index
+        if self._values[pos] == value:
+            return False
+        self._values[pos] = value
+        self.generation += 1
+        if self.subscriptions:
+            self.subscriptions.notify(channel, field, value)
+        return True
+
+    def update(self, channel: int, raw: dict) -> bool:
+        """Copy the tracked fields of a raw status dict into a channel's row.
+
+        Fields missing from ``raw`` become *None*, matching the behaviour of
+        replacing the whole status dict. Returns *True* if anything changed.
+        """
+        if (deltas := _deltas.get()) is not None:
+            return self._queue_update(deltas, channel, raw)
+        offset = self._offsets.get(channel)
+        if offset is None:
+            offset = self._add_channel(channel)
+        values = self._values
+        subscriptions = self.subscriptions
+        # Only collected while someone listens.
+        notify: list[tuple[str, Any]] | None = [] if subscriptions else None
+        changed = False
+        pos = offset
+        for field in self.fields:
+            value = raw.get(field)
+            if values[pos] != value:
+                values[pos] = value
+                changed = True
+                if notify is not None:
+                    notify.append((field, value))
+            pos += 1
+        if changed:
+            self.generation += 1
+            if notify:
+                for field, value in notify:
+                    subscriptions.notify(channel, field, value)
+        return changed
+
+    def _queue_update(self, deltas: Deltas, channel: int, raw: dict) -> bool:
+        """Queue the fields of ``raw`` that differ from the stored row."""
+        offset = self._offsets.get(channel)
+        values = self._values
+        changes: dict[int, Any] = {}
+        for index, field in enumerate(self.fields):
+            value = raw.get(field)
+            current = None if offset is None else values[offset + index]
+            if current != value:
+                changes[index] = value
+        if not changes:
+            return False
+        deltas.append((self.apply, (channel, changes)))
+        return True
+
+    def apply(self, channel: int, changes: dict[int, Any]) -> None:
+        """Write queued changes (field position to value) into a channel's row."""
+        offset = self._offsets.get(channel)
+        if offset is None:
+            offset = self._add_channel(channel)
+        values = self._values
+        subscriptions = self.subscriptions
+        notify: list[tuple[str, Any]] = []
+        for index, value in changes.items():
+            if subscriptions and values[offset + index] != value:
+                notify.append((self.fields[index], value))
+            values[offset + index] = value
+        self.generation += 1
+        for field, value in notify:
+            subscriptions.notify(channel, field, value)
+
+    def row(self, channel: int) -> dict[str, Any]:
+        """Return a channel's known fields as a new dict."""
+        offset = self._offsets.get(channel)
+        if offset is None:
+            return {}
+        return {
+            field: value
+            for field, value in zip(
+                self.fields, self._values[offset : offset + len(self.fields)]
+            )
+            if value is not None
+        }
+
+    def as_dict(self) -> dict[int, dict[str, Any]]:
+        """Return channels with data as ``{channel: {field: value}}`` (for diagnostics)."""
+        rows = {channel: self.row(channel) for channel in self._offsets}
+        return {channel: row for channel, row in rows.items() if row}
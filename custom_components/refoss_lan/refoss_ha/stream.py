@@ -0,0 +1,164 @@
+"""Per-poll snapshots of a device, shared by every consumer of its stream."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Mapping
+from dataclasses import dataclass
+import logging
+import time
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any
+
+from .request_queue import deadline
+
+if TYPE_CHECKING:
+    from .controller.device import BaseDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+# Polls starting this early still count as on time for a consumer.
+_TOLERANCE = 0.001
+
+
+@dataclass(frozen=True, slots=True)
+class Snapshot:
+    """The state of a device after one poll.
+
+    ``channels`` maps every channel to its fields (read-only). ``stale``
+    lists the channels the poll did not refresh; if the poll failed,
+    ``error`` is the exception and every channel keeps its last values.
+    Snapshots of polls that changed nothing share their ``channels``.
+    """
+
+    time: float
+    revision: int
+    channels: Mapping[int, Mapping[str, Any]]
+    stale: frozenset[int]
+    error: Exception | None = None
+
+
+class _Consumer:
+    """A mailbox holding the latest snapshot not yet taken by one consumer."""
+
+    __slots__ = ("_event", "_latest", "interval", "next_due")
+
+    def __init__(self, interval: float) -> None:
+        """Initialize an empty mailbox."""
+        self.interval = interval
+        self.next_due = 0.0
+        self._latest: Snapshot | None = None
+        self._event = asyncio.Event()
+
+    def offer(self, snapshot: Snapshot, started: float) -> bool:
+        """Deliver ``snapshot`` if due; return *True* if one was replaced."""
+        if started < self.next_due - _TOLERANCE:
+            return False
+        self.next_due += self.interval
+        if self.next_due <= started:
+            self.next_due = started + self.interval
+        replaced = self._latest is not None
+        self._latest = snapshot
+        self._event.set()
+        return replaced
+
+    async def get(self) -> Snapshot:
+        """Wait for the next snapshot."""
+        await self._event.wait()
+        self._event.clear()
+        snapshot, self._latest = self._latest, None
+        return snapshot
+
+
+class PollStream:
+    """One poll loop for a device, fanned out to its stream consumers.
+
+    The loop starts with the first consumer and stops when the last one
+    leaves. It polls at the shortest interval any consumer asked for,
+    through the device's request queue and under a deadline, and offers
+    each :class:`Snapshot` to every consumer whose own interval has come
+    round. A consumer holds at most one snapshot: one it has not taken yet
+    is replaced by the next and counted as skipped, so a slow consumer
+    misses ticks rather than queueing them and never holds up the others.
+    """
+
+    def __init__(self, device: BaseDevice) -> None:
+        """Initialize a stream for ``device`` without consumers."""
+        self._device = device
+        self._consumers: list[_Consumer] = []
+        self._task: asyncio.Task | None = None
+        self._last: Snapshot | None = None
+        self.polls = 0
+        self.failed_polls = 0
+        # Snapshots replaced before their consumer took them.
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        """Return the number of consumers."""
+        return len(self._consumers)
+
+    async def subscribe(self, interval: float) -> AsyncIterator[Snapshot]:
+        """Yield a snapshot at most every ``interval`` seconds until closed."""
+        consumer = _Consumer(interval)
+        self._consumers.append(consumer)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(
+                self._run(), name=f"refoss stream {self._device.dev_name}"
+            )
+        try:
+            while True:
+                yield await consumer.get()
+        finally:
+            self._consumers.remove(consumer)
+            if not self._consumers and self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    async def _run(self) -> None:
+        """Poll and publish until cancelled."""
+        device = self._device
+        due = time.monotonic()
+        while self._consumers:
+            interval = min(consumer.interval for consumer in self._consumers)
+            started = time.monotonic()
+            wall = time.time()
+            error = None
+            try:
+                with deadline(device.poll_deadline(interval)):
+                    polled = await device.queue.async_poll(device.async_handle_update)
+            except Exception as err:  # noqa: BLE001
+                self.failed_polls += 1
+                _LOGGER.debug("Streaming poll of %s failed: %r", device.dev_name, err)
+                polled, error = True, err
+            else:
+                self.polls += polled
+            if polled:
+                snapshot = self._snapshot(wall, error)
+                for consumer in list(self._consumers):
+                    self.skipped += consumer.offer(snapshot, started)
+            due += interval
+            now = time.monotonic()
+            if due <= now:
+                # Fell behind by a whole interval; resume from now.
+                due = now + interval
+            await asyncio.sleep(due - now)
+
+    def _snapshot(self, wall: float, error: Exception | None) -> Snapshot:
+        """Return a snapshot of the device's current state."""
+        device = self._device
+        last = self._last
+        if error is not None:
+            stale = frozenset(device.channels)
+        else:
+            stale = frozenset(device.stale)
+        if last is not None and last.revision == device.revision:
+            channels = last.channels
+        else:
+            channels = MappingProxyType(
+                {
+                    channel: MappingProxyType(row)
+                    for channel, row in device.channel_status().items()
+                }
+            )
+        self._last = Snapshot(wall, device.revision, channels, stale, error)
+        return self._last
@@ -0,0 +1,296 @@
+"""Optional phase-level tracing of poll cycles.
+
+A :class:`Tracer` owns a bounded buffer of finished traces. While a trace
+is open, the transports and controllers record spans (connect, request
+write, device think-time, body read, JSON decode, state apply, ...) into
+it through a context variable, so no trace object has to be threaded
+through the call chain. When no trace is open,
+:func:`span` returns a shared no-op context manager and
+:func:`trace_configs` returns *None*, so the disabled cost is one context
+variable lookup per call site.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from aiohttp import TraceConfig
+
+from .state import defer
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 100
+DEFAULT_LAG_THRESHOLD = 0.1
+DEFAULT_LAG_INTERVAL = 0.5
+
+_current: ContextVar[PollTrace | None] = ContextVar("refoss_poll_trace", default=None)
+_NULL_SPAN = nullcontext()
+
+
+class PollTrace:
+    """Spans recorded during one poll cycle."""
+
+    __slots__ = ("duration", "error", "name", "spans", "started", "wall")
+
+    def __init__(self, name: str) -> None:
+        """Start a trace now."""
+        self.name = name
+        self.wall = time.time()
+        self.started = time.monotonic()
+        self.duration: float | None = None
+        self.error: str | None = None
+        # (phase, start offset, duration) in seconds
+        self.spans: list[tuple[str, float, float]] = []
+
+    def add(self, phase: str, start: float, end: float) -> None:
+        """Record a span between two monotonic timestamps."""
+        self.spans.append((phase, start - self.started, end - start))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the trace with times in milliseconds."""
+        return {
+            "name": self.name,
+            "time": self.wall,
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 3),
+            "error": self.error,
+            "spans": [
+                {
+                    "phase": phase,
+                    "offset_ms": round(offset * 1000, 3),
+                    "duration_ms": round(duration * 1000, 3),
+                }
+                for phase, offset, duration in self.spans
+            ],
+        }
+
+
+class _Span:
+    """Context manager recording one span into a trace."""
+
+    __slots__ = ("_phase", "_start", "_trace")
+
+    def __init__(self, trace: PollTrace, phase: str) -> None:
+        self._trace = trace
+        self._phase = phase
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        self._start = time.monotonic()
+
+    def __exit__(self, *exc_info) -> None:
+        defer(self._trace.add, self._phase, self._start, time.monotonic())
+
+
+def span(phase: str) -> _Span | nullcontext:
+    """Return a context manager timing ``phase`` in the current trace, if any."""
+    trace = _current.get()
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, phase)
+
+
+def mark(phase: str, start: float, end: float | None = None) -> None:
+    """Record a span measured by the caller, if a trace is open."""
+    trace = _current.get()
+    if trace is not None:
+        defer(trace.add, phase, start, time.monotonic() if end is None else end)
+
+
+class _TraceContext:
+    """Open a trace for the duration of a ``with`` block."""
+
+    __slots__ = ("_token", "_trace", "_tracer")
+
+    def __init__(self, tracer: Tracer, name: str) -> None:
+        self._tracer = tracer
+        self._trace = PollTrace(name)
+        self._token = None
+
+    def __enter__(self) -> PollTrace:
+        self._token = _current.set(self._trace)
+        self._tracer.active += 1
+        return self._trace
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        trace = self._trace
+        trace.duration = time.monotonic() - trace.started
+        if exc is not None:
+            trace.error = repr(exc)
+        _current.reset(self._token)
+        tracer = self._tracer
+        tracer.active -= 1
+        tracer.traces.append(trace)
+        tracer.last_trace = trace
+
+
+class Tracer:
+    """Bounded buffer of poll traces and event-loop lag events."""
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        lag_threshold: float = DEFAULT_LAG_THRESHOLD,
+    ) -> None:
+        """Initialize a disabled tracer."""
+        self.enabled = False
+        self.lag_threshold = lag_threshold
+        self.traces: deque[PollTrace] = deque(maxlen=capacity)
+        self.lag_events: deque[dict[str, Any]] = deque(maxlen=capacity)
+        self.active = 0
+        self.last_trace: PollTrace | None = None
+
+    def trace(self, name: str) -> _TraceContext | nullcontext:
+        """Return a context manager tracing one poll cycle when enabled."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _TraceContext(self, name)
+
+    def record_lag(self, lag: float) -> bool:
+        """Record that the event loop ran ``lag`` seconds late.
+
+        The stall counts as caused by a poll if a trace was open or
+        finished during it; the last span recorded by then names the phase.
+        Returns *True* if it did.
+        """
+        stall_start = time.monotonic() - lag
+        trace = self.last_trace
+        during_poll = self.active > 0 or (
+            trace is not None
+            and trace.duration is not None
+            and trace.started + trace.duration >= stall_start
+        )
+        phase = None
+        if during_poll and trace is not None and trace.spans:
+            phase = trace.spans[-1][0]
+        self.lag_events.append(
+            {
+                "time": time.time(),
+                "lag_ms": round(lag * 1000, 3),
+                "during_poll": during_poll,
+                "phase": phase,
+            }
+        )
+        return during_poll
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the buffered traces and lag events (for diagnostics)."""
+        return {
+            "enabled": self.enabled,
+            "lag_threshold_ms": round(self.lag_threshold * 1000, 3),
+            "traces": [trace.as_dict() for trace in self.traces],
+            "lag_events": list(self.lag_events),
+        }
+
+
+class LoopLagProbe:
+    """Detect event-loop stalls by timing a periodic callback.
+
+    One probe serves every tracer on a loop: a stall is recorded in each
+    tracer whose threshold it exceeds and logged once. The probe runs while
+    at least one tracer is added.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        interval: float = DEFAULT_LAG_INTERVAL,
+    ) -> None:
+        """Initialize a probe without tracers."""
+        self._loop = loop
+        self._tracers: set[Tracer] = set()
+        self._interval = interval
+        self._expected = 0.0
+        self._handle: asyncio.TimerHandle | None = None
+
+    def add(self, tracer: Tracer) -> None:
+        """Record stalls in ``tracer``; starts probing."""
+        self._tracers.add(tracer)
+        if self._handle is None:
+            self._schedule()
+
+    def remove(self, tracer: Tracer) -> None:
+        """Stop recording stalls in ``tracer``; stops probing after the last."""
+        self._tracers.discard(tracer)
+        if not self._tracers and self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _schedule(self) -> None:
+        self._expected = self._loop.time() + self._interval
+        self._handle = self._loop.call_at(self._expected, self._tick)
+
+    def _tick(self) -> None:
+        lag = self._loop.time() - self._expected
+        during_poll = False
+        for tracer in self._tracers:
+            if lag > tracer.lag_threshold:
+                during_poll |= tracer.record_lag(lag)
+        if during_poll:
+            _LOGGER.warning(
+                "Event loop blocked for %.0f ms while a Refoss poll was running",
+                lag * 1000,
+            )
+        self._schedule()
+
+
+# ----------------------------------------------------------------------
+# aiohttp request phases
+# ----------------------------------------------------------------------
+
+
+async def _on_request_start(session, ctx: SimpleNamespace, params) -> None:
+    ctx.start = ctx.ready = time.monotonic()
+
+
+async def _on_create_start(session, ctx: SimpleNamespace, params) -> None:
+    ctx.connecting = time.monotonic()
+
+
+async def _on_create_end(session, ctx: SimpleNamespace, params) -> None:
+    now = time.monotonic()
+    mark("connect", ctx.connecting, now)
+    ctx.ready = now
+
+
+async def _on_sent(session, ctx: SimpleNamespace, params) -> None:
+    ctx.sent = time.monotonic()
+
+
+async def _on_request_end(session, ctx: SimpleNamespace, params) -> None:
+    now = time.monotonic()
+    sent = getattr(ctx, "sent", ctx.ready)
+    mark("request_write", ctx.ready, sent)
+    mark("device_wait", sent, now)
+
+
+def _build_trace_config() -> TraceConfig:
+    config = TraceConfig()
+    config.on_request_start.append(_on_request_start)
+    config.on_connection_create_start.append(_on_create_start)
+    config.on_connection_create_end.append(_on_create_end)
+    config.on_request_headers_sent.append(_on_sent)
+    config.on_request_chunk_sent.append(_on_sent)
+    config.on_request_end.append(_on_request_end)
+    config.freeze()
+    return config
+
+
+_TRACE_CONFIG: TraceConfig | None = None
+
+
+def trace_configs() -> list[TraceConfig] | None:
+    """Return aiohttp trace configs for a new session, or *None* when not tracing."""
+    global _TRACE_CONFIG  # noqa: PLW0603
+    if _current.get() is None:
+        return None
+    if _TRACE_CONFIG is None:
+        _TRACE_CONFIG = _build_trace_config()
+    return [_TRACE_CONFIG]
@@ -1,7 +1,10 @@
 """util."""
 
+from enum import Enum
+from hashlib import blake2b
 import logging
 import re
+import threading
 
 LOGGER = logging.getLogger(__name__)
 
@@ -20,6 +23,9 @@ def _underscore_to_camel(key):
 class BaseDictPayload:
     """Base class for."""
 
+    # Attributes holding runtime state rather than payload fields.
+    _runtime_fields: frozenset[str] = frozenset()
+
     def __init__(self, *args, **kwargs) -> None:
         """init."""
 
@@ -36,6 +42,58 @@ class BaseDictPayload:
         """to_dict."""
         res = {}
         for k, v in vars(self).items():
+            if k.startswith("_") or k in self._runtime_fields:
+                # Runtime state such as metrics is not part of the payload.
+                continue
             new_key = _underscore_to_camel(k)
             res[new_key] = v
         return res
+
+
+class _NotModified(Enum):
+    """Type of :data:`NOT_MODIFIED`."""
+
+    NOT_MODIFIED = "not_modified"
+
+
+# Returned instead of a response identical to the previous one.
+NOT_MODIFIED = _NotModified.NOT_MODIFIED
+
+
+class ResponseDigests:
+    """Remember a digest of the last response body per request.
+
+    ``volatile`` matches parts of a body that change on every response
+    (message ids, timestamps, signatures); they are removed before hashing.
+    Polls on the I/O thread and commands on the caller's loop share the
+    digests of a device, so every access holds a lock.
+    """
+
+    __slots__ = ("_digests", "_lock", "_volatile")
+
+    def __init__(self, volatile: re.Pattern[bytes] | None = None) -> None:
+        """Initialize without any remembered responses."""
+        self._digests: dict[object, bytes] = {}
+        self._lock = threading.Lock()
+        self._volatile = volatile
+
+    def unchanged(self, key: object, body: bytes) -> bool:
+        """Return *True* if ``body`` matches the last one for ``key``; remember it."""
+        if self._volatile is not None:
+            body = self._volatile.sub(b"", body)
+        digest = blake2b(body, digest_size=16).digest()
+        with self._lock:
+            if self._digests.get(key) == digest:
+                return True
+            self._digests[key] = digest
+        return False
+
+    def forget(self, key: object) -> None:
+        """Forget the response for ``key``, e.g. after it turned out invalid."""
+        with self._lock:
+            self._digests.pop(key, None)
+
+    def clear(self) -> None:
+        """Forget all responses."""
+        with self._lock:
+            self._digests.clear()
@@ -3,8 +3,9 @@
 from __future__ import annotations
 
 import logging
+import math
 from collections.abc import Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
@@ -12,31 +13,209 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
     UnitOfElectricCurrent,
     UnitOfElectricPotential,
     UnitOfEnergy,
+    UnitOfInformation,
     UnitOfPower,
+    UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from homeassistant.helpers.typing import StateType
 
 from .const import CHANNEL_DISPLAY_NAME, SENSOR_EM, SENSOR_EM_RPC, SENSOR_SWITCH_RPC
-from .entity import RefossEntity
+from .entity import RefossEntity, async_setup_devices
+from .refoss_ha.aggregate import AGGREGATE_ROW
 from .refoss_ha.controller.electricity import ElectricityXMix
 from .refoss_ha.controller.em_rpc import EmRpcMix
 from .refoss_ha.controller.switch_rpc import SwitchRpcMix
+from .refoss_ha.metrics import DeviceMetrics
+from .refoss_ha.state import ChannelStateStore
 from .coordinator import RefossDataUpdateCoordinator, RefossConfigEntry
 
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with Home Assistant
+    np = None
+
 _LOGGER = logging.getLogger(__name__)
 
+# Raw value clamping applied after scaling.
+CLAMP_POSITIVE = 1  # keep the positive part: max(0, x)
+
+# Below this many converted values a plain loop beats building numpy arrays.
+_NUMPY_MIN_SIZE = 64
+
 
 @dataclass(frozen=True)
 class RefossSensorEntityDescription(SensorEntityDescription):
     """Describes Refoss sensor entity."""
 
     subkey: str | None = None
-    fn: Callable[[float], float] | None = None
+    divisor: float | None = None
+    clamp: int = 0
+
+
+@dataclass(frozen=True, kw_only=True)
+class RefossMetricSensorEntityDescription(SensorEntityDescription):
+    """Describes a Refoss performance metric sensor."""
+
+    value_fn: Callable[[DeviceMetrics], StateType]
+    entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+    entity_registry_enabled_default: bool = False
+
+
+def _ms(seconds: float | None) -> float | None:
+    """Convert seconds to milliseconds."""
+    return None if seconds is None else seconds * 1000.0
+
+
+METRIC_SENSORS: tuple[RefossMetricSensorEntityDescription, ...] = (
+    RefossMetricSensorEntityDescription(
+        key="request_latency_p50",
+        translation_key="request_latency_p50",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        value_fn=lambda m: m.latency.percentile(0.50),
+    ),
+    RefossMetricSensorEntityDescription(
+        key="request_latency_p95",
+        translation_key="request_latency_p95",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        value_fn=lambda m: m.latency.percentile(0.95),
+    ),
+    RefossMetricSensorEntityDescription(
+        key="request_latency_p99",
+        translation_key="request_latency_p99",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        value_fn=lambda m: m.latency.percentile(0.99),
+    ),
+    RefossMetricSensorEntityDescription(
+        key="request_timeouts",
+        translation_key="request_timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m.timeouts,
+    ),
+    RefossMetricSensorEntityDescription(
+        key="request_errors",
+        translation_key="request_errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m.errors,
+    ),
+    RefossMetricSensorEntityDescription(
+        key="bytes_received",
+        translation_key="bytes_received",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        value_fn=lambda m: m.bytes_received,
+    ),
+    RefossMetricSensorEntityDescription(
+        key="bytes_sent",
+        translation_key="bytes_sent",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        value_fn=lambda m: m.bytes_sent,
+    ),
+    RefossMetricSensorEntityDescription(
+        key="poll_duration",
+        translation_key="poll_duration",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        value_fn=lambda m: _ms(m.last_poll_duration),
+    ),
+    RefossMetricSensorEntityDescription(
+        key="poll_interval_drift",
+        translation_key="poll_interval_drift",
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        value_fn=lambda m: _ms(m.interval_drift),
+    ),
+)
+
+# Phase and device totals of EM models; all of them report mW and mA.
+AGGREGATE_SENSORS: tuple[RefossSensorEntityDescription, ...] = (
+    RefossSensorEntityDescription(
+        key="total_power",
+        translation_key="total_power",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=2,
+        subkey="power",
+        divisor=1000.0,
+    ),
+    RefossSensorEntityDescription(
+        key="import_power",
+        translation_key="import_power",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=2,
+        subkey="import_power",
+        divisor=1000.0,
+    ),
+    RefossSensorEntityDescription(
+        key="export_power",
+        translation_key="export_power",
+        device_class=SensorDeviceClass.POWER,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfPower.WATT,
+        suggested_display_precision=2,
+        subkey="export_power",
+        divisor=1000.0,
+    ),
+    RefossSensorEntityDescription(
+        key="phase_imbalance",
+        translation_key="phase_imbalance",
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        suggested_display_precision=1,
+        subkey="imbalance",
+    ),
+    *(
+        description
+        for phase in ("a", "b", "c")
+        for description in (
+            RefossSensorEntityDescription(
+                key=f"phase_{phase}_power",
+                translation_key=f"phase_{phase}_power",
+                device_class=SensorDeviceClass.POWER,
+                state_class=SensorStateClass.MEASUREMENT,
+                native_unit_of_measurement=UnitOfPower.WATT,
+                suggested_display_precision=2,
+                subkey=f"power_{phase}",
+                divisor=1000.0,
+            ),
+            RefossSensorEntityDescription(
+                key=f"phase_{phase}_current",
+                translation_key=f"phase_{phase}_current",
+                device_class=SensorDeviceClass.CURRENT,
+                state_class=SensorStateClass.MEASUREMENT,
+                native_unit_of_measurement=UnitOfElectricCurrent.MILLIAMPERE,
+                suggested_display_precision=2,
+                suggested_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+                subkey=f"current_{phase}",
+            ),
+        )
+    ),
+)
 
 SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
     SENSOR_EM: (
@@ -48,7 +227,7 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             native_unit_of_measurement=UnitOfPower.WATT,
             suggested_display_precision=2,
             subkey="power",
-            fn=lambda x: x / 1000.0,
+            divisor=1000.0,
         ),
         RefossSensorEntityDescription(
             key="voltage",
@@ -86,7 +265,7 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
             suggested_display_precision=2,
             subkey="mConsume",
-            fn=lambda x: max(0, x),
+            clamp=CLAMP_POSITIVE,
         ),
         RefossSensorEntityDescription(
             key="energy_returned",
@@ -95,8 +274,7 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             state_class=SensorStateClass.TOTAL_INCREASING,
             native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
             suggested_display_precision=2,
-            subkey="mConsume",
-            fn=lambda x: abs(x) if x < 0 else 0,
+            subkey="mReturned",
         ),
         RefossSensorEntityDescription(
             key="today_energy",
@@ -106,7 +284,7 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
             suggested_display_precision=2,
             subkey="today",
-            fn=lambda x: max(0, x),
+            clamp=CLAMP_POSITIVE,
         ),
         RefossSensorEntityDescription(
             key="week_energy",
@@ -116,7 +294,7 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
             suggested_display_precision=2,
             subkey="week",
-            fn=lambda x: max(0, x),
+            clamp=CLAMP_POSITIVE,
         ),
     ),
     # New RPC protocol – Em.Status.Get returns milli-units (mA, mV, mW; pf ×1000; kWh for energy)
@@ -129,7 +307,7 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             native_unit_of_measurement=UnitOfPower.WATT,
             suggested_display_precision=2,
             subkey="power",
-            fn=lambda x: x / 1000.0,
+            divisor=1000.0,
         ),
         RefossSensorEntityDescription(
             key="voltage",
@@ -158,7 +336,7 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             state_class=SensorStateClass.MEASUREMENT,
             suggested_display_precision=2,
             subkey="power_factor",
-            fn=lambda x: x / 1000.0,
+            divisor=1000.0,
         ),
         RefossSensorEntityDescription(
             key="energy",
@@ -168,7 +346,7 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
             suggested_display_precision=3,
             subkey="month_energy",
-            fn=lambda x: max(0.0, x),
+            clamp=CLAMP_POSITIVE,
         ),
     ),
     # New RPC protocol – Switch.Status.Get energy data (mW, mV, mA, Wh)
@@ -181,7 +359,7 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             native_unit_of_measurement=UnitOfPower.WATT,
             suggested_display_precision=2,
             subkey="apower",
-            fn=lambda x: x / 1000.0,
+            divisor=1000.0,
         ),
         RefossSensorEntityDescription(
             key="voltage",
@@ -211,39 +389,182 @@ SENSORS: dict[str, tuple[RefossSensorEntityDescription, ...]] = {
             native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
             suggested_display_precision=2,
             subkey="month_consumption",
-            fn=lambda x: max(0, x),
+            clamp=CLAMP_POSITIVE,
         ),
     ),
 }
 
 
+class SensorValueTable:
+    """Converted sensor values of one device, recomputed once per poll.
+
+    Each sensor registers its channel and description and receives an index.
+    The store slot is resolved at registration, or on a later refresh if the
+    channel has no row yet; whenever the store generation changes, all
+    values are read and converted in a single pass (vectorised with numpy
+    for large devices), so ``native_value`` is a list lookup. Both passes
+    return the same types: a value without a divisor keeps its own.
+    """
+
+    def __init__(self, store: ChannelStateStore) -> None:
+        """Initialize the table for a controller state store."""
+        self._store = store
+        self._slots: list[int | None] = []
+        # (index, channel, field) of entries whose channel had no row yet.
+        self._unresolved: list[tuple[int, int, str]] = []
+        self._divisors: list[float | None] = []
+        self._clamps: list[int] = []
+        # Indices of entries that need a conversion at all.
+        self._converted: list[int] = []
+        self._arrays: tuple | None = None
+        self._values: list[StateType] = []
+        self._generation = -1
+
+    def add(self, channel: int, description: RefossSensorEntityDescription) -> int:
+        """Register a sensor and return its index in the table."""
+        index = len(self._slots)
+        slot = None
+        if description.subkey:
+            slot = self._store.slot(channel, description.subkey)
+            if slot is None:
+                self._unresolved.append((index, channel, description.subkey))
+        self._slots.append(slot)
+        self._divisors.append(description.divisor)
+        self._clamps.append(description.clamp)
+        if description.divisor or description.clamp:
+            self._converted.append(index)
+        self._values.append(None)
+        self._arrays = None
+        self._generation = -1
+        return index
+
+    def value(self, index: int) -> StateType:
+        """Return the converted value of a registered sensor."""
+        if self._generation != self._store.generation:
+            self._refresh()
+        return self._values[index]
+
+    def _refresh(self) -> None:
+        """Read and convert every registered value."""
+        store = self._store
+        if self._unresolved:
+            self._resolve()
+        values = [None if slot is None else store.value_at(slot) for slot in self._slots]
+        if np is not None and len(self._converted) >= _NUMPY_MIN_SIZE:
+            try:
+                self._convert_numpy(values)
+            except (TypeError, ValueError):
+                self._convert_python(values)
+        else:
+            self._convert_python(values)
+        self._values = values
+        self._generation = store.generation
+
+    def _resolve(self) -> None:
+        """Resolve the slots of entries whose channel has a row by now."""
+        unresolved = []
+        for index, channel, field in self._unresolved:
+            if (slot := self._store.slot(channel, field)) is None:
+                unresolved.append((index, channel, field))
+            else:
+                self._slots[index] = slot
+        self._unresolved = unresolved
+
+    def _convert_python(self, values: list) -> None:
+        """Convert values in place, one at a time."""
+        for i in self._converted:
+            value = values[i]
+            if value is None:
+                continue
+            divisor = self._divisors[i]
+            if divisor:
+                value = value / divisor
+            clamp = self._clamps[i]
+            if clamp == CLAMP_POSITIVE:
+                value = max(0, value)
+            values[i] = value
+
+    def _convert_numpy(self, values: list) -> None:
+        """Convert values in place with one vectorised pass."""
+        converted = self._converted
+        if self._arrays is None:
+            self._arrays = (
+                np.array([self._divisors[i] or 1.0 for i in converted]),
+                np.array([self._clamps[i] == CLAMP_POSITIVE for i in converted]),
+            )
+        divisors, positive = self._arrays
+        raw = np.array(
+            [math.nan if values[i] is None else values[i] for i in converted],
+            dtype=float,
+        )
+        result = raw / divisors
+        result = np.where(positive, np.maximum(result, 0.0), result)
+        for i, value in zip(converted, result.tolist()):
+            original = values[i]
+            if original is None:
+                continue
+            if self._divisors[i] or isinstance(original, float):
+                values[i] = value
+            else:
+                # Clamping alone keeps integers integral, as in Python.
+                values[i] = int(value)
+
+
+def is_energy_counter(description: RefossSensorEntityDescription) -> bool:
+    """Return *True* for the cumulative energy sensors (the counters)."""
+    return (
+        description.device_class == SensorDeviceClass.ENERGY
+        and description.state_class == SensorStateClass.TOTAL_INCREASING
+    )
+
+
+def sensor_source(
+    device: ElectricityXMix | EmRpcMix | SwitchRpcMix,
+) -> tuple[str, ChannelStateStore]:
+    """Return the sensor type and the state store of a channel controller."""
+    if isinstance(device, ElectricityXMix):
+        return SENSOR_EM, device.electricity_state
+    if isinstance(device, EmRpcMix):
+        return SENSOR_EM_RPC, device.em_state
+    return SENSOR_SWITCH_RPC, device.switch_state
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: RefossConfigEntry,
     async_add_entities: AddConfigEntryEntitiesCallback,
 ) -> None:
     """Set up the Refoss device from a config entry."""
-    coordinator = config_entry.runtime_data
-    device = coordinator.device
-    if not isinstance(device, (ElectricityXMix, EmRpcMix, SwitchRpcMix)):
-        _LOGGER.warning(
-            "Unrecognised device class %s for %s; no sensors will be created",
-            type(device).__name__,
-            device.device_type,
-        )
-        return
 
-    def init_device(device: ElectricityXMix | EmRpcMix | SwitchRpcMix):
+    @callback
+    def init_device(coordinator: RefossDataUpdateCoordinator) -> None:
         """Register the device."""
-        if isinstance(device, ElectricityXMix):
-            sensor_type = SENSOR_EM
-        elif isinstance(device, EmRpcMix):
-            sensor_type = SENSOR_EM_RPC
-        else:
-            sensor_type = SENSOR_SWITCH_RPC
+        device = coordinator.device
+        async_add_entities(
+            RefossMetricSensor(coordinator, description)
+            for description in METRIC_SENSORS
+        )
+        if not isinstance(device, (ElectricityXMix, EmRpcMix, SwitchRpcMix)):
+            _LOGGER.warning(
+                "Unrecognised device class %s for %s; "
+                "no channel sensors will be created",
+                type(device).__name__,
+                device.device_type,
+            )
+            return
+        sensor_type, store = sensor_source(device)
         descriptions: tuple[RefossSensorEntityDescription, ...] = SENSORS.get(
             sensor_type, ()
         )
+        if coordinator.statistics is not None:
+            # Their long-term statistics are imported; do not compile them from states.
+            descriptions = tuple(
+                replace(description, state_class=None)
+                if is_energy_counter(description)
+                else description
+                for description in descriptions
+            )
+        table = SensorValueTable(store)
         device_type = device.device_type
         # Only create per-channel sub-devices for device types that have a known
         # channel name mapping; this ensures the parent device registered in
@@ -254,6 +575,7 @@ async def async_setup_entry(
                 coordinator=coordinator,
                 channel=channel,
                 description=description,
+                table=table,
                 channel_name=(
                     CHANNEL_DISPLAY_NAME.get(device_type, {}).get(channel, str(channel))
                     if use_sub_devices
@@ -263,8 +585,20 @@ async def async_setup_entry(
             for channel in device.channels
             for description in descriptions
         )
+        if (aggregates := device.aggregates) is not None:
+            aggregate_table = SensorValueTable(aggregates.state)
+            async_add_entities(
+                RefossSensor(
+                    coordinator=coordinator,
+                    channel=AGGREGATE_ROW,
+                    description=description,
+                    table=aggregate_table,
+                )
+                for description in AGGREGATE_SENSORS
+                if aggregates.state.field_index(description.subkey) is not None
+            )
 
-    init_device(device)
+    async_setup_devices(config_entry, init_device)
 
 
 class RefossSensor(RefossEntity, SensorEntity):
@@ -277,12 +611,15 @@ class RefossSensor(RefossEntity, SensorEntity):
         coordinator: RefossDataUpdateCoordinator,
         channel: int,
         description: RefossSensorEntityDescription,
+        table: SensorValueTable,
         channel_name: str | None = None,
     ) -> None:
         """Init Refoss sensor."""
         super().__init__(coordinator, channel, channel_name)
         self.entity_description = description
         self._attr_unique_id = f"{super().unique_id}{description.key}"
+        self._table = table
+        self._index = table.add(channel, description)
         if channel_name is None:
             device_type = coordinator.device.device_type
             name = CHANNEL_DISPLAY_NAME.get(device_type, {}).get(channel, str(channel))
@@ -291,11 +628,36 @@ class RefossSensor(RefossEntity, SensorEntity):
     @property
     def native_value(self) -> StateType:
         """Return the native value."""
-        value = self.coordinator.device.get_value(
-            self.channel, self.entity_description.subkey
+        return self._table.value(self._index)
+
+
+class RefossMetricSensor(RefossEntity, SensorEntity):
+    """Diagnostic sensor exposing one of the device's performance metrics."""
+
+    entity_description: RefossMetricSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: RefossDataUpdateCoordinator,
+        description: RefossMetricSensorEntityDescription,
+    ) -> None:
+        """Init the metric sensor on the parent device."""
+        super().__init__(coordinator, 0)
+        self.entity_description = description
+        self._attr_unique_id = f"{coordinator.device.mac}_{description.key}"
+
+    async def async_added_to_hass(self) -> None:
+        """Update after every poll, also those that changed no reading."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_poll_listener(self.async_write_ha_state)
         )
-        if value is None:
-            return None
-        if self.entity_description.fn:
-            return self.entity_description.fn(value)
-        return value
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Skip revision updates; the poll listener already wrote the state."""
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the current metric value."""
+        return self.entity_description.value_fn(self.coordinator.device.metrics)
@@ -0,0 +1,152 @@
+"""Services for refoss_lan."""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    ATTR_CHANNEL,
+    ATTR_CHANNELS,
+    ATTR_CONFIG_ENTRY_ID,
+    ATTR_END,
+    ATTR_FIELD,
+    ATTR_MAC,
+    ATTR_START,
+    ATTR_STATE,
+    DOMAIN,
+    SERVICE_GET_HISTORY,
+    SERVICE_SET_SWITCHES,
+)
+from .coordinator import RefossDataUpdateCoordinator
+from .refoss_ha.controller.switch_rpc import SwitchRpcMix
+from .refoss_ha.controller.toggle import ToggleXMix
+from .refoss_ha.exceptions import RefossError
+
+SERVICE_GET_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_MAC): cv.string,
+        vol.Required(ATTR_CHANNEL): vol.Coerce(int),
+        vol.Optional(ATTR_FIELD): cv.string,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+SERVICE_SET_SWITCHES_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CONFIG_ENTRY_ID): cv.string,
+        vol.Optional(ATTR_MAC): cv.string,
+        vol.Optional(ATTR_CHANNELS): vol.All(cv.ensure_list, [vol.Coerce(int)]),
+        vol.Required(ATTR_STATE): cv.boolean,
+    }
+)
+
+
+def get_entry_coordinator(
+    hass: HomeAssistant, entry_id: str, mac: str | None = None
+) -> RefossDataUpdateCoordinator:
+    """Return the coordinator of a loaded refoss_lan config entry.
+
+    For a hub entry, ``mac`` selects the device.
+    """
+    entry = hass.config_entries.async_get_entry(entry_id)
+    if entry is None or entry.domain != DOMAIN:
+        raise ServiceValidationError(f"Config entry {entry_id} not found")
+    if entry.state is not ConfigEntryState.LOADED:
+        raise ServiceValidationError(f"Config entry {entry.title} is not loaded")
+    runtime = entry.runtime_data
+    if isinstance(runtime, RefossDataUpdateCoordinator):
+        return runtime
+    if mac is None:
+        raise ServiceValidationError(f"{entry.title} is a hub; select a device by MAC")
+    coordinator = runtime.coordinators.get(mac.replace(":", "").lower())
+    if coordinator is None:
+        raise ServiceValidationError(f"{entry.title} has no device {mac} set up")
+    return coordinator
+
+
+def _as_timestamp(value: datetime | None) -> float | None:
+    """Convert an optional datetime to a UTC timestamp."""
+    if value is None:
+        return None
+    return dt_util.as_utc(value).timestamp()
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the refoss_lan services."""
+
+    @callback
+    def async_get_history(call: ServiceCall) -> ServiceResponse:
+        """Return recent readings of one channel from the in-memory history."""
+        coordinator = get_entry_coordinator(
+            hass, call.data[ATTR_CONFIG_ENTRY_ID], call.data.get(ATTR_MAC)
+        )
+        history = coordinator.device.history
+        channel = call.data[ATTR_CHANNEL]
+        start = _as_timestamp(call.data.get(ATTR_START))
+        end = _as_timestamp(call.data.get(ATTR_END))
+
+        if ATTR_FIELD in call.data:
+            fields = [call.data[ATTR_FIELD]]
+        else:
+            fields = [f for ch, f in history.series() if ch == channel]
+
+        readings = {
+            field: [
+                {"time": dt_util.utc_from_timestamp(ts).isoformat(), "value": value}
+                for ts, value in history.query(channel, field, start, end)
+            ]
+            for field in fields
+        }
+        return {"channel": channel, "readings": readings}
+
+    async def async_set_switches(call: ServiceCall) -> None:
+        """Switch several outlets of one device together."""
+        coordinator = get_entry_coordinator(
+            hass, call.data[ATTR_CONFIG_ENTRY_ID], call.data.get(ATTR_MAC)
+        )
+        device = coordinator.device
+        if not isinstance(device, (ToggleXMix, SwitchRpcMix)):
+            raise ServiceValidationError(f"{device.dev_name} has no switches")
+        channels = call.data.get(ATTR_CHANNELS, device.channels)
+        if unknown := set(channels) - set(device.channels):
+            raise ServiceValidationError(
+                f"{device.dev_name} has no channel(s) {sorted(unknown)}"
+            )
+        state = call.data[ATTR_STATE]
+        try:
+            await device.async_set_channels({channel: state for channel in channels})
+        except RefossError as err:
+            raise HomeAssistantError(
+                f"{device.dev_name} did not switch channel(s) {sorted(channels)}: {err!r}"
+            ) from err
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_HISTORY,
+        async_get_history,
+        schema=SERVICE_GET_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_SWITCHES,
+        async_set_switches,
+        schema=SERVICE_SET_SWITCHES_SCHEMA,
+    )
@@ -0,0 +1,210 @@
+"""Hourly energy statistics imported from the devices' own counters."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.const import UnitOfEnergy
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import CHANNEL_DISPLAY_NAME, DOMAIN
+from .refoss_ha.controller.consumption import DEVICE_CHANNEL, ConsumptionXMix
+from .refoss_ha.controller.device import BaseDevice
+from .refoss_ha.controller.electricity import ElectricityXMix
+from .refoss_ha.controller.em_rpc import EmRpcMix
+from .refoss_ha.controller.switch_rpc import SwitchRpcMix
+from .refoss_ha.energy import HOUR, HourlyCounter, daily_weights
+from .refoss_ha.exceptions import RefossError
+from .sensor import (
+    CLAMP_POSITIVE,
+    SENSORS,
+    RefossSensorEntityDescription,
+    is_energy_counter,
+    sensor_source,
+)
+
+try:
+    from homeassistant.components.recorder.models import StatisticMeanType
+except ImportError:  # Home Assistant before 2025.4
+    StatisticMeanType = None
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def statistic_id(mac: str, channel: int, key: str) -> str:
+    """Return the external statistic id of a channel's energy series."""
+    return f"{DOMAIN}:{mac}_{channel}_{key}".lower()
+
+
+def _reader(
+    device: BaseDevice, channel: int, description: RefossSensorEntityDescription
+) -> Callable[[], float | None]:
+    """Return a function reading a channel's counter in kWh, clamped like its sensor."""
+    store = sensor_source(device)[1]
+    slot = store.slot(channel, description.subkey)
+    scale = 1.0
+    if description.native_unit_of_measurement == UnitOfEnergy.WATT_HOUR:
+        scale = 1000.0
+
+    def read() -> float | None:
+        value = None if slot is None else store.value_at(slot)
+        if value is None:
+            return None
+        if description.clamp == CLAMP_POSITIVE:
+            value = max(0, value)
+        return value / scale
+
+    return read
+
+
+@dataclass(slots=True)
+class _Series:
+    """One imported statistic: a channel's energy or returned energy."""
+
+    channel: int
+    metadata: StatisticMetaData
+    read: Callable[[], float | None]
+    counter: HourlyCounter
+
+
+class EnergyStatistics:
+    """Compute hourly energy statistics per channel and import them.
+
+    Every successful poll feeds the channels' cumulative counters
+    (``mConsume``, ``month_energy``, ``month_consumption``) into an
+    :class:`HourlyCounter` per series. Completed hours are written as
+    external statistics (``refoss_lan:<mac>_<channel>_<key>``) through the
+    recorder's import API, so the Energy dashboard does not depend on the
+    recorder sampling the energy sensors.
+
+    When the first reading after an outage (of Home Assistant or the
+    device) finds whole hours missing since the last imported row, the
+    counter increase over the gap is spread over those hours, shaped by the
+    device's daily consumption history when it keeps one (one
+    ``ConsumptionX`` request for all channels), and the filled hours are
+    imported together, one call per series. The history is read at most once
+    an hour, so a series that cannot be filled yet (e.g. its counter is not
+    reported) does not cause a request on every poll.
+    """
+
+    def __init__(self, hass: HomeAssistant, device: BaseDevice) -> None:
+        """Define a series for every energy counter sensor of the device."""
+        self.hass = hass
+        self.device = device
+        self._series: list[_Series] = []
+        # Start of the hour the consumption history was read in, and the result.
+        self._history: tuple[float, dict[int, list[tuple[float, float]]]] | None = None
+        if not isinstance(device, (ElectricityXMix, EmRpcMix, SwitchRpcMix)):
+            return
+        sensor_type = sensor_source(device)[0]
+        labels = CHANNEL_DISPLAY_NAME.get(device.device_type, {})
+        for description in SENSORS[sensor_type]:
+            if not is_energy_counter(description):
+                continue
+            for channel in device.channels:
+                metadata: StatisticMetaData = {
+                    "has_mean": False,
+                    "has_sum": True,
+                    "name": (
+                        f"{device.dev_name} {labels.get(channel, channel)} "
+                        f"{description.key.replace('_', ' ')}"
+                    ),
+                    "source": DOMAIN,
+                    "statistic_id": statistic_id(device.mac, channel, description.key),
+                    "unit_of_measurement": UnitOfEnergy.KILO_WATT_HOUR,
+                }
+                if StatisticMeanType is not None:
+                    metadata["mean_type"] = StatisticMeanType.NONE
+                read = _reader(device, channel, description)
+                self._series.append(_Series(channel, metadata, read, HourlyCounter()))
+
+    @property
+    def statistic_ids(self) -> list[str]:
+        """Return the ids of the imported statistics."""
+        return [series.metadata["statistic_id"] for series in self._series]
+
+    async def async_load(self) -> None:
+        """Resume every series after its last imported hour."""
+        for series in self._series:
+            last = await get_instance(self.hass).async_add_executor_job(
+                get_last_statistics,
+                self.hass,
+                1,
+                series.metadata["statistic_id"],
+                True,
+                {"state", "sum"},
+            )
+            if rows := last.get(series.metadata["statistic_id"]):
+                row = rows[0]
+                series.counter = HourlyCounter(
+                    row["start"], row.get("state"), row.get("sum") or 0.0
+                )
+
+    async def async_record(self, ts: float) -> None:
+        """Feed the counters read at ``ts`` and import any completed hours."""
+        readings = [(series, series.read()) for series in self._series]
+        history = None
+        if any(
+            value is not None and series.counter.missed(ts)
+            for series, value in readings
+        ):
+            history = await self._async_get_history(ts - ts % HOUR)
+        for series, value in readings:
+            if value is None:
+                continue
+            if history is not None:
+                days = history.get(series.channel) or history.get(DEVICE_CHANNEL)
+                filled = series.counter.backfill(
+                    ts, value, daily_weights(days) if days else None
+                )
+                if filled:
+                    _LOGGER.debug(
+                        "Backfilled %d hours of %s",
+                        filled,
+                        series.metadata["statistic_id"],
+                    )
+            series.counter.add(ts, value)
+            self._async_import(series)
+
+    async def _async_get_history(
+        self, hour: float
+    ) -> dict[int, list[tuple[float, float]]]:
+        """Return the device's daily consumption history, read once per hour."""
+        if self._history is not None and self._history[0] == hour:
+            return self._history[1]
+        history: dict[int, list[tuple[float, float]]] = {}
+        if isinstance(self.device, ConsumptionXMix):
+            try:
+                history = await self.device.async_get_consumption()
+            except RefossError as err:
+                _LOGGER.debug(
+                    "Reading the consumption history of %s failed: %s",
+                    self.device.dev_name,
+                    err,
+                )
+        self._history = (hour, history)
+        return history
+
+    @callback
+    def _async_import(self, series: _Series) -> None:
+        """Import the closed rows of a series, if any."""
+        if rows := series.counter.take_rows():
+            async_add_external_statistics(
+                self.hass,
+                series.metadata,
+                [
+                    StatisticData(
+                        start=dt_util.utc_from_timestamp(start), state=state, sum=total
+                    )
+                    for start, state, total in rows
+                ],
+            )
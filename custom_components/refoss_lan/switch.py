@@ -5,10 +5,10 @@ from __future__ import annotations
 from typing import Any
 
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
-from .entity import RefossEntity
+from .entity import RefossEntity, async_setup_devices
 from .refoss_ha.controller.toggle import ToggleXMix
 from .refoss_ha.controller.switch_rpc import SwitchRpcMix
 from .coordinator import RefossDataUpdateCoordinator, RefossConfigEntry
@@ -20,14 +20,13 @@ async def async_setup_entry(
     async_add_entities: AddConfigEntryEntitiesCallback,
 ) -> None:
     """Set up the Refoss device from a config entry."""
-    coordinator = config_entry.runtime_data
-    device = coordinator.device
 
-    if not isinstance(device, (ToggleXMix, SwitchRpcMix)):
-        return
-
-    def init_device(device: ToggleXMix | SwitchRpcMix):
+    @callback
+    def init_device(coordinator: RefossDataUpdateCoordinator) -> None:
         """Register the device."""
+        device = coordinator.device
+        if not isinstance(device, (ToggleXMix, SwitchRpcMix)):
+            return
         new_entities = []
         for channel in device.channels:
             entity = RefossSwitch(coordinator=coordinator, channel=channel)
@@ -35,7 +34,7 @@ async def async_setup_entry(
 
         async_add_entities(new_entities)
 
-    init_device(device)
+    async_setup_devices(config_entry, init_device)
 
 
 class RefossSwitch(RefossEntity, SwitchEntity):
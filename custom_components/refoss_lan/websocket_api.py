@@ -0,0 +1,66 @@
+"""Websocket API for refoss_lan."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+
+from .services import get_entry_coordinator
+
+
+@callback
+def async_setup_websocket_api(hass: HomeAssistant) -> None:
+    """Register the refoss_lan websocket commands."""
+    websocket_api.async_register_command(hass, ws_history)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "refoss_lan/history",
+        vol.Required("entry_id"): str,
+        vol.Optional("mac"): str,
+        vol.Required("channel"): int,
+        vol.Optional("field"): str,
+        vol.Optional("start_time"): vol.Coerce(float),
+        vol.Optional("end_time"): vol.Coerce(float),
+    }
+)
+@callback
+def ws_history(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Return recent readings as parallel timestamp/value lists per field.
+
+    Timestamps are UNIX epoch seconds, which keeps the payload compact for
+    dashboards plotting high-rate data.
+    """
+    try:
+        coordinator = get_entry_coordinator(hass, msg["entry_id"], msg.get("mac"))
+    except ServiceValidationError as err:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, str(err))
+        return
+
+    history = coordinator.device.history
+    channel = msg["channel"]
+    if "field" in msg:
+        fields = [msg["field"]]
+    else:
+        fields = [f for ch, f in history.series() if ch == channel]
+
+    result: dict[str, dict[str, list[float]]] = {}
+    for field in fields:
+        samples = history.query(
+            channel, field, msg.get("start_time"), msg.get("end_time")
+        )
+        result[field] = {
+            "t": [ts for ts, _ in samples],
+            "v": [value for _, value in samples],
+        }
+    connection.send_result(msg["id"], {"channel": channel, "fields": result})
@@ -0,0 +1,10 @@
+"""Make the refoss_ha library importable on its own for the tests."""
+
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+
+sys.path.insert(
+    0, str(Path(__file__).resolve().parents[1] / "custom_components" / "refoss_lan")
+)
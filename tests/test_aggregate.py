@@ -0,0 +1,56 @@
+"""Tests for the per-phase and device aggregates of EM channels."""
+
+from __future__ import annotations
+
+import pytest
+
+from refoss_ha.aggregate import PhaseAggregates
+
+PHASES = {1: "a", 2: "a", 3: "b", 4: "c"}
+
+
+def test_sums_per_phase_and_device() -> None:
+    """Channel readings add up per phase and for the device."""
+    aggregates = PhaseAggregates(PHASES)
+    assert aggregates.phases == ("a", "b", "c")
+    assert aggregates.update(
+        [(1, 1000, 4000), (2, 500, 2000), (3, 2000, 9000), (4, -4000, 15000)]
+    )
+    assert aggregates.get("power_a") == 1500
+    assert aggregates.get("current_a") == 6000
+    assert aggregates.get("power_b") == 2000
+    assert aggregates.get("power") == -500
+    assert aggregates.get("import_power") == 0
+    assert aggregates.get("export_power") == 500
+
+
+def test_imbalance_is_the_largest_deviation_from_the_mean() -> None:
+    """Imbalance is in percent of the mean phase current."""
+    aggregates = PhaseAggregates(PHASES)
+    aggregates.update([(1, 0, 10000), (3, 0, 10000), (4, 0, 13000)])
+    assert aggregates.get("imbalance") == pytest.approx(2000 / 11000 * 100)
+
+
+def test_missing_readings_leave_sums_unknown() -> None:
+    """A sum with no reported input is None; unknown channels are ignored."""
+    aggregates = PhaseAggregates(PHASES)
+    aggregates.update([(1, 100, None), (9, 5000, 5000)])
+    assert aggregates.get("power_a") == 100
+    assert aggregates.get("current_a") is None
+    assert aggregates.get("power_b") is None
+    assert aggregates.get("power") == 100
+    assert aggregates.get("imbalance") is None
+    assert aggregates.as_dict() == {
+        "power": 100,
+        "import_power": 100,
+        "export_power": 0,
+        "power_a": 100,
+    }
+
+
+def test_update_reports_changes_only() -> None:
+    """The same readings again change nothing."""
+    aggregates = PhaseAggregates(PHASES)
+    readings = [(1, 100, 400), (3, 200, 900)]
+    assert aggregates.update(readings)
+    assert not aggregates.update(readings)
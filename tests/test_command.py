@@ -0,0 +1,161 @@
+"""Tests for the optimistic, collapsing switch command pipeline."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from refoss_ha.command import CommandPipeline
+from refoss_ha.exceptions import DeviceTimeoutError
+
+
+class FakeSwitch:
+    """Channel states and the primitives a controller hands the pipeline."""
+
+    def __init__(self, channels: int = 2) -> None:
+        self.state: dict[int, bool | None] = dict.fromkeys(range(1, channels + 1), False)
+        self.device: dict[int, bool] = dict.fromkeys(self.state, False)
+        self.sent: list[dict[int, bool]] = []
+        self.notified = 0
+        # Channels whose command fails, and whether readbacks fail.
+        self.fail: set[int] = set()
+        self.readback_fails = False
+        # States the device reports regardless of the commands.
+        self.overridden: dict[int, bool] = {}
+        self.gate: asyncio.Event | None = None
+        self.pipeline = CommandPipeline(
+            self.send, self.readback, self.state.get, self.state.__setitem__, self.notify
+        )
+
+    async def send(self, states: dict[int, bool], acknowledge) -> None:
+        self.sent.append(dict(states))
+        if self.gate is not None:
+            await self.gate.wait()
+        for channel, on in states.items():
+            if channel in self.fail:
+                raise DeviceTimeoutError
+            self.device[channel] = on
+            acknowledge(channel)
+
+    async def readback(self, channels: list[int]) -> dict[int, bool]:
+        if self.readback_fails:
+            raise DeviceTimeoutError
+        return {
+            channel: self.overridden.get(channel, self.device[channel])
+            for channel in channels
+        }
+
+    def notify(self) -> None:
+        self.notified += 1
+
+
+def test_state_is_applied_before_the_device_answers() -> None:
+    """Listeners see the requested state at once and the reported one after."""
+
+    async def run() -> None:
+        switch = FakeSwitch()
+        switch.gate = asyncio.Event()
+        task = asyncio.create_task(switch.pipeline.async_set(1, True))
+        await asyncio.sleep(0)
+        assert switch.state[1] is True
+        assert switch.pipeline.pending(1)
+        assert switch.notified == 1
+        switch.gate.set()
+        await task
+        assert not switch.pipeline.pending(1)
+        assert switch.device[1] is True
+        assert switch.notified == 2
+
+    asyncio.run(run())
+
+
+def test_rapid_commands_collapse() -> None:
+    """Taps during a request lead to one follow-up with the final state."""
+
+    async def run() -> None:
+        switch = FakeSwitch()
+        switch.gate = asyncio.Event()
+        first = asyncio.create_task(switch.pipeline.async_set(1, True))
+        await asyncio.sleep(0)
+        taps = [
+            asyncio.create_task(switch.pipeline.async_set(1, on))
+            for on in (False, True, False)
+        ]
+        await asyncio.sleep(0)
+        switch.gate.set()
+        await asyncio.gather(first, *taps)
+        assert switch.sent == [{1: True}, {1: False}]
+        assert switch.state[1] is False
+
+    asyncio.run(run())
+
+
+def test_returning_to_the_acknowledged_state_sends_nothing_more() -> None:
+    """A tap undone before the first request finishes needs no follow-up."""
+
+    async def run() -> None:
+        switch = FakeSwitch()
+        switch.gate = asyncio.Event()
+        first = asyncio.create_task(switch.pipeline.async_set(1, True))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(switch.pipeline.async_set(1, True))
+        await asyncio.sleep(0)
+        switch.gate.set()
+        await asyncio.gather(first, second)
+        assert switch.sent == [{1: True}]
+
+    asyncio.run(run())
+
+
+def test_failure_rolls_back_and_raises() -> None:
+    """A failed command restores the last acknowledged state."""
+
+    async def run() -> None:
+        switch = FakeSwitch()
+        switch.fail = {1}
+        with pytest.raises(DeviceTimeoutError):
+            await switch.pipeline.async_set(1, True)
+        assert switch.state[1] is False
+        assert not switch.pipeline.pending(1)
+
+    asyncio.run(run())
+
+
+def test_partial_failure_keeps_acknowledged_channels() -> None:
+    """Channels the device acknowledged keep their new state."""
+
+    async def run() -> None:
+        switch = FakeSwitch(3)
+        switch.fail = {2}
+        with pytest.raises(DeviceTimeoutError):
+            await switch.pipeline.async_set_many({1: True, 2: True, 3: True})
+        assert switch.state == {1: True, 2: False, 3: False}
+
+    asyncio.run(run())
+
+
+def test_readback_overrides_the_requested_state() -> None:
+    """What the device reports after the command wins."""
+
+    async def run() -> None:
+        switch = FakeSwitch()
+        # E.g. switched off at the outlet right after acknowledging.
+        switch.overridden[2] = False
+        await switch.pipeline.async_set_many({1: True, 2: True})
+        assert switch.sent == [{1: True, 2: True}]
+        assert switch.state == {1: True, 2: False}
+
+    asyncio.run(run())
+
+
+def test_failed_readback_keeps_the_requested_state() -> None:
+    """An acknowledged command stands when it cannot be read back."""
+
+    async def run() -> None:
+        switch = FakeSwitch()
+        switch.readback_fails = True
+        await switch.pipeline.async_set(2, True)
+        assert switch.state[2] is True
+
+    asyncio.run(run())
@@ -0,0 +1,240 @@
+"""Tests for the local energy integration and the hourly statistics counter."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import time
+
+import pytest
+
+from refoss_ha.controller.electricity import ElectricityXMix
+from refoss_ha.device import DeviceInfo
+from refoss_ha.energy import HOUR, EnergyIntegrator, HourlyCounter, daily_weights
+
+# Start of February 2026 in UTC.
+FEB_1 = datetime(2026, 2, 1, tzinfo=timezone.utc).timestamp()
+
+
+def test_integrates_constant_power() -> None:
+    """An hour at 1 kW publishes 1000 Wh, one step at a time."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.add(FEB_1, 1000)
+    changed = [integrator.add(FEB_1 + 36 * i, 1000) for i in range(1, 101)]
+    assert all(changed)
+    assert integrator.published == 1000
+    assert integrator.exported == 0
+
+
+def test_published_only_changes_on_whole_wh() -> None:
+    """Fractions of a Wh are kept but not published."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.add(FEB_1, 100)
+    assert not integrator.add(FEB_1 + 18, 100)
+    assert integrator.published == 0
+    assert integrator.add(FEB_1 + 36, 100)
+    assert integrator.published == 1
+
+
+def test_export_is_kept_apart() -> None:
+    """Negative power counts as export and never lowers the published total."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.add(FEB_1, 1000)
+    integrator.add(FEB_1 + 36, 1000)
+    assert integrator.published == 10
+    # Crosses zero halfway: 2.5 Wh each way, then 10 Wh of export.
+    integrator.add(FEB_1 + 72, -1000)
+    integrator.add(FEB_1 + 108, -1000)
+    assert integrator.published == 12
+    assert integrator.exported == 12
+
+
+def test_zero_crossing_splits_the_interval() -> None:
+    """Power moving from import to export is split at the crossing."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.add(FEB_1, 1000)
+    integrator.add(FEB_1 + 72, -1000)
+    assert integrator.published == 5
+    assert integrator.exported == 5
+
+
+def test_gaps_and_old_samples_are_skipped() -> None:
+    """Intervals over ``max_gap`` add nothing; out-of-order samples are ignored."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.add(FEB_1, 1000)
+    assert not integrator.add(FEB_1 + 600, 1000, max_gap=300)
+    assert integrator.published == 0
+    assert not integrator.add(FEB_1 + 500, 1000)
+    integrator.add(FEB_1 + 636, 1000, max_gap=300)
+    assert integrator.published == 10
+
+
+def test_extend_continues_at_last_power() -> None:
+    """An unchanged reading keeps integrating at the last power."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.add(FEB_1, 1000)
+    integrator.extend(FEB_1 + 36)
+    assert integrator.published == 10
+
+
+def test_restarts_every_month() -> None:
+    """Only the part of an interval after the month boundary counts."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.add(FEB_1 - 3600, 1000)
+    integrator.add(FEB_1 - 36, 1000, max_gap=3600)
+    assert integrator.published == 990
+    assert integrator.add(FEB_1 + 36, 1000)
+    assert integrator.published == 10
+    assert integrator.exported == 0
+
+
+def test_checkpoint_round_trip() -> None:
+    """A restored integrator resumes where the checkpoint left off."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.add(FEB_1, 1000)
+    integrator.add(FEB_1 + 36, -1000)
+    integrator.add(FEB_1 + 72, 1000)
+
+    restored = EnergyIntegrator(timezone.utc)
+    restored.restore(integrator.checkpoint())
+    assert restored.published == integrator.published
+    assert restored.exported == integrator.exported
+    integrator.add(FEB_1 + 108, 1000)
+    restored.add(FEB_1 + 108, 1000)
+    assert restored.checkpoint() == integrator.checkpoint()
+
+
+def test_restore_clamps_net_checkpoints() -> None:
+    """A negative net total from an older checkpoint restores as zero."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.restore({"energy": -12.5, "ts": FEB_1, "power": 0.0})
+    assert integrator.published == 0
+    assert integrator.exported == 0
+
+
+def test_export_change_is_reported() -> None:
+    """A new whole Wh of export counts as a change even if import did not move."""
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.add(FEB_1, -1000)
+    assert integrator.add(FEB_1 + 36, -1000)
+    assert integrator.published == 0
+    assert integrator.exported == 10
+
+
+def _legacy_device() -> ElectricityXMix:
+    """Return an EM controller with two channels and no transport."""
+    info = DeviceInfo(
+        "uuid", "em", "em16", "1.0", "1.0", "192.0.2.1", "80", "mac", "un", [1, 2]
+    )
+    device = ElectricityXMix(info)
+    device.timezone = timezone.utc
+    return device
+
+
+def test_integrated_channels_publish_returned_energy() -> None:
+    """Export integrated from power is stored in mReturned, import in mConsume."""
+    device = _legacy_device()
+    now = time.time()
+    integrator = EnergyIntegrator(timezone.utc)
+    integrator.restore({"energy": 0.0, "ts": now - 36, "power": -1000.0})
+    device.energy[1] = integrator
+    device._apply_electricity(
+        {"electricity": [{"channel": 1, "power": -1000000, "voltage": 230000}]}, now
+    )
+    assert device.get_value(1, "mConsume") == 0
+    assert device.get_value(1, "mReturned") == 10
+
+
+def test_device_counters_split_into_returned_energy() -> None:
+    """A negative mConsume reported by the device is returned energy."""
+    device = _legacy_device()
+    device._apply_electricity(
+        {
+            "electricity": [
+                {"channel": 1, "power": 10, "mConsume": -250},
+                {"channel": 2, "power": 10, "mConsume": 400},
+            ]
+        },
+        time.time(),
+    )
+    assert device.get_value(1, "mReturned") == 250
+    assert device.get_value(2, "mReturned") == 0
+    assert device.get_value(2, "mConsume") == 400
+
+
+def test_hourly_rows_close_on_the_next_hour() -> None:
+    """An hour becomes a row once a reading falls into a later hour."""
+    counter = HourlyCounter()
+    counter.add(FEB_1 + 60, 1.0)
+    counter.add(FEB_1 + 1800, 1.5)
+    assert counter.take_rows() == []
+    counter.add(FEB_1 + HOUR + 60, 2.0)
+    assert counter.take_rows() == [(FEB_1, 1.5, 0.5)]
+    assert counter.take_rows() == []
+    assert counter.sum == 1.0
+
+
+def test_counter_reset_counts_in_full() -> None:
+    """A reading below the previous one is a reset; all of it is new energy."""
+    counter = HourlyCounter(FEB_1, 40.0, 10.0)
+    counter.add(FEB_1 + 600, 42.0)
+    counter.add(FEB_1 + 1200, 0.5)
+    assert counter.sum == 12.5
+    counter.add(FEB_1 + 1800, 0.25)
+    assert counter.sum == 12.75
+
+
+def test_readings_before_the_resumed_hour_are_ignored() -> None:
+    """A counter resumed after an imported hour skips older readings."""
+    counter = HourlyCounter(FEB_1, 5.0, 5.0)
+    counter.add(FEB_1 - 600, 9.0)
+    assert counter.last == 5.0
+    assert counter.sum == 5.0
+
+
+def test_backfill_spreads_the_gap_evenly() -> None:
+    """Missed hours share the increase with the elapsed part of the current one."""
+    counter = HourlyCounter()
+    counter.add(FEB_1 + 1800, 10.0)
+    ts = FEB_1 + 3 * HOUR + 1800
+    assert counter.missed(ts)
+    # Two whole missed hours and half of the current one.
+    assert counter.backfill(ts, 15.0) == 2
+    counter.add(ts, 15.0)
+    rows = counter.take_rows()
+    assert [row[0] for row in rows] == [FEB_1, FEB_1 + HOUR, FEB_1 + 2 * HOUR]
+    assert rows[1][1] == pytest.approx(12.0)
+    assert rows[2][1] == pytest.approx(14.0)
+    assert counter.sum == pytest.approx(5.0)
+    assert not counter.missed(ts + 60)
+
+
+def test_backfill_follows_the_weights() -> None:
+    """A usage rate shapes how the gap is split."""
+    counter = HourlyCounter()
+    counter.add(FEB_1 + HOUR - 1, 0.0)
+    ts = FEB_1 + 3 * HOUR
+    busy = FEB_1 + HOUR
+
+    def weight(hour: float) -> float:
+        return 3.0 if hour == busy else 1.0
+
+    assert counter.backfill(ts, 8.0, weight) == 2
+    rows = counter.take_rows()
+    assert rows[1] == (busy, pytest.approx(6.0), pytest.approx(6.0))
+    assert rows[2][2] == pytest.approx(8.0)
+
+
+def test_no_backfill_without_missed_hours() -> None:
+    """Consecutive hours need no backfill."""
+    counter = HourlyCounter()
+    counter.add(FEB_1 + 600, 1.0)
+    assert not counter.missed(FEB_1 + HOUR + 600)
+    assert counter.backfill(FEB_1 + HOUR + 600, 2.0) == 0
+
+
+def test_daily_weights_use_the_day_average() -> None:
+    """Hours of a listed day get its hourly average, others the overall one."""
+    weight = daily_weights([(FEB_1, 24.0), (FEB_1 + 86400, 48.0)])
+    assert weight(FEB_1 + 5 * HOUR) == 1.0
+    assert weight(FEB_1 + 86400 + HOUR) == 2.0
+    assert weight(FEB_1 + 3 * 86400) == 1.5
@@ -0,0 +1,180 @@
+"""Tests for the shared poll scheduler."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import suppress
+
+import pytest
+
+from refoss_ha import engine as engine_module
+from refoss_ha.engine import PollEngine
+
+
+async def _run_for(engine: PollEngine, seconds: float) -> None:
+    """Run ``engine`` for ``seconds``, then stop it."""
+    task = asyncio.create_task(engine.run())
+    await asyncio.sleep(seconds)
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+
+def test_first_polls_are_spread_over_the_interval(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Devices added together get golden-ratio offsets instead of one tick."""
+    monkeypatch.setattr(engine_module.time, "monotonic", lambda: 100.0)
+    engine = PollEngine()
+
+    async def poll() -> None:
+        pass
+
+    for key in ("a", "b", "c"):
+        engine.add(key, 10.0, poll)
+    due = {job.key: when - 100.0 for when, _arrival, job in engine._schedule}
+    assert due["a"] == 0.0
+    assert due["b"] == pytest.approx(6.180, abs=1e-3)
+    assert due["c"] == pytest.approx(2.361, abs=1e-3)
+    assert len(engine) == 3
+    assert "b" in engine
+
+
+def test_polls_keep_a_fixed_rate() -> None:
+    """The next poll is due an interval after the last was due, not after it ended."""
+    engine = PollEngine()
+    polls = 0
+
+    async def poll() -> None:
+        nonlocal polls
+        polls += 1
+        await asyncio.sleep(0.03)
+
+    async def run() -> None:
+        engine.add("plug", 0.05, poll)
+        await _run_for(engine, 0.275)
+
+    asyncio.run(run())
+    # Due at 0, 50, ..., 250 ms; waiting for each poll to end would give 4.
+    assert polls >= 5
+    assert engine.skipped_polls == 0
+
+
+def test_a_poll_still_running_is_skipped() -> None:
+    """A device never has two polls in flight; the late ones are counted."""
+    engine = PollEngine()
+    running = 0
+    most = 0
+
+    async def poll() -> None:
+        nonlocal running, most
+        running += 1
+        most = max(most, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+
+    async def run() -> None:
+        engine.add("plug", 0.02, poll)
+        await _run_for(engine, 0.15)
+
+    asyncio.run(run())
+    assert most == 1
+    assert engine.skipped_polls > 0
+
+
+def test_fan_out_respects_the_concurrency_limit() -> None:
+    """Due polls of many devices start together, at most ``max_concurrent`` at once."""
+    engine = PollEngine(max_concurrent=2)
+    release = asyncio.Event()
+    running = 0
+    most = 0
+    done: list[str] = []
+
+    def make_poll(key: str):
+        async def poll() -> None:
+            nonlocal running, most
+            running += 1
+            most = max(most, running)
+            await release.wait()
+            running -= 1
+            done.append(key)
+
+        return poll
+
+    async def run() -> None:
+        for index in range(5):
+            engine.add(f"plug{index}", 60.0, make_poll(f"plug{index}"))
+        # Only the first device is due at once; bring the others forward.
+        engine._schedule = [
+            (0.0, arrival, job) for _due, arrival, job in engine._schedule
+        ]
+        task = asyncio.create_task(engine.run())
+        await asyncio.sleep(0.02)
+        assert running == 2
+        assert engine.as_dict()["running"] == 5
+        release.set()
+        await asyncio.sleep(0.02)
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert most == 2
+    assert sorted(done) == [f"plug{index}" for index in range(5)]
+    assert engine.polls == 5
+    assert engine.lag.count == 5
+
+
+def test_a_failing_poll_does_not_stop_the_others() -> None:
+    """Exceptions are counted per poll; other devices keep being polled."""
+    engine = PollEngine()
+    polls = 0
+
+    async def broken() -> None:
+        raise RuntimeError("device gone")
+
+    async def poll() -> None:
+        nonlocal polls
+        polls += 1
+
+    async def run() -> None:
+        engine.add("broken", 0.02, broken)
+        engine.add("plug", 0.02, poll)
+        await _run_for(engine, 0.1)
+
+    asyncio.run(run())
+    assert engine.failed_polls > 0
+    assert polls > 0
+    assert engine.polls == polls
+
+
+def test_remove_cancels_the_running_poll() -> None:
+    """A removed device stops being polled and its poll is cancelled."""
+    engine = PollEngine()
+    cancelled = asyncio.Event()
+    polls = 0
+
+    async def poll() -> None:
+        nonlocal polls
+        polls += 1
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run() -> None:
+        engine.add("plug", 0.02, poll)
+        task = asyncio.create_task(engine.run())
+        await asyncio.sleep(0.01)
+        engine.remove("plug")
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert polls == 1
+    assert "plug" not in engine
+    assert engine.as_dict()["devices"] == 0
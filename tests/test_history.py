@@ -0,0 +1,72 @@
+"""Tests for the in-memory reading history."""
+
+from __future__ import annotations
+
+from refoss_ha.controller.em_rpc import EM_RPC_FIELDS
+from refoss_ha.history import (
+    DEFAULT_CAPACITY,
+    ReadingHistory,
+    RingBuffer,
+    capacity_for,
+)
+
+
+def test_ring_buffer_overwrites_the_oldest_sample() -> None:
+    """A full buffer drops its oldest sample and ranges stay in time order."""
+    buffer = RingBuffer(3)
+    for ts in range(5):
+        buffer.append(float(ts), ts * 10.0)
+    assert len(buffer) == 3
+    assert buffer.range() == [(2.0, 20.0), (3.0, 30.0), (4.0, 40.0)]
+    assert buffer.range(3.0, 3.5) == [(3.0, 30.0)]
+
+
+def test_record_entry_keeps_tracked_fields_only() -> None:
+    """Identifiers and unknown keys of a raw status are not recorded."""
+    history = ReadingHistory()
+    entry = {"id": 3, "power": 120, "voltage": 230.1, "freq": 50, "name": "x"}
+    history.record_entry(3, 1.0, entry, EM_RPC_FIELDS)
+    assert sorted(history.series()) == [(3, "power"), (3, "voltage")]
+    assert history.query(3, "power") == [(1.0, 120.0)]
+
+
+def test_record_entries_skips_missing_and_non_numeric_values() -> None:
+    """A field absent from one channel's status creates no series for it."""
+    history = ReadingHistory()
+    history.record_entries(
+        1.0,
+        [(1, {"power": 5, "current": None}), (2, {"current": 0.5})],
+        ("power", "current"),
+    )
+    assert sorted(history.series()) == [(1, "power"), (2, "current")]
+
+
+def test_capacity_follows_the_poll_interval() -> None:
+    """Buffers cover the same window at any interval, within the default cap."""
+    assert capacity_for(1) == DEFAULT_CAPACITY
+    assert capacity_for(10) == 60
+    assert capacity_for(7) == 86
+    assert capacity_for(0.5) == DEFAULT_CAPACITY
+    assert capacity_for(3600) == 1
+
+
+def test_resize_keeps_the_newest_samples() -> None:
+    """Shrinking the buffers keeps the latest samples and frees memory."""
+    history = ReadingHistory(capacity=10)
+    for ts in range(8):
+        history.record(1, "power", float(ts), float(ts))
+    before = history.nbytes
+    history.resize(3)
+    assert history.query(1, "power") == [(5.0, 5.0), (6.0, 6.0), (7.0, 7.0)]
+    assert history.nbytes < before
+    history.record(1, "power", 8.0, 8.0)
+    assert [ts for ts, _ in history.query(1, "power")] == [6.0, 7.0, 8.0]
+
+
+def test_budget_limits_the_number_of_series() -> None:
+    """Series past the memory budget are dropped rather than allocated."""
+    history = ReadingHistory(capacity=4, max_bytes=2 * 16 * 4)
+    for channel in range(3):
+        history.record(channel, "power", 1.0, 1.0)
+    assert history.series() == [(0, "power"), (1, "power")]
+    assert history.nbytes == 2 * 16 * 4
@@ -0,0 +1,108 @@
+"""Tests for the latency histograms and per-device metrics."""
+
+from __future__ import annotations
+
+import pytest
+
+from refoss_ha.metrics import _BOUNDS_MS, DeviceMetrics, LatencyHistogram
+
+
+def test_bounds_are_logarithmic_up_to_a_minute() -> None:
+    """Buckets start at 1 ms and grow by 19% while below 60 s."""
+    assert _BOUNDS_MS[0] == 1.0
+    assert _BOUNDS_MS[1] == 1.19
+    assert _BOUNDS_MS[-1] <= 60000.0 < _BOUNDS_MS[-1] * 1.19
+    assert list(_BOUNDS_MS) == sorted(set(_BOUNDS_MS))
+
+
+def test_empty_histogram_has_no_percentiles() -> None:
+    """Without samples only the count and maximum are known."""
+    assert LatencyHistogram().as_dict() == {
+        "count": 0,
+        "mean_ms": None,
+        "p50_ms": None,
+        "p95_ms": None,
+        "p99_ms": None,
+        "max_ms": 0.0,
+    }
+
+
+def test_percentiles_report_the_bucket_upper_bound() -> None:
+    """A percentile is the upper bound of its bucket, capped at the maximum."""
+    histogram = LatencyHistogram()
+    for _ in range(10):
+        histogram.record(0.005)
+    histogram.record(0.1)
+    # 5 ms falls in the bucket (4.785, 5.695].
+    assert histogram.percentile(0.5) == 5.695
+    assert histogram.percentile(10 / 11) == 5.695
+    # The 100 ms bucket's bound is above the maximum seen.
+    assert histogram.percentile(0.95) == 100.0
+    assert histogram.as_dict()["mean_ms"] == pytest.approx(150 / 11, abs=1e-3)
+
+
+def test_samples_on_a_bound_stay_in_its_bucket() -> None:
+    """Bucket bounds are inclusive; a sample just above one moves up a bucket."""
+    histogram = LatencyHistogram()
+    histogram.record(0.001)
+    histogram.record(0.01)
+    assert histogram.percentile(0.5) == 1.0
+    histogram = LatencyHistogram()
+    histogram.record(0.0011)
+    histogram.record(0.01)
+    assert histogram.percentile(0.5) == 1.19
+
+
+def test_samples_beyond_the_last_bound_report_the_maximum() -> None:
+    """The overflow bucket has no bound; its percentiles are the maximum."""
+    histogram = LatencyHistogram()
+    histogram.record(0.002)
+    histogram.record(75.0)
+    assert histogram.percentile(0.5) == 2.005
+    assert histogram.percentile(0.99) == 75000.0
+
+
+def test_merge_adds_counts_and_keeps_the_maximum() -> None:
+    """A merged histogram answers as if it had recorded both sample sets."""
+    first = LatencyHistogram()
+    second = LatencyHistogram()
+    combined = LatencyHistogram()
+    for seconds in (0.003, 0.004, 0.2):
+        first.record(seconds)
+        combined.record(seconds)
+    for seconds in (0.05, 1.5):
+        second.record(seconds)
+        combined.record(seconds)
+    first.merge(second)
+    assert first.as_dict() == combined.as_dict()
+    assert first.count == 5
+    assert first.max_ms == 1500.0
+
+
+def test_poll_records_track_interval_drift() -> None:
+    """Drift is the time between poll starts beyond the configured interval."""
+    metrics = DeviceMetrics()
+    metrics.record_poll(100.0, 0.2, 10.0)
+    assert metrics.interval_drift is None
+    metrics.record_poll(110.5, 0.3, 10.0)
+    assert metrics.interval_drift == pytest.approx(0.5)
+    assert metrics.last_poll_duration == 0.3
+    assert metrics.polls == 2
+    assert metrics.poll_duration.count == 2
+
+
+def test_request_counters_and_reset() -> None:
+    """Timeouts and errors count as requests; reset zeroes everything."""
+    metrics = DeviceMetrics()
+    metrics.record_request(0.01, 100, 400)
+    metrics.record_unchanged()
+    metrics.record_request(0.02, 100, 400)
+    metrics.record_timeout()
+    metrics.record_error()
+    summary = metrics.as_dict()
+    assert summary["requests"] == 4
+    assert summary["unchanged_ratio"] == 0.25
+    assert summary["bytes_received"] == 800
+    assert summary["latency"]["count"] == 2
+    metrics.reset()
+    assert metrics.as_dict() == DeviceMetrics().as_dict()
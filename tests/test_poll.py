@@ -0,0 +1,182 @@
+"""Tests for legacy polling through Appliance.Control.Multiple."""
+
+from __future__ import annotations
+
+import asyncio
+from copy import deepcopy
+import itertools
+
+import pytest
+
+from refoss_ha.controller import device as controller
+from refoss_ha.device import DeviceInfo
+from refoss_ha.device_manager import build_device_from_abilities
+from refoss_ha.enums import Namespace
+from refoss_ha.exceptions import DeviceTimeoutError
+
+ABILITIES = {
+    Namespace.CONTROL_TOGGLEX.value: {},
+    Namespace.CONTROL_ELECTRICITYX.value: {},
+    Namespace.CONTROL_MULTIPLE.value: {},
+}
+
+_models = itertools.count()
+
+TOGGLEX = {"togglex": [{"channel": 1, "onoff": 1}, {"channel": 2, "onoff": 0}]}
+ELECTRICITY = {
+    "electricity": [
+        {"channel": 1, "power": 5000, "mConsume": 10},
+        {"channel": 2, "power": 0, "mConsume": 20},
+    ]
+}
+
+
+def _answer(namespace: Namespace, payload: dict) -> dict:
+    """Return one GETACK item of a batch response."""
+    return {
+        "header": {"namespace": namespace.value, "method": "GETACK"},
+        "payload": payload,
+    }
+
+
+def _device(responses: dict) -> tuple[controller.BaseDevice, list[str]]:
+    """Build a plug with ToggleX and ElectricityX answering from ``responses``.
+
+    ``responses`` maps a namespace to a response envelope, *None*, or a
+    list of those returned in turn; the namespaces requested are recorded.
+    """
+    # Every test gets its own dynamic type; types are cached by model.
+    model = f"test{next(_models)}"
+    info = DeviceInfo(
+        "uuid", "plug", model, "1.0", "1.0", "192.0.2.1", "80", "mac", "un", [1, 2]
+    )
+    calls: list[str] = []
+
+    async def execute(**kwargs):
+        namespace = Namespace(kwargs["namespace"]).value
+        calls.append(namespace)
+        res = responses[namespace]
+        if isinstance(res, list):
+            res = res.pop(0)
+        if res is DeviceTimeoutError:
+            raise DeviceTimeoutError
+        # Handlers annotate the payload they are given.
+        return deepcopy(res)
+
+    info.async_execute_cmd = execute
+    return build_device_from_abilities(info, ABILITIES), calls
+
+
+BATCH = {
+    "payload": {
+        "multiple": [
+            _answer(Namespace.CONTROL_TOGGLEX, TOGGLEX),
+            _answer(Namespace.CONTROL_ELECTRICITYX, ELECTRICITY),
+        ]
+    }
+}
+SINGLE = {
+    Namespace.CONTROL_TOGGLEX.value: {"payload": TOGGLEX},
+    Namespace.CONTROL_ELECTRICITYX.value: {"payload": ELECTRICITY},
+}
+
+
+def test_batch_answers_are_split_by_namespace() -> None:
+    """One batch request feeds every namespace's handler."""
+    device, calls = _device({Namespace.CONTROL_MULTIPLE.value: BATCH})
+    asyncio.run(device.async_handle_update())
+    assert calls == [Namespace.CONTROL_MULTIPLE.value]
+    assert device.is_on(1) is True
+    assert device.is_on(2) is False
+    assert device.get_value(1, "power") == 5000
+    assert device.revision == 1
+    assert device.stale == set()
+
+
+def test_unanswered_namespaces_are_read_on_their_own() -> None:
+    """A namespace missing from the batch response gets its own request."""
+    partial = {"payload": {"multiple": [_answer(Namespace.CONTROL_TOGGLEX, TOGGLEX)]}}
+    device, calls = _device({Namespace.CONTROL_MULTIPLE.value: partial, **SINGLE})
+    asyncio.run(device.async_handle_update())
+    assert calls == [
+        Namespace.CONTROL_MULTIPLE.value,
+        Namespace.CONTROL_ELECTRICITYX.value,
+    ]
+    assert device.get_value(2, "mConsume") == 20
+
+
+def test_a_failed_batch_falls_back_for_that_poll_only() -> None:
+    """A batch without a response is retried on the next poll."""
+    device, calls = _device(
+        {Namespace.CONTROL_MULTIPLE.value: [None, BATCH], **SINGLE}
+    )
+
+    async def run() -> None:
+        await device.async_handle_update()
+        await device.async_handle_update()
+
+    asyncio.run(run())
+    assert calls[0] == calls[3] == Namespace.CONTROL_MULTIPLE.value
+    assert set(calls[1:3]) == set(SINGLE)
+    assert device.is_on(1) is True
+
+
+def test_repeated_failures_pause_batching_until_the_retry(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Batching stops after several failures in a row and resumes later."""
+    now = [1000.0]
+    monkeypatch.setattr(controller.time, "monotonic", lambda: now[0])
+    failures = [None] * controller.MULTIPLE_MAX_FAILURES
+    device, calls = _device(
+        {Namespace.CONTROL_MULTIPLE.value: [*failures, BATCH], **SINGLE}
+    )
+
+    async def run() -> None:
+        for _ in range(controller.MULTIPLE_MAX_FAILURES + 1):
+            await device.async_handle_update()
+
+    asyncio.run(run())
+    assert calls.count(Namespace.CONTROL_MULTIPLE.value) == len(failures)
+    assert set(calls[-2:]) == set(SINGLE)
+    now[0] += controller.MULTIPLE_RETRY_AFTER
+    calls.clear()
+    asyncio.run(device.async_handle_update())
+    assert calls == [Namespace.CONTROL_MULTIPLE.value]
+
+
+def test_a_rejected_batch_pauses_batching_at_once() -> None:
+    """An acknowledged batch without answers is not retried on the next poll."""
+    device, calls = _device(
+        {Namespace.CONTROL_MULTIPLE.value: {"payload": {}}, **SINGLE}
+    )
+
+    async def run() -> None:
+        await device.async_handle_update()
+        await device.async_handle_update()
+
+    asyncio.run(run())
+    assert calls.count(Namespace.CONTROL_MULTIPLE.value) == 1
+    assert len(calls) == 5
+
+
+def test_a_success_resets_the_failure_count() -> None:
+    """Failures must be consecutive to pause batching."""
+    failures = controller.MULTIPLE_MAX_FAILURES - 1
+    script = [*[None] * failures, BATCH, *[None] * failures, BATCH]
+    device, calls = _device({Namespace.CONTROL_MULTIPLE.value: script, **SINGLE})
+
+    async def run() -> None:
+        for _ in script:
+            await device.async_handle_update()
+
+    asyncio.run(run())
+    assert calls.count(Namespace.CONTROL_MULTIPLE.value) == len(script)
+
+
+def test_a_batch_timeout_fails_the_poll() -> None:
+    """A timed-out batch is raised like any poll timeout and not counted."""
+    device, _ = _device({Namespace.CONTROL_MULTIPLE.value: DeviceTimeoutError})
+    with pytest.raises(DeviceTimeoutError):
+        asyncio.run(device.async_handle_update())
+    assert device._multiple_failures == 0
@@ -0,0 +1,171 @@
+"""Tests for the per-device request queue, priorities and deadlines."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from refoss_ha.exceptions import DeadlineExceeded
+from refoss_ha.request_queue import (
+    Priority,
+    RequestQueue,
+    deadline,
+    priority,
+    request_timeout,
+    time_left,
+)
+
+
+async def _request(
+    queue: RequestQueue, order: list[str], name: str, level: Priority
+) -> None:
+    """Take the slot at ``level`` and record when it was granted."""
+    with priority(level):
+        async with queue.slot():
+            order.append(name)
+            await asyncio.sleep(0)
+
+
+def test_waiting_requests_go_by_priority_then_arrival() -> None:
+    """Commands overtake queued polls; equal priorities keep their order."""
+
+    async def run() -> None:
+        queue = RequestQueue()
+        order: list[str] = []
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with queue.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(_request(queue, order, name, level))
+            for name, level in (
+                ("poll 1", Priority.POLL),
+                ("readback", Priority.READBACK),
+                ("poll 2", Priority.POLL),
+                ("command", Priority.COMMAND),
+            )
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        assert order == ["command", "readback", "poll 1", "poll 2"]
+        counters = queue.as_dict()
+        assert counters["busy"] is False
+        assert counters["priorities"]["poll"]["requests"] == 3
+        assert counters["priorities"]["poll"]["waited"] == 2
+        assert counters["priorities"]["command"]["waited"] == 1
+
+    asyncio.run(run())
+
+
+def test_deadline_stops_waiting_for_the_slot() -> None:
+    """A request past its deadline gives up and leaves the slot to others."""
+
+    async def run() -> None:
+        queue = RequestQueue()
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with queue.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with deadline(0.01), pytest.raises(DeadlineExceeded):
+            async with queue.slot():
+                pass
+        release.set()
+        await holder
+        async with queue.slot():
+            assert queue.as_dict()["waiting"] == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_is_skipped() -> None:
+    """A waiter cancelled before its turn does not keep the slot."""
+
+    async def run() -> None:
+        queue = RequestQueue()
+        order: list[str] = []
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with queue.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(
+            _request(queue, order, "cancelled", Priority.COMMAND)
+        )
+        waiting = asyncio.create_task(_request(queue, order, "poll", Priority.POLL))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        release.set()
+        await asyncio.gather(holder, waiting)
+        assert order == ["poll"]
+
+    asyncio.run(run())
+
+
+def test_polls_do_not_overlap() -> None:
+    """A poll that falls due while one is in flight is skipped and counted."""
+
+    async def run() -> None:
+        queue = RequestQueue()
+        release = asyncio.Event()
+
+        async def poll() -> None:
+            await release.wait()
+
+        first = asyncio.create_task(queue.async_poll(poll))
+        await asyncio.sleep(0)
+        assert not await queue.async_poll(poll)
+        release.set()
+        assert await first
+        assert queue.skipped_polls == 1
+        assert await queue.async_poll(poll)
+
+    asyncio.run(run())
+
+
+def test_deadlines_nest_and_cap_timeouts() -> None:
+    """An inner deadline can only shorten the outer one."""
+    assert time_left() is None
+    assert request_timeout(5) == 5
+    with deadline(2):
+        with deadline(10):
+            assert time_left() <= 2
+        assert request_timeout(5) <= 2
+        with deadline(0.5):
+            assert request_timeout(5) <= 0.5
+    with deadline(-1), pytest.raises(DeadlineExceeded):
+        request_timeout(5)
+
+
+def test_waiters_on_other_loops_are_resumed_there() -> None:
+    """The slot is handed across event loops running on other threads."""
+    queue = RequestQueue()
+    order: list[str] = []
+
+    async def hold() -> None:
+        async with queue.slot():
+            thread = threading.Thread(
+                target=asyncio.run,
+                args=(_request(queue, order, "other loop", Priority.POLL),),
+            )
+            thread.start()
+            while queue.as_dict()["waiting"] == 0:
+                await asyncio.sleep(0.001)
+            order.append("holder")
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+    asyncio.run(hold())
+    assert order == ["holder", "other loop"]
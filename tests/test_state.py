@@ -0,0 +1,149 @@
+"""Tests for the per-channel state store, queued writes and subscriptions."""
+
+from __future__ import annotations
+
+from refoss_ha.state import (
+    ChannelStateStore,
+    Subscriptions,
+    apply_deltas,
+    collect_deltas,
+    defer,
+)
+
+FIELDS = ("power", "voltage", "current")
+
+
+def test_update_keeps_tracked_fields_only() -> None:
+    """A raw status dict is copied into the row; unknown fields are dropped."""
+    store = ChannelStateStore(FIELDS, [1, 2])
+    assert store.update(1, {"power": 10, "voltage": 230, "extra": "x"})
+    assert store.row(1) == {"power": 10, "voltage": 230}
+    assert store.row(2) == {}
+    assert store.get(1, "extra") is None
+    assert store.as_dict() == {1: {"power": 10, "voltage": 230}}
+
+
+def test_update_replaces_the_whole_row() -> None:
+    """Fields missing from a new status become None."""
+    store = ChannelStateStore(FIELDS, [1])
+    store.update(1, {"power": 10, "voltage": 230})
+    store.update(1, {"power": 12})
+    assert store.row(1) == {"power": 12}
+
+
+def test_generation_counts_changes_only() -> None:
+    """Writing the stored values again leaves the generation alone."""
+    store = ChannelStateStore(FIELDS, [1])
+    assert store.update(1, {"power": 10})
+    generation = store.generation
+    assert not store.update(1, {"power": 10})
+    assert not store.set(1, "power", 10)
+    assert store.generation == generation
+    assert store.set(1, "power", 11)
+    assert store.generation > generation
+
+
+def test_unknown_channels_get_a_row() -> None:
+    """Channels not known up front are added on their first write."""
+    store = ChannelStateStore(FIELDS)
+    assert store.slot(5, "power") is None
+    store.set(5, "current", 3)
+    assert store.channels == [5]
+    assert store.value_at(store.slot(5, "current")) == 3
+    assert store.set(5, "unknown", 1) is False
+
+
+def test_collected_writes_wait_for_apply() -> None:
+    """Inside collect_deltas the store is untouched until the deltas apply."""
+    store = ChannelStateStore(FIELDS, [1])
+    store.update(1, {"power": 10, "voltage": 230})
+    generation = store.generation
+    with collect_deltas() as deltas:
+        assert store.update(1, {"power": 12, "voltage": 230})
+        assert store.set(2, "current", 5)
+    assert store.row(1) == {"power": 10, "voltage": 230}
+    assert store.channels == [1]
+    assert store.generation == generation
+    apply_deltas(deltas)
+    assert store.row(1) == {"power": 12, "voltage": 230}
+    assert store.row(2) == {"current": 5}
+    assert store.generation > generation
+
+
+def test_only_changed_fields_are_queued() -> None:
+    """Unchanged writes queue nothing."""
+    store = ChannelStateStore(FIELDS, [1])
+    store.update(1, {"power": 10})
+    with collect_deltas() as deltas:
+        assert not store.update(1, {"power": 10})
+        assert not store.set(1, "power", 10)
+    assert deltas == []
+
+
+def test_defer_runs_now_or_later() -> None:
+    """defer calls at once outside collect_deltas and queues inside it."""
+    calls: list[int] = []
+    defer(calls.append, 1)
+    with collect_deltas() as deltas:
+        defer(calls.append, 2)
+        assert calls == [1]
+    apply_deltas(deltas)
+    assert calls == [1, 2]
+
+
+def test_subscriptions_match_channel_and_field_wildcards() -> None:
+    """Callbacks run for their exact key and for None wildcards."""
+    subscriptions = Subscriptions()
+    calls: list[tuple[str, int, str, object]] = []
+    for name, channel, field in (
+        ("exact", 1, "power"),
+        ("channel", 1, None),
+        ("field", None, "power"),
+        ("all", None, None),
+        ("other", 2, "power"),
+    ):
+        subscriptions.subscribe(
+            channel, field, lambda c, f, v, name=name: calls.append((name, c, f, v))
+        )
+    subscriptions.notify(1, "power", 5)
+    assert [call[0] for call in calls] == ["exact", "channel", "field", "all"]
+    assert calls[0] == ("exact", 1, "power", 5)
+
+
+def test_unsubscribe_and_failing_callbacks() -> None:
+    """An unsubscribed callback stops; one that raises does not stop the others."""
+    subscriptions = Subscriptions()
+    calls: list[object] = []
+
+    def broken(channel: int, field: str, value: object) -> None:
+        raise ValueError
+
+    subscriptions.subscribe(1, "power", broken)
+    unsubscribe = subscriptions.subscribe(1, "power", lambda *args: calls.append(args))
+    subscriptions.notify(1, "power", 1)
+    assert calls == [(1, "power", 1)]
+    unsubscribe()
+    unsubscribe()
+    subscriptions.notify(1, "power", 2)
+    assert calls == [(1, "power", 1)]
+    assert len(subscriptions) == 1
+
+
+def test_store_notifies_changed_fields() -> None:
+    """The store reports each changed value once, including queued writes."""
+    subscriptions = Subscriptions()
+    changes: list[tuple[int, str, object]] = []
+    subscriptions.subscribe(None, None, lambda *args: changes.append(args))
+    store = ChannelStateStore(FIELDS, [1], subscriptions)
+    store.update(1, {"power": 10, "voltage": 230})
+    assert changes == [(1, "power", 10), (1, "voltage", 230)]
+    changes.clear()
+    store.update(1, {"power": 10, "voltage": 231})
+    store.set(1, "voltage", 231)
+    assert changes == [(1, "voltage", 231)]
+    changes.clear()
+    with collect_deltas() as deltas:
+        store.set(1, "current", 4)
+    assert changes == []
+    apply_deltas(deltas)
+    assert changes == [(1, "current", 4)]
@@ -0,0 +1,123 @@
+"""Tests for the per-device snapshot stream."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import aclosing
+
+from refoss_ha.request_queue import RequestQueue
+from refoss_ha.stream import PollStream, Snapshot, _Consumer
+
+
+class FakeDevice:
+    """The parts of a controller a stream uses."""
+
+    dev_name = "fake"
+
+    def __init__(self) -> None:
+        self.queue = RequestQueue()
+        self.channels = [1, 2]
+        self.stale: set[int] = set()
+        self.revision = 0
+        self.polls = 0
+        self.fail = False
+        self.power = 0
+
+    def poll_deadline(self, interval: float) -> float:
+        return 1.0
+
+    async def async_handle_update(self) -> None:
+        self.polls += 1
+        if self.fail:
+            raise TimeoutError
+        if self.power != self.polls // 2:
+            self.power = self.polls // 2
+            self.revision += 1
+
+    def channel_status(self) -> dict[int, dict]:
+        return {channel: {"power": self.power} for channel in self.channels}
+
+
+def _snapshot(revision: int = 0) -> Snapshot:
+    return Snapshot(0.0, revision, {}, frozenset())
+
+
+def test_consumer_takes_snapshots_when_due() -> None:
+    """Snapshots offered before the consumer's next tick are not delivered."""
+
+    async def run() -> None:
+        consumer = _Consumer(1.0)
+        assert not consumer.offer(_snapshot(1), started=0.0)
+        assert not consumer.offer(_snapshot(2), started=0.5)
+        assert (await consumer.get()).revision == 1
+        assert not consumer.offer(_snapshot(3), started=1.0)
+        assert (await consumer.get()).revision == 3
+
+    asyncio.run(run())
+
+
+def test_consumer_keeps_only_the_latest_snapshot() -> None:
+    """An untaken snapshot is replaced, and the replacement is reported."""
+
+    async def run() -> None:
+        consumer = _Consumer(1.0)
+        assert not consumer.offer(_snapshot(1), started=0.0)
+        assert consumer.offer(_snapshot(2), started=1.0)
+        assert (await consumer.get()).revision == 2
+
+    asyncio.run(run())
+
+
+def test_consumer_resumes_after_falling_behind() -> None:
+    """After a long pause the next tick is one interval after the offer."""
+    consumer = _Consumer(1.0)
+    consumer.offer(_snapshot(), started=0.0)
+    consumer.offer(_snapshot(), started=10.2)
+    assert consumer.next_due == 11.2
+
+
+def test_stream_fans_out_and_stops_with_the_last_consumer() -> None:
+    """Consumers get snapshots at their own rate from one poll loop."""
+
+    async def run() -> None:
+        device = FakeDevice()
+        stream = PollStream(device)
+        fast: list[Snapshot] = []
+        slow: list[Snapshot] = []
+
+        async def consume(interval: float, into: list[Snapshot], count: int) -> None:
+            async with aclosing(stream.subscribe(interval)) as snapshots:
+                async for snapshot in snapshots:
+                    into.append(snapshot)
+                    if len(into) == count:
+                        break
+
+        await asyncio.gather(consume(0.01, fast, 6), consume(0.03, slow, 2))
+        assert len(stream) == 0
+        assert stream.polls >= len(fast)
+        assert all(not snapshot.stale and snapshot.error is None for snapshot in fast)
+        # Snapshots of polls that changed nothing share their channels.
+        same = [(a, b) for a, b in zip(fast, fast[1:]) if a.revision == b.revision]
+        assert same
+        assert all(a.channels is b.channels for a, b in same)
+        polls = device.polls
+        await asyncio.sleep(0.05)
+        assert device.polls == polls
+
+    asyncio.run(run())
+
+
+def test_failed_poll_marks_every_channel_stale() -> None:
+    """A failed poll still produces a snapshot carrying the error."""
+
+    async def run() -> None:
+        device = FakeDevice()
+        device.fail = True
+        stream = PollStream(device)
+        async with aclosing(stream.subscribe(0.01)) as snapshots:
+            snapshot = await anext(snapshots)
+        assert isinstance(snapshot.error, TimeoutError)
+        assert snapshot.stale == frozenset({1, 2})
+        assert stream.failed_polls >= 1
+
+    asyncio.run(run())
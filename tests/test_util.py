@@ -0,0 +1,61 @@
+"""Tests for the unchanged-response detection."""
+
+from __future__ import annotations
+
+import json
+
+from refoss_ha.device import _VOLATILE_FIELDS
+from refoss_ha.util import ResponseDigests
+
+
+def _envelope(message_id: str, timestamp: int, onoff: int) -> bytes:
+    """Return a legacy response body."""
+    return json.dumps(
+        {
+            "header": {
+                "messageId": message_id,
+                "namespace": "Appliance.Control.ToggleX",
+                "method": "GETACK",
+                "timestamp": timestamp,
+                "sign": message_id[::-1],
+            },
+            "payload": {"togglex": [{"channel": 1, "onoff": onoff}]},
+        }
+    ).encode()
+
+
+def test_repeated_body_is_unchanged() -> None:
+    """The second identical body for a key is reported as unchanged."""
+    digests = ResponseDigests()
+    assert not digests.unchanged("status", b'{"power": 1}')
+    assert digests.unchanged("status", b'{"power": 1}')
+    assert not digests.unchanged("status", b'{"power": 2}')
+    assert not digests.unchanged("status", b'{"power": 1}')
+
+
+def test_keys_are_independent() -> None:
+    """Each request key remembers its own last body."""
+    digests = ResponseDigests()
+    assert not digests.unchanged(1, b"a")
+    assert not digests.unchanged(2, b"a")
+    assert digests.unchanged(1, b"a")
+
+
+def test_forget_and_clear() -> None:
+    """A forgotten response counts as new again."""
+    digests = ResponseDigests()
+    digests.unchanged(1, b"a")
+    digests.unchanged(2, b"b")
+    digests.forget(1)
+    assert not digests.unchanged(1, b"a")
+    assert digests.unchanged(2, b"b")
+    digests.clear()
+    assert not digests.unchanged(2, b"b")
+
+
+def test_volatile_envelope_fields_are_ignored() -> None:
+    """Message ids, timestamps and signatures do not make a response new."""
+    digests = ResponseDigests(_VOLATILE_FIELDS)
+    assert not digests.unchanged("togglex", _envelope("abc", 100, 1))
+    assert digests.unchanged("togglex", _envelope("def", 101, 1))
+    assert not digests.unchanged("togglex", _envelope("ghi", 102, 0))
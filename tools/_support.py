@@ -0,0 +1,16 @@
+"""Helpers shared by the tools.
+
+Importing this module makes the ``refoss_ha`` library importable as a
+standalone package, so the tools run without Home Assistant.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_LIBRARY = str(ROOT / "custom_components" / "refoss_lan")
+if _LIBRARY not in sys.path:
+    sys.path.insert(0, _LIBRARY)
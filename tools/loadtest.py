@@ -0,0 +1,386 @@
+"""Soak test: a simulated fleet polled by the real controllers.
+
+Starts simulated devices (see :mod:`simulator`) on their own thread and
+event loop, builds a controller for each through
+:func:`~refoss_ha.device_manager.async_build_base_device` or
+:func:`~refoss_ha.device_manager.async_build_rpc_device`, and polls them all from a
+:class:`~refoss_ha.engine.PollEngine` at a fixed interval for a set duration, each
+poll going through the device's request queue under a deadline the way the
+integration polls. After a warm-up it reports:
+
+- throughput: polls and requests per second, polls skipped because the
+  previous one was still running;
+- latency percentiles of requests, whole polls and poll start lag;
+- error rates: failed and cut polls, request timeouts and errors;
+- CPU time of the polling thread per poll and as a share of one core
+  (the simulator's thread does not count);
+- memory: resident set size at the start and end of the measured period
+  and, with ``--tracemalloc``, the growth of the Python heap.
+
+Devices bind to consecutive loopback addresses from ``127.0.0.2``. Run from
+the repository root::
+
+    python tools/loadtest.py --model em16p --model r21 --count 25 --duration 600
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+
+import _support  # noqa: F401  # makes refoss_ha importable
+from refoss_ha.controller.device import BaseDevice
+from refoss_ha.device import DeviceInfo
+from refoss_ha.device_manager import async_build_base_device, async_build_rpc_device
+from refoss_ha.device_rpc import DeviceInfoRpc
+from refoss_ha.engine import PollEngine
+from refoss_ha.metrics import LatencyHistogram
+from refoss_ha.request_queue import deadline
+from simulator import NetworkConditions, SimulatedDevice, async_start_fleet
+
+DEFAULT_MODELS = ["r10", "em16", "r21", "em16p"]
+
+
+def _rss_kib() -> int:
+    """Return the resident set size of the process in KiB.
+
+    Falls back to the peak resident set size where ``/proc`` is missing.
+    """
+    import resource  # pylint: disable=import-outside-toplevel  # not on Windows
+
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, KiB elsewhere.
+        return peak // 1024 if sys.platform == "darwin" else peak
+    return pages * resource.getpagesize() // 1024
+
+
+class _Fleet:
+    """Simulated devices served from a thread of their own."""
+
+    def __init__(
+        self, models: list[str], port: int, conditions: NetworkConditions
+    ) -> None:
+        """Start the devices; their CPU time is not the poller's."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="simulator", daemon=True
+        )
+        self._thread.start()
+        self.devices: list[SimulatedDevice] = asyncio.run_coroutine_threadsafe(
+            async_start_fleet(models, port=port, conditions=conditions), self._loop
+        ).result()
+
+    def stop(self) -> None:
+        """Stop the devices and their thread."""
+
+        async def stop() -> None:
+            await asyncio.gather(*(device.async_stop() for device in self.devices))
+
+        asyncio.run_coroutine_threadsafe(stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+async def _async_build(device: SimulatedDevice) -> BaseDevice:
+    """Build the controller of one simulated device."""
+    if device.legacy:
+        return await async_build_base_device(
+            DeviceInfo.from_dict(device.discovery_info())
+        )
+    info = await DeviceInfoRpc.async_probe(device.address)
+    if info is None:
+        raise RuntimeError(f"{device.address} did not answer the Open API probe")
+    return await async_build_rpc_device(info)
+
+
+class LoadTest:
+    """Poll a fleet of controllers and collect what the report needs."""
+
+    def __init__(
+        self,
+        controllers: list[BaseDevice],
+        interval: float,
+        poll_deadline: float | None,
+        max_concurrent: int,
+    ) -> None:
+        """Initialize the test; nothing is polled before :meth:`async_run`."""
+        self.controllers = controllers
+        self.interval = interval
+        # Seconds a poll may take; by default each device's own deadline.
+        self.poll_deadline = poll_deadline
+        self.engine = PollEngine(max_concurrent)
+        self.poll_duration = LatencyHistogram()
+        self.failures: Counter[str] = Counter()
+        for index, controller in enumerate(controllers):
+            self.engine.add(index, interval, self._poller(controller))
+
+    def _poller(self, controller: BaseDevice):
+        """Return the poll of one controller, timed like the coordinator's."""
+
+        poll_deadline = self.poll_deadline or controller.poll_deadline(self.interval)
+
+        async def poll() -> None:
+            started = time.monotonic()
+            try:
+                with deadline(poll_deadline):
+                    polled = await controller.queue.async_poll(
+                        controller.async_handle_update
+                    )
+            except Exception as err:
+                self.failures[type(err).__name__] += 1
+                raise
+            if polled:
+                duration = time.monotonic() - started
+                self.poll_duration.record(duration)
+                controller.metrics.record_poll(started, duration, self.interval)
+
+        return poll
+
+    def reset(self) -> None:
+        """Forget everything recorded so far (after the warm-up)."""
+        self.engine.polls = self.engine.failed_polls = self.engine.skipped_polls = 0
+        self.engine.lag = LatencyHistogram()
+        self.poll_duration = LatencyHistogram()
+        self.failures.clear()
+        for controller in self.controllers:
+            controller.metrics.reset()
+            controller.queue.skipped_polls = 0
+
+    async def async_run(
+        self, warmup: float, duration: float, progress: float, heap: bool
+    ) -> dict:
+        """Poll for ``warmup`` plus ``duration`` seconds; return the report."""
+        runner = asyncio.create_task(self.engine.run(), name="refoss loadtest")
+        try:
+            await asyncio.sleep(warmup)
+            self.reset()
+            if heap:
+                tracemalloc.start()
+            heap_start = tracemalloc.get_traced_memory()[0] if heap else None
+            rss_start = _rss_kib()
+            cpu = time.thread_time()
+            started = time.monotonic()
+            end = started + duration
+            while (left := end - time.monotonic()) > 0:
+                await asyncio.sleep(min(left, progress) if progress else left)
+                if progress and left > progress:
+                    self._print_progress(time.monotonic() - started)
+            cpu = time.thread_time() - cpu
+            wall = time.monotonic() - started
+            rss_end = _rss_kib()
+            heap_end = tracemalloc.get_traced_memory()[0] if heap else None
+        finally:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+            if heap:
+                tracemalloc.stop()
+        report = self.report(wall, cpu)
+        report["memory"] = {
+            "rss_start_kib": rss_start,
+            "rss_end_kib": rss_end,
+            "rss_growth_kib": rss_end - rss_start,
+            "heap_growth_kib": (
+                round((heap_end - heap_start) / 1024, 1) if heap else None
+            ),
+        }
+        return report
+
+    def _print_progress(self, elapsed: float) -> None:
+        """Print one progress line to stderr."""
+        print(
+            f"{elapsed:8.0f}s  polls {self.engine.polls:>8}"
+            f"  failed {self.engine.failed_polls:>6}"
+            f"  skipped {self.engine.skipped_polls:>6}"
+            f"  p99 {self.poll_duration.percentile(0.99) or 0:>8.1f} ms"
+            f"  rss {_rss_kib() / 1024:>7.1f} MiB",
+            file=sys.stderr,
+        )
+
+    def report(self, wall: float, cpu: float) -> dict:
+        """Return the measurements of a run of ``wall`` seconds."""
+        engine = self.engine
+        latency = LatencyHistogram()
+        requests = timeouts = errors = unchanged = cut_polls = queue_skipped = 0
+        for controller in self.controllers:
+            metrics = controller.metrics
+            latency.merge(metrics.latency)
+            requests += metrics.requests
+            timeouts += metrics.timeouts
+            errors += metrics.errors
+            unchanged += metrics.unchanged
+            cut_polls += metrics.cut_polls
+            queue_skipped += controller.queue.skipped_polls
+        attempts = engine.polls + engine.failed_polls
+        return {
+            "devices": len(self.controllers),
+            "models": dict(
+                Counter(controller.device_type for controller in self.controllers)
+            ),
+            "interval_s": self.interval,
+            "duration_s": round(wall, 3),
+            "polls": engine.polls,
+            "polls_per_s": round(engine.polls / wall, 2),
+            "skipped_polls": engine.skipped_polls + queue_skipped,
+            "failed_polls": engine.failed_polls,
+            "failed_ratio": round(engine.failed_polls / attempts, 4) if attempts else None,
+            "failures": dict(self.failures),
+            "cut_polls": cut_polls,
+            "requests": requests,
+            "requests_per_s": round(requests / wall, 2),
+            "timeouts": timeouts,
+            "errors": errors,
+            "error_ratio": round((timeouts + errors) / requests, 4) if requests else None,
+            "unchanged_ratio": round(unchanged / requests, 3) if requests else None,
+            "request_latency": latency.as_dict(),
+            "poll_duration": self.poll_duration.as_dict(),
+            "poll_lag": engine.lag.as_dict(),
+            "cpu_ms_per_poll": round(cpu * 1000 / attempts, 3) if attempts else None,
+            "cpu_percent": round(cpu * 100 / wall, 1),
+        }
+
+
+def _print_report(report: dict) -> None:
+    """Print a report as a table."""
+    models = ", ".join(f"{count} {model}" for model, count in report["models"].items())
+    print(f"devices        {report['devices']} ({models})")
+    print(f"interval       {report['interval_s']} s over {report['duration_s']} s")
+    print(
+        f"throughput     {report['polls_per_s']} polls/s,"
+        f" {report['requests_per_s']} requests/s"
+    )
+    print(
+        f"polls          {report['polls']} ok, {report['failed_polls']} failed,"
+        f" {report['cut_polls']} cut short, {report['skipped_polls']} skipped"
+    )
+    if report["failures"]:
+        failures = ", ".join(f"{n} {name}" for name, n in report["failures"].items())
+        print(f"failures       {failures}")
+    print(
+        f"requests       {report['requests']}, {report['timeouts']} timeouts,"
+        f" {report['errors']} errors, unchanged ratio {report['unchanged_ratio']}"
+    )
+    print(f"{'latency ms':15}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for key, label in (
+        ("request_latency", "request"),
+        ("poll_duration", "poll"),
+        ("poll_lag", "poll lag"),
+    ):
+        summary = report[key]
+        print(
+            f"  {label:13}"
+            + "".join(
+                f"{summary[stat] if summary[stat] is not None else '-':>10}"
+                for stat in ("p50_ms", "p95_ms", "p99_ms", "max_ms")
+            )
+        )
+    print(
+        f"cpu            {report['cpu_ms_per_poll']} ms/poll,"
+        f" {report['cpu_percent']}% of one core"
+    )
+    memory = report["memory"]
+    line = (
+        f"memory         rss {memory['rss_start_kib']} -> {memory['rss_end_kib']} KiB"
+        f" ({memory['rss_growth_kib']:+} KiB)"
+    )
+    if memory["heap_growth_kib"] is not None:
+        line += f", heap {memory['heap_growth_kib']:+} KiB"
+    print(line)
+
+
+async def _async_main(args: argparse.Namespace) -> dict:
+    """Start the fleet, build the controllers and run the test."""
+    # Shared by every device and read per request: the controllers are built
+    # over a clean network, then the requested conditions apply.
+    conditions = NetworkConditions()
+    models = [model for model in args.model for _ in range(args.count)]
+    fleet = await asyncio.to_thread(_Fleet, models, args.port, conditions)
+    try:
+        controllers = await asyncio.gather(
+            *(_async_build(device) for device in fleet.devices)
+        )
+        conditions.latency = args.latency
+        conditions.jitter = args.jitter
+        conditions.loss = args.loss
+        conditions.reset = args.reset
+        longest = args.deadline or max(
+            controller.poll_deadline(args.interval) for controller in controllers
+        )
+        # A lost request only has to outlast the poll it belongs to.
+        conditions.loss_hold = longest + 1.0
+        test = LoadTest(
+            controllers, args.interval, args.deadline, args.max_concurrent
+        )
+        return await test.async_run(
+            args.warmup, args.duration, 0 if args.json else args.progress, args.tracemalloc
+        )
+    finally:
+        await asyncio.to_thread(fleet.stop)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        description="Poll simulated Refoss devices with the real controllers"
+    )
+    parser.add_argument("--model", action="append", default=None,
+                        help="device model, repeatable (default: r10 em16 r21 em16p)")
+    parser.add_argument("--count", type=int, default=5, help="devices per model")
+    parser.add_argument("--port", type=int, default=18080, help="simulator port")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between polls of a device")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="seconds a poll may take (default: 0.8 x interval, "
+                             "at least one request timeout)")
+    parser.add_argument("--duration", type=float, default=60.0,
+                        help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0,
+                        help="seconds polled before measuring")
+    parser.add_argument("--max-concurrent", type=int, default=32,
+                        help="polls running at once")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--reset", type=float, default=0.0)
+    parser.add_argument("--progress", type=float, default=10.0,
+                        help="seconds between progress lines, 0 for none")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="also measure Python heap growth (slows polling)")
+    parser.add_argument("--max-error-ratio", type=float, default=None,
+                        help="exit non-zero if failed polls or request errors exceed this")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+    args.model = args.model or DEFAULT_MODELS
+    # Polls cancelled at the end of the run drop their connections mid-request.
+    logging.getLogger("aiohttp.server").setLevel(logging.CRITICAL)
+
+    try:
+        report = asyncio.run(_async_main(args))
+    except KeyboardInterrupt:
+        return 130
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        _print_report(report)
+    if args.max_error_ratio is not None and any(
+        (report[key] or 0) > args.max_error_ratio
+        for key in ("failed_ratio", "error_ratio")
+    ):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
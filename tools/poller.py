@@ -0,0 +1,487 @@
+"""Headless poller: stream device readings without Home Assistant.
+
+Polls devices with the library's controllers, through the same transport,
+request queues and :class:`~refoss_ha.engine.PollEngine` the integration uses, and
+writes one record per channel and poll to stdout or to a size-rotated file,
+as InfluxDB line protocol or NDJSON.
+
+Records go through a :class:`ReadingExporter`, which batches them and writes
+each batch from a worker thread. When the output cannot keep up, polls wait
+for room in the exporter's buffer (and the engine skips polls that fall
+due meanwhile), or with ``--drop`` the newest records are dropped and
+counted instead. Channels whose values were not refreshed by a poll are left
+out of its records.
+
+Field names and units are the ones the device reports, so they differ
+between the legacy protocol and the Open API (milli-units, see
+:class:`~refoss_ha.controller.em_rpc.EmRpcMix`).
+
+Run from the repository root::
+
+    python tools/poller.py 192.168.1.20 192.168.1.21 --interval 1
+    python tools/poller.py --devices devices.json --format ndjson \\
+        --output readings.ndjson --max-bytes 50000000 --backup-count 5
+
+``devices.json`` holds a list of hosts or of device dicts (the ``device``
+data of a config entry, or a legacy discovery reply).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable, Iterable, Iterator
+import contextlib
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from typing import IO, Any, NamedTuple
+
+import _support  # noqa: F401  # makes refoss_ha importable
+from refoss_ha.controller.device import BaseDevice
+from refoss_ha.device import DeviceInfo
+from refoss_ha.device_manager import async_build_base_device, async_build_rpc_device
+from refoss_ha.device_rpc import DeviceInfoRpc
+from refoss_ha.discovery import Discovery
+from refoss_ha.engine import PollEngine
+from refoss_ha.exceptions import RefossError
+from refoss_ha.request_queue import deadline
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MEASUREMENT = "refoss"
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_PENDING = 10000
+DISCOVERY_TIMEOUT = 3
+
+
+class Reading(NamedTuple):
+    """The values of one channel at one poll."""
+
+    time_ns: int
+    mac: str
+    name: str
+    model: str
+    channel: int
+    fields: dict[str, float | bool]
+
+
+def device_readings(device: BaseDevice, time_ns: int) -> Iterator[Reading]:
+    """Yield a reading of every refreshed channel of ``device``."""
+    for channel, row in device.channel_status().items():
+        if channel in device.stale:
+            continue
+        fields = {
+            field: value
+            for field, value in row.items()
+            if isinstance(value, (bool, int, float))
+        }
+        if fields:
+            yield Reading(
+                time_ns, device.mac, device.dev_name, device.device_type, channel, fields
+            )
+
+
+def _escape(value: str, special: str) -> str:
+    """Backslash-escape the characters in ``special``."""
+    for char in "\\" + special:
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+def encode_line_protocol(reading: Reading, measurement: str) -> str:
+    """Encode a reading as an InfluxDB line protocol line.
+
+    Numbers are written as floats so that a field keeps one type whether the
+    device reported it as an integer or not.
+    """
+    tags = ",".join(
+        f"{key}={_escape(str(value), ', =')}"
+        for key, value in (
+            ("mac", reading.mac),
+            ("name", reading.name),
+            ("model", reading.model),
+            ("channel", reading.channel),
+        )
+        if value != ""
+    )
+    fields = ",".join(
+        f"{_escape(field, ', =')}="
+        + (("true" if value else "false") if isinstance(value, bool) else repr(float(value)))
+        for field, value in reading.fields.items()
+    )
+    return f"{_escape(measurement, ', ')},{tags} {fields} {reading.time_ns}\n"
+
+
+def encode_ndjson(reading: Reading, measurement: str) -> str:
+    """Encode a reading as one JSON object per line."""
+    return (
+        json.dumps(
+            {
+                "measurement": measurement,
+                "time": reading.time_ns / 1e9,
+                "mac": reading.mac,
+                "name": reading.name,
+                "model": reading.model,
+                "channel": reading.channel,
+                **reading.fields,
+            },
+            separators=(",", ":"),
+        )
+        + "\n"
+    )
+
+
+ENCODERS: dict[str, Callable[[Reading, str], str]] = {
+    "line": encode_line_protocol,
+    "ndjson": encode_ndjson,
+}
+
+
+class RotatingFile:
+    """An append-only file rotated by size, like ``logging``'s handler.
+
+    When a write would take the file past ``max_bytes``, ``path`` becomes
+    ``path.1``, ``path.1`` becomes ``path.2`` and so on, keeping
+    ``backup_count`` old files. ``max_bytes`` of 0 never rotates.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 0, backup_count: int = 0) -> None:
+        """Open ``path`` for appending."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._file: IO[bytes] = open(path, "ab")  # noqa: SIM115
+
+    def write(self, data: bytes) -> None:
+        """Append ``data``, rotating first if it would not fit."""
+        if self.max_bytes and self._file.tell() + len(data) > self.max_bytes:
+            if self._file.tell():
+                self._rotate()
+        self._file.write(data)
+        self._file.flush()
+
+    def _rotate(self) -> None:
+        """Move the current file to the first backup and start a new one."""
+        self._file.close()
+        if self.backup_count:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")  # noqa: SIM115
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+
+class _Stream:
+    """Write to a binary stream such as stdout, flushing every batch."""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        """Wrap ``stream``."""
+        self._stream = stream
+
+    def write(self, data: bytes) -> None:
+        """Write and flush ``data``."""
+        self._stream.write(data)
+        self._stream.flush()
+
+    def close(self) -> None:
+        """Leave the stream open; it is not ours."""
+
+
+class ReadingExporter:
+    """Batch encoded readings and write them from a worker thread.
+
+    :meth:`async_export` encodes the readings of a polled device and queues
+    them; :meth:`run` writes them in batches of up to ``batch_size`` lines,
+    or whatever has arrived after ``flush_interval`` seconds. At most
+    ``max_pending`` lines wait to be written: beyond that
+    :meth:`async_export` waits for room, or with ``drop`` set discards the
+    lines that do not fit and counts them.
+
+    The exporter only reads controllers, so any poller can feed it, such as
+    a :class:`~refoss_ha.engine.PollEngine` shared with other consumers.
+    """
+
+    def __init__(
+        self,
+        sink: RotatingFile | _Stream,
+        encoder: Callable[[Reading, str], str] = encode_line_protocol,
+        measurement: str = DEFAULT_MEASUREMENT,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        drop: bool = False,
+    ) -> None:
+        """Initialize an exporter writing to ``sink``."""
+        self._sink = sink
+        self._encoder = encoder
+        self._measurement = measurement
+        self._queue: asyncio.Queue[str] = asyncio.Queue(max_pending)
+        # Set once a whole batch is waiting.
+        self._full = asyncio.Event()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop = drop
+        self.lines = 0
+        self.batches = 0
+        self.bytes_written = 0
+        self.dropped = 0
+
+    async def async_export(self, device: BaseDevice, time_ns: int | None = None) -> None:
+        """Queue the readings of every refreshed channel of ``device``."""
+        if time_ns is None:
+            time_ns = time.time_ns()
+        for reading in device_readings(device, time_ns):
+            line = self._encoder(reading, self._measurement)
+            if not self.drop:
+                await self._queue.put(line)
+            else:
+                try:
+                    self._queue.put_nowait(line)
+                except asyncio.QueueFull:
+                    self.dropped += 1
+                    continue
+            if self._queue.qsize() >= self.batch_size:
+                self._full.set()
+
+    async def run(self) -> None:
+        """Write batches until cancelled, then write what is left."""
+        batch: list[str] = []
+        writing: asyncio.Future | None = None
+        try:
+            while True:
+                batch.append(await self._queue.get())
+                if self._queue.qsize() + 1 < self.batch_size:
+                    self._full.clear()
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                lines, batch = batch, []
+                writing = asyncio.ensure_future(asyncio.to_thread(self._write, lines))
+                await asyncio.shield(writing)
+        finally:
+            if writing is not None:
+                # Let a batch being written finish before the rest follows.
+                await asyncio.gather(writing, return_exceptions=True)
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list[str]) -> None:
+        """Write one batch to the sink."""
+        data = "".join(batch).encode()
+        self._sink.write(data)
+        self.lines += len(batch)
+        self.batches += 1
+        self.bytes_written += len(data)
+
+    def as_dict(self) -> dict:
+        """Return exporter counters."""
+        return {
+            "lines": self.lines,
+            "batches": self.batches,
+            "bytes_written": self.bytes_written,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+        }
+
+
+class Poller:
+    """Poll devices on one engine and export their readings."""
+
+    def __init__(
+        self,
+        exporter: ReadingExporter,
+        interval: float,
+        poll_deadline: float | None = None,
+        max_concurrent: int = 32,
+    ) -> None:
+        """Initialize a poller without devices."""
+        self.exporter = exporter
+        self.interval = interval
+        # Seconds a poll may take; by default each device's own deadline.
+        self.poll_deadline = poll_deadline
+        self.engine = PollEngine(max_concurrent)
+        self.devices: list[BaseDevice] = []
+        # Every discovery listens on the same UDP port, so one runs at a time.
+        self._discovery_lock = asyncio.Lock()
+
+    async def async_resolve(self, host: str) -> DeviceInfo | DeviceInfoRpc:
+        """Find the device at ``host``: Open API first, then legacy discovery.
+
+        Raises :class:`RefossError` if neither answers.
+        """
+        if (rpc_device := await DeviceInfoRpc.async_probe(host)) is not None:
+            return rpc_device
+        async with self._discovery_lock:
+            discovery = Discovery()
+            try:
+                await discovery.initialize()
+                # Devices answer on UDP port 9988, whatever their HTTP port.
+                found = await discovery.broadcast_msg(
+                    ip=host.split(":", 1)[0], wait_for=DISCOVERY_TIMEOUT
+                )
+            finally:
+                discovery.closeDiscovery()
+        if not found:
+            raise RefossError(f"No Refoss device answered at {host}")
+        return DeviceInfo.from_dict(found)
+
+    async def async_build(self, spec: str | dict[str, Any]) -> BaseDevice:
+        """Build the controller of a host or of a stored device dict."""
+        if isinstance(spec, str):
+            info = await self.async_resolve(spec)
+        elif spec.get("protocol", "lan") == "rpc":
+            info = DeviceInfoRpc.from_dict(spec)
+        else:
+            info = DeviceInfo.from_dict(spec)
+        if isinstance(info, DeviceInfoRpc):
+            return await async_build_rpc_device(info)
+        return await async_build_base_device(info)
+
+    def add(self, device: BaseDevice) -> None:
+        """Poll ``device`` and export its readings after every poll."""
+        self.devices.append(device)
+
+        async def poll() -> None:
+            time_ns = time.time_ns()
+            with deadline(self.poll_deadline or device.poll_deadline(self.interval)):
+                polled = await device.queue.async_poll(device.async_handle_update)
+            if polled:
+                await self.exporter.async_export(device, time_ns)
+
+        self.engine.add(device.mac, self.interval, poll)
+
+    async def run(self) -> None:
+        """Poll and export until cancelled."""
+        writer = asyncio.create_task(self.exporter.run(), name="refoss exporter")
+        try:
+            await self.engine.run()
+        finally:
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+
+    def as_dict(self) -> dict:
+        """Return engine and exporter counters."""
+        return {"engine": self.engine.as_dict(), "exporter": self.exporter.as_dict()}
+
+
+def _load_devices(hosts: Iterable[str], path: str | None) -> list[str | dict]:
+    """Return the hosts given on the command line and in the devices file."""
+    specs: list[str | dict] = list(hosts)
+    if path:
+        with open(path, encoding="utf-8") as file:
+            specs.extend(json.load(file))
+    return specs
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    """Build the devices and poll them until stopped."""
+    specs = _load_devices(args.hosts, args.devices)
+    if not specs:
+        raise SystemExit("no devices given")
+    if args.output == "-":
+        sink: RotatingFile | _Stream = _Stream(sys.stdout.buffer)
+    else:
+        sink = RotatingFile(args.output, args.max_bytes, args.backup_count)
+    exporter = ReadingExporter(
+        sink,
+        ENCODERS[args.format],
+        args.measurement,
+        args.batch_size,
+        args.flush_interval,
+        args.max_pending,
+        args.drop,
+    )
+    poller = Poller(exporter, args.interval, args.deadline, args.max_concurrent)
+    results = await asyncio.gather(
+        *(poller.async_build(spec) for spec in specs), return_exceptions=True
+    )
+    for spec, result in zip(specs, results):
+        if isinstance(result, BaseException):
+            _LOGGER.error("Cannot poll %s: %r", spec, result)
+        else:
+            _LOGGER.info("Polling %s (%s)", result.dev_name, result.inner_ip)
+            poller.add(result)
+    if not poller.devices:
+        raise SystemExit("no device could be reached")
+
+    task = asyncio.current_task()
+    with contextlib.suppress(NotImplementedError):
+        # Stop cleanly on SIGTERM too; not available on Windows.
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    try:
+        if args.duration:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(poller.run(), args.duration)
+        else:
+            await poller.run()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        sink.close()
+        _LOGGER.info("Stopped: %s", json.dumps(poller.as_dict()))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        description="Poll Refoss devices and stream their readings"
+    )
+    parser.add_argument("hosts", nargs="*", help="device address or address:port")
+    parser.add_argument("--devices", help="JSON file listing hosts or device dicts")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between polls of a device")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="seconds a poll may take (default: 0.8 x interval, "
+                             "at least one request timeout)")
+    parser.add_argument("--max-concurrent", type=int, default=32,
+                        help="polls running at once")
+    parser.add_argument("--format", choices=sorted(ENCODERS), default="line",
+                        help="line protocol or NDJSON")
+    parser.add_argument("--measurement", default=DEFAULT_MEASUREMENT)
+    parser.add_argument("--output", default="-", help="file to append to, - for stdout")
+    parser.add_argument("--max-bytes", type=int, default=0,
+                        help="rotate the output file at this size, 0 for never")
+    parser.add_argument("--backup-count", type=int, default=5,
+                        help="rotated files to keep")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="lines per write")
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="seconds a line may wait for its batch to fill")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="lines buffered before polls wait (or lines drop)")
+    parser.add_argument("--drop", action="store_true",
+                        help="drop lines instead of delaying polls when behind")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="stop after this many seconds")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        stream=sys.stderr,
+    )
+
+    try:
+        asyncio.run(_async_main(args))
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,632 @@
+"""Simulated Refoss devices for load testing without hardware.
+
+Each :class:`SimulatedDevice` serves the same interfaces as a real device:
+
+- legacy models (``r10``, ``em06``, ``em16``): the signed JSON envelope on
+  ``POST /public`` and ``POST /config`` (``Appliance.System.Ability``,
+  ``Appliance.System.All``, ``Appliance.Control.ToggleX``,
+  ``Appliance.Control.ElectricityX``, ``Appliance.Control.ConsumptionX``
+  and the ``Appliance.Control.Multiple`` batch) plus UDP discovery on port
+  9988;
+- Open API models (``r11``, ``r21``, ``p11s``, ``em06p``, ``em16p``):
+  ``GET /rpc/<method>``.
+
+Readings vary over time (a slow load cycle, noise and occasional load
+steps) and energy counters integrate the simulated power. Latency, jitter,
+packet loss and connection resets are configurable per device, and many
+devices can share one process by binding to different loopback addresses
+(``127.0.0.2``, ``127.0.0.3``, ...) or ports.
+
+Open API models can also be announced over mDNS (``--mdns``, needs the
+optional ``zeroconf`` package) the way the integration discovers them.
+
+Run a fleet from the command line (from the repository root)::
+
+    python tools/simulator.py --model em16p --count 20 --port 8080
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import date, timedelta
+from hashlib import md5
+import ipaddress
+import json
+import logging
+import math
+import random
+import socket
+import time
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+DISCOVERY_PORT = 9988
+
+LEGACY_MODELS = {"r10": [0], "em06": list(range(1, 7)), "em16": list(range(1, 19))}
+RPC_MODELS = {
+    "r11": [1],
+    "r21": [1, 2],
+    "p11s": [1],
+    "em06p": list(range(1, 7)),
+    "em16p": list(range(1, 19)),
+}
+MDNS_TYPE = "_http._tcp.local."
+# Days of consumption history kept by legacy EM models
+HISTORY_DAYS = 30
+EM_MODELS = {"em06", "em16", "em06p", "em16p"}
+
+
+@dataclass
+class NetworkConditions:
+    """Network behaviour applied to every request a device answers."""
+
+    latency: float = 0.0  # seconds added to every response
+    jitter: float = 0.0  # extra uniform delay in [0, jitter] seconds
+    loss: float = 0.0  # probability a request is never answered
+    reset: float = 0.0  # probability the connection is reset instead of answered
+    loss_hold: float = 30.0  # seconds a lost request is held before closing
+
+
+class _ChannelModel:
+    """Time-varying readings and energy counters of one channel."""
+
+    def __init__(self, rng: random.Random, exporting: bool = False) -> None:
+        """Pick a random load profile for the channel."""
+        self._rng = rng
+        self.base_power = rng.uniform(20.0, 2500.0) * (-1.0 if exporting else 1.0)
+        self.period = rng.uniform(120.0, 900.0)
+        self.phase = rng.uniform(0.0, 2 * math.pi)
+        self.step = 1.0
+        self.energy_wh = rng.uniform(0.0, 50000.0)
+        self.today_wh = rng.uniform(0.0, 5000.0)
+        self.week_wh = self.today_wh + rng.uniform(0.0, 30000.0)
+        self._last = time.time()
+
+    def power(self, now: float, on: bool = True) -> float:
+        """Return the power in watts at ``now``."""
+        if not on:
+            return 0.0
+        if self._rng.random() < 0.01:
+            # An appliance switching on or off.
+            self.step = self._rng.choice((0.2, 0.6, 1.0, 1.4))
+        cycle = 1.0 + 0.3 * math.sin(2 * math.pi * now / self.period + self.phase)
+        noise = self._rng.gauss(1.0, 0.02)
+        return self.base_power * cycle * self.step * noise
+
+    def advance(self, now: float, power_w: float) -> None:
+        """Integrate energy up to ``now``."""
+        delta = max(0.0, now - self._last) * power_w / 3600.0
+        self._last = now
+        self.energy_wh += delta
+        self.today_wh += abs(delta)
+        self.week_wh += abs(delta)
+
+
+class SimulatedDevice:
+    """A single simulated Refoss device."""
+
+    def __init__(
+        self,
+        model: str,
+        host: str = "127.0.0.1",
+        port: int = 80,
+        conditions: NetworkConditions | None = None,
+        report_counters: bool = True,
+        batching: bool = True,
+        seed: int | None = None,
+        name: str | None = None,
+    ) -> None:
+        """Create a device; call :meth:`async_start` to serve it."""
+        model = model.lower()
+        if model not in LEGACY_MODELS and model not in RPC_MODELS:
+            raise ValueError(f"Unsupported model {model}")
+        self.model = model
+        self.host = host
+        self.port = port
+        self.conditions = conditions or NetworkConditions()
+        self.report_counters = report_counters
+        self.batching = batching
+        self.legacy = model in LEGACY_MODELS
+        self.channels = (LEGACY_MODELS if self.legacy else RPC_MODELS)[model]
+        self._rng = random.Random(seed if seed is not None else f"{host}:{port}")
+        self.uuid = md5(f"{model}{host}{port}".encode()).hexdigest()
+        self.mac = ":".join(["48", "e1", "e9"] + [self.uuid[i : i + 2] for i in (0, 2, 4)])
+        self.name = name or f"{model.upper()}-{self.uuid[:4]}"
+        # Some EM channels export (solar) to exercise signed counters.
+        self._models = {
+            ch: _ChannelModel(self._rng, exporting=model in EM_MODELS and ch % 7 == 0)
+            for ch in self.channels
+        }
+        self._outputs = {ch: True for ch in self.channels}
+        # Time of the last output change per channel (ToggleX ``lmTime``).
+        self._changed = dict.fromkeys(self.channels, int(time.time()))
+        self._runner: web.AppRunner | None = None
+        self._udp: asyncio.DatagramTransport | None = None
+        self.requests = 0
+
+    # ------------------------------------------------------------------
+    # Identity
+    # ------------------------------------------------------------------
+
+    @property
+    def address(self) -> str:
+        """Return the address clients use (``host`` or ``host:port``)."""
+        return self.host if self.port == 80 else f"{self.host}:{self.port}"
+
+    def discovery_info(self) -> dict:
+        """Return the legacy UDP discovery reply (also the config entry dict)."""
+        return {
+            "uuid": self.uuid,
+            "devName": self.name,
+            "deviceType": self.model,
+            "devSoftWare": "3.1.7",
+            "devHardWare": "3.0.0",
+            "ip": self.address,
+            "port": str(self.port),
+            "mac": self.mac,
+            "subType": "us",
+            "channels": self.channels,
+        }
+
+    def rpc_device_info(self) -> dict:
+        """Return the ``Refoss.DeviceInfo.Get`` result."""
+        return {
+            "name": self.name,
+            "model": self.model.upper(),
+            "dev_id": f"{self.model}-{self.uuid[:12]}",
+            "mac": self.mac.replace(":", "").upper(),
+            "fw_ver": "1.0.6",
+            "hw_ver": "1.0",
+        }
+
+    def mdns_properties(self) -> dict[str, str]:
+        """Return the TXT record announced over mDNS."""
+        info = self.rpc_device_info()
+        return {"model": info["model"], "mac": info["mac"], "fw_ver": info["fw_ver"]}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def async_start(self) -> None:
+        """Start the HTTP server (and UDP discovery for legacy models)."""
+        app = web.Application(middlewares=[self._network_middleware])
+        app.router.add_post("/public", self._handle_legacy)
+        app.router.add_post("/config", self._handle_legacy)
+        app.router.add_get("/rpc/{method}", self._handle_rpc)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        if self.legacy:
+            loop = asyncio.get_running_loop()
+            self._udp, _ = await loop.create_datagram_endpoint(
+                lambda: _DiscoveryResponder(self),
+                local_addr=(self.host, DISCOVERY_PORT),
+            )
+
+    async def async_stop(self) -> None:
+        """Stop serving."""
+        if self._udp is not None:
+            self._udp.close()
+            self._udp = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # ------------------------------------------------------------------
+    # Network conditions
+    # ------------------------------------------------------------------
+
+    @web.middleware
+    async def _network_middleware(self, request: web.Request, handler):
+        """Apply latency, jitter, loss and resets around a handler."""
+        self.requests += 1
+        conditions = self.conditions
+        roll = self._rng.random()
+        if roll < conditions.loss:
+            await asyncio.sleep(conditions.loss_hold)
+            return _close_transport(request)
+        delay = conditions.latency + self._rng.uniform(0.0, conditions.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if roll < conditions.loss + conditions.reset:
+            return _close_transport(request)
+        return await handler(request)
+
+    # ------------------------------------------------------------------
+    # Readings
+    # ------------------------------------------------------------------
+
+    def _reading(self, channel: int, now: float) -> tuple[float, float, float, float]:
+        """Return ``(power W, voltage V, current A, power factor)``."""
+        model = self._models[channel]
+        power = model.power(now, self._outputs[channel])
+        model.advance(now, power)
+        voltage = 230.0 + 2.0 * math.sin(now / 60.0) + self._rng.gauss(0.0, 0.3)
+        factor = 0.85 + 0.1 * abs(math.sin(now / 300.0 + channel))
+        current = abs(power) / (voltage * factor) if power else 0.0
+        return power, voltage, current, factor
+
+    # ------------------------------------------------------------------
+    # Legacy envelope
+    # ------------------------------------------------------------------
+
+    async def _handle_legacy(self, request: web.Request) -> web.Response:
+        """Answer a signed legacy request."""
+        if not self.legacy:
+            raise web.HTTPNotFound
+        message = await request.json()
+        header = message.get("header", {})
+        method = header.get("method", "")
+        namespace = header.get("namespace", "")
+        payload = self._legacy_payload(method, namespace, message.get("payload", {}))
+        ack = "ERROR" if payload is None else f"{method}ACK"
+        timestamp = int(time.time())
+        response = {
+            "header": {
+                "messageId": header.get("messageId"),
+                "namespace": namespace,
+                "method": ack,
+                "payloadVersion": 1,
+                "from": f"/appliance/{self.uuid}/publish",
+                "timestamp": timestamp,
+                "timestampMs": int(time.time() * 1000) % 1000,
+                "sign": md5(f"{header.get('messageId')}{timestamp}".encode()).hexdigest(),
+            },
+            "payload": payload
+            if payload is not None
+            else {"error": {"code": 5000, "detail": "unsupported namespace"}},
+        }
+        return web.json_response(response)
+
+    def _abilities(self) -> dict:
+        """Return the ability map of the model."""
+        abilities = {"Appliance.System.All": {}, "Appliance.System.Ability": {}}
+        if self.batching:
+            abilities["Appliance.Control.Multiple"] = {"maxCmdNum": 5}
+        if self.model in EM_MODELS:
+            abilities["Appliance.Control.ElectricityX"] = {}
+            abilities["Appliance.Control.ConsumptionX"] = {}
+        else:
+            abilities["Appliance.Control.ToggleX"] = {}
+        return abilities
+
+    def _set_output(self, channel: int, on: bool) -> None:
+        """Switch a channel output, noting the time if it changed."""
+        if self._outputs[channel] != on:
+            self._outputs[channel] = on
+            self._changed[channel] = int(time.time())
+
+    def _togglex(self) -> list[dict]:
+        """Return the ToggleX state of every channel."""
+        return [
+            {"channel": ch, "onoff": int(on), "lmTime": self._changed[ch]}
+            for ch, on in self._outputs.items()
+        ]
+
+    def _legacy_payload(self, method: str, namespace: str, payload: dict) -> dict | None:
+        """Return the response payload, or *None* for unsupported requests."""
+        if namespace == "Appliance.Control.Multiple" and method == "SET":
+            if not self.batching:
+                return None
+            answers = []
+            for item in payload.get("multiple", []):
+                header = item.get("header", {})
+                inner = self._legacy_payload(
+                    header.get("method", ""),
+                    header.get("namespace", ""),
+                    item.get("payload", {}),
+                )
+                answers.append(
+                    {
+                        "header": {
+                            "messageId": header.get("messageId"),
+                            "namespace": header.get("namespace"),
+                            "method": "ERROR" if inner is None else f"{header.get('method')}ACK",
+                        },
+                        "payload": {} if inner is None else inner,
+                    }
+                )
+            return {"multiple": answers}
+        if namespace == "Appliance.System.Ability" and method == "GET":
+            return {"payloadVersion": 1, "ability": self._abilities()}
+        if namespace == "Appliance.System.All" and method == "GET":
+            return {
+                "all": {
+                    "system": {"hardware": {"macAddress": self.mac, "uuid": self.uuid}},
+                    "digest": {"togglex": self._togglex()},
+                }
+            }
+        if namespace == "Appliance.Control.ToggleX":
+            if method == "GET":
+                return {"togglex": self._togglex()}
+            if method == "SET":
+                items = payload.get("togglex", [])
+                for item in items if isinstance(items, list) else [items]:
+                    if item.get("channel") in self._outputs:
+                        self._set_output(item["channel"], item.get("onoff") == 1)
+                return {}
+        if namespace == "Appliance.Control.ElectricityX" and method == "GET":
+            if self.model not in EM_MODELS:
+                return None
+            return {"electricity": [self._electricity(ch) for ch in self.channels]}
+        if namespace == "Appliance.Control.ConsumptionX" and method == "GET":
+            if self.model not in EM_MODELS:
+                return None
+            return {
+                "consumptionx": [
+                    entry for ch in self.channels for entry in self._consumption(ch)
+                ]
+            }
+        return None
+
+    def _consumption(self, channel: int) -> list[dict]:
+        """Return the daily consumption history of one channel, oldest first."""
+        model = self._models[channel]
+        today = date.today()
+        entries = []
+        for age in range(HISTORY_DAYS - 1, -1, -1):
+            day = today - timedelta(days=age)
+            if age:
+                # Stable per day: about a day of the channel's base load.
+                rng = random.Random(f"{self.uuid}:{channel}:{day}")
+                value = abs(model.base_power) * 24 * rng.uniform(0.5, 1.5)
+            else:
+                value = model.today_wh
+            entries.append(
+                {"channel": channel, "date": day.isoformat(), "value": int(value)}
+            )
+        return entries
+
+    def _electricity(self, channel: int) -> dict:
+        """Return one ElectricityX entry (mA, mV, mW, Wh)."""
+        power, voltage, current, factor = self._reading(channel, time.time())
+        model = self._models[channel]
+        entry = {
+            "channel": channel,
+            "current": int(current * 1000),
+            "voltage": int(voltage * 1000),
+            "power": int(power * 1000),
+            "factor": round(factor, 3),
+        }
+        if self.report_counters:
+            entry["mConsume"] = int(model.energy_wh)
+            entry["today"] = int(model.today_wh)
+            entry["week"] = int(model.week_wh)
+        return entry
+
+    # ------------------------------------------------------------------
+    # RPC
+    # ------------------------------------------------------------------
+
+    def _methods(self) -> list[str]:
+        """Return the supported RPC methods."""
+        methods = ["Refoss.DeviceInfo.Get", "Refoss.Methods.List", "Refoss.Config.Get"]
+        if self.model in EM_MODELS:
+            methods.append("Em.Status.Get")
+        else:
+            methods.extend(["Switch.Status.Get", "Switch.Action.Set"])
+        return methods
+
+    async def _handle_rpc(self, request: web.Request) -> web.Response:
+        """Answer an Open API request."""
+        method = request.match_info["method"]
+        if self.legacy or method not in self._methods():
+            return web.json_response(
+                {"code": 404, "message": f"No handler for {method}"}, status=404
+            )
+        query = request.query
+        if method == "Refoss.DeviceInfo.Get":
+            return web.json_response(self.rpc_device_info())
+        if method == "Refoss.Methods.List":
+            return web.json_response({"methods": self._methods()})
+        if method == "Refoss.Config.Get":
+            prefix = "em" if self.model in EM_MODELS else "switch"
+            return web.json_response(
+                {f"{prefix}:{ch}": {"id": ch, "name": None} for ch in self.channels}
+            )
+        channel = int(query.get("id", 65535))
+        if method == "Em.Status.Get":
+            channels = self.channels if channel == 65535 else [channel]
+            return web.json_response(
+                {"status": [self._em_status(ch) for ch in channels if ch in self._models]}
+            )
+        if channel not in self._models:
+            return web.json_response({"code": -103, "message": "Invalid id"}, status=400)
+        if method == "Switch.Status.Get":
+            return web.json_response(self._switch_status(channel))
+        # Switch.Action.Set
+        was_on = self._outputs[channel]
+        action = query.get("action", "")
+        if action == "on":
+            self._set_output(channel, True)
+        elif action == "off":
+            self._set_output(channel, False)
+        elif action == "toggle":
+            self._set_output(channel, not was_on)
+        else:
+            return web.json_response({"code": -103, "message": "Invalid action"}, status=400)
+        return web.json_response({"was_on": was_on})
+
+    def _em_status(self, channel: int) -> dict:
+        """Return one Em.Status.Get entry (mA, mV, mW, pf x1000, kWh)."""
+        power, voltage, current, factor = self._reading(channel, time.time())
+        entry = {
+            "id": channel,
+            "current": int(current * 1000),
+            "voltage": int(voltage * 1000),
+            "power": int(power * 1000),
+            "power_factor": int(factor * 1000),
+        }
+        if self.report_counters:
+            entry["month_energy"] = round(self._models[channel].energy_wh / 1000.0, 3)
+        return entry
+
+    def _switch_status(self, channel: int) -> dict:
+        """Return one Switch.Status.Get result (mW, mV, mA, Wh)."""
+        power, voltage, current, _ = self._reading(channel, time.time())
+        status = {
+            "id": channel,
+            "output": self._outputs[channel],
+            "apower": int(abs(power) * 1000),
+            "voltage": int(voltage * 1000),
+            "current": int(current * 1000),
+            "temperature": {"tC": round(35 + self._rng.uniform(0, 5), 1)},
+        }
+        if self.report_counters:
+            status["month_consumption"] = int(abs(self._models[channel].energy_wh))
+        return status
+
+
+class _DiscoveryResponder(asyncio.DatagramProtocol):
+    """Answer legacy UDP discovery broadcasts for one device."""
+
+    def __init__(self, device: SimulatedDevice) -> None:
+        self._device = device
+        self._transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport) -> None:
+        """Store the transport."""
+        self._transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Reply to a discovery request unless the packet is 'lost'."""
+        if self._transport is None:
+            return
+        if self._device._rng.random() < self._device.conditions.loss:
+            return
+        try:
+            request = json.loads(data)
+        except ValueError:
+            return
+        if request.get("devName") not in ("*", self._device.name):
+            return
+        self._transport.sendto(
+            json.dumps(self._device.discovery_info()).encode("utf-8"), addr
+        )
+
+
+def _close_transport(request: web.Request) -> web.Response:
+    """Drop the client connection; return a response that is never sent.
+
+    Returning normally, rather than raising, lets the server finish the
+    request without treating the drop as a cancelled or failed handler.
+    """
+    transport = request.transport
+    if transport is not None:
+        transport.abort()
+    return web.Response()
+
+
+async def async_start_fleet(
+    models: list[str],
+    first_host: str = "127.0.0.2",
+    port: int = 80,
+    conditions: NetworkConditions | None = None,
+    report_counters: bool = True,
+) -> list[SimulatedDevice]:
+    """Start one device per model on consecutive loopback addresses."""
+    base = ipaddress.IPv4Address(first_host)
+    devices = [
+        SimulatedDevice(
+            model,
+            host=str(base + i),
+            port=port,
+            conditions=conditions,
+            report_counters=report_counters,
+            seed=i,
+        )
+        for i, model in enumerate(models)
+    ]
+    await asyncio.gather(*(device.async_start() for device in devices))
+    return devices
+
+
+async def async_advertise(
+    devices: list[SimulatedDevice],
+) -> Callable[[], Awaitable[None]]:
+    """Announce the Open API devices over mDNS; return a coroutine to withdraw them.
+
+    Needs the optional ``zeroconf`` package.
+    """
+    from zeroconf import ServiceInfo  # noqa: PLC0415
+    from zeroconf.asyncio import AsyncZeroconf  # noqa: PLC0415
+
+    zeroconf = AsyncZeroconf()
+    services = []
+    for device in devices:
+        if device.legacy:
+            continue
+        instance = f"refoss-{device.model}-{device.uuid[:6]}"
+        services.append(
+            ServiceInfo(
+                MDNS_TYPE,
+                f"{instance}.{MDNS_TYPE}",
+                addresses=[socket.inet_aton(device.host)],
+                port=device.port,
+                properties=device.mdns_properties(),
+                server=f"{instance}.local.",
+            )
+        )
+    for service in services:
+        await zeroconf.async_register_service(service)
+
+    async def withdraw() -> None:
+        for service in services:
+            await zeroconf.async_unregister_service(service)
+        await zeroconf.async_close()
+
+    return withdraw
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    """Run a fleet until cancelled."""
+    conditions = NetworkConditions(
+        latency=args.latency, jitter=args.jitter, loss=args.loss, reset=args.reset
+    )
+    models = [m for m in args.model for _ in range(args.count)]
+    devices = await async_start_fleet(
+        models, args.host, args.port, conditions, not args.no_counters
+    )
+    for device in devices:
+        print(f"{device.model:6} {device.address:22} {device.name}")
+    withdraw = await async_advertise(devices) if args.mdns else None
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if withdraw is not None:
+            await withdraw()
+        await asyncio.gather(*(device.async_stop() for device in devices))
+
+
+def main() -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Run simulated Refoss devices")
+    parser.add_argument("--model", action="append", default=None,
+                        help="device model, repeatable (default: em16p)")
+    parser.add_argument("--count", type=int, default=1, help="devices per model")
+    parser.add_argument("--host", default="127.0.0.2", help="first loopback address")
+    parser.add_argument("--port", type=int, default=80)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--reset", type=float, default=0.0)
+    parser.add_argument("--no-counters", action="store_true",
+                        help="omit energy counters from responses")
+    parser.add_argument("--mdns", action="store_true",
+                        help="announce Open API devices over mDNS (needs zeroconf)")
+    args = parser.parse_args()
+    args.model = args.model or ["em16p"]
+    try:
+        asyncio.run(_async_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()